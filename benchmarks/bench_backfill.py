@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from block_stream import decode_block_instructions
+from rate_limiter import RpcLoadBalancer
+from slot_backfill import SLOT_SECONDS, SlotBackfiller
+
+from fixtures import block_notification
+
+# Backfills a slot gap from a local JSON-RPC stand-in (getBlocks / getBlock with a
+# fixed per-request latency) and compares the time taken with how long the same
+# slots took to produce live (SLOT_SECONDS each).
+
+START_SLOT = 300_000_000
+
+
+def _serve(port: int, block: str, latency: float, skip_every: int):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+            if request["method"] == "getBlocks":
+                start, end = request["params"][:2]
+                result = json.dumps([s for s in range(start, end + 1) if skip_every == 0 or s % skip_every])
+            else:
+                result = block
+            body = f'{{"jsonrpc":"2.0","id":{request["id"]},"result":{result}}}'.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+async def _backfill(endpoint: str, slots: int, concurrency: int, rate: float) -> tuple:
+    limiter = RpcLoadBalancer({endpoint: rate})
+    backfiller = SlotBackfiller(concurrency=concurrency, runner=limiter.run)
+    events = 0
+
+    async def deliver(slot: int, block: dict):
+        nonlocal events
+        events += len(decode_block_instructions(block, slot, ("create", "buy", "sell"), late=True))
+
+    start = time.perf_counter()
+    await backfiller.backfill(START_SLOT, START_SLOT + slots - 1, deliver)
+    elapsed = time.perf_counter() - start
+    from rpc_pool import close_rpc_pool
+    await close_rpc_pool()
+    return elapsed, events, backfiller.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slot gap backfill throughput vs real time")
+    parser.add_argument("--slots", type=int, default=100, help="Width of the gap")
+    parser.add_argument("--txs", type=int, default=200, help="pump.fun transactions per block")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds the stand-in RPC takes per request")
+    parser.add_argument("--rate", type=float, default=50, help="Requests/sec allowed by the rate limiter")
+    parser.add_argument("--skip-every", type=int, default=20, help="Every Nth slot is skipped (0 = none)")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 4, 8, 16])
+    parser.add_argument("--port", type=int, default=8931)
+    args = parser.parse_args()
+
+    frame = json.loads(block_notification(args.txs, START_SLOT))
+    block = json.dumps(frame["params"]["result"]["value"]["block"])
+    server = multiprocessing.Process(target=_serve, args=(args.port, block, args.latency, args.skip_every), daemon=True)
+    server.start()
+    time.sleep(1.0)
+
+    live = args.slots * SLOT_SECONDS
+    print(f"{args.slots} slot gap, {args.txs} txs/block, {args.latency * 1e3:.0f} ms RPC latency, "
+          f"{args.rate:.0f} req/s limit; live took {live:.1f}s")
+    try:
+        for concurrency in args.concurrency:
+            elapsed, events, stats = asyncio.run(
+                _backfill(f"http://127.0.0.1:{args.port}", args.slots, concurrency, args.rate))
+            print(f"concurrency {concurrency:3d}: {elapsed:6.2f}s  {stats['blocks_fetched'] / elapsed:7.1f} blocks/s  "
+                  f"{live / elapsed:5.1f}x real time  ({events} late events)")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
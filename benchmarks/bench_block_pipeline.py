@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import websockets
+
+from block_pipeline import BlockPipeline
+from block_stream import stream_pump_instructions
+
+from fixtures import block_notification
+
+# Serves synthetic full-detail blocks from a local websocket and measures how many
+# blocks/sec the single-loop stream and the multi-process pipeline keep up with.
+
+INCLUDE = ("create", "buy", "sell")
+
+
+def _serve(port: int, frames: list):
+    async def handler(websocket):
+        request = json.loads(await websocket.recv())
+        await websocket.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": 1}))
+        for frame in frames:
+            await websocket.send(frame)
+        await asyncio.Future()
+
+    async def main():
+        async with websockets.serve(handler, "127.0.0.1", port, max_size=None, compression=None):
+            await asyncio.Future()
+
+    asyncio.run(main())
+
+
+async def _consume(stream, expected: int) -> float:
+    start = time.perf_counter()
+    seen = 0
+    async for _ in stream:
+        seen += 1
+        if seen >= expected:
+            break
+    await stream.aclose()
+    return time.perf_counter() - start
+
+
+def run(name: str, make_stream, frames: list, expected: int, port: int):
+    server = multiprocessing.Process(target=_serve, args=(port, frames), daemon=True)
+    server.start()
+    time.sleep(1.0)
+    try:
+        elapsed = asyncio.run(_consume(make_stream(f"ws://127.0.0.1:{port}"), expected))
+    finally:
+        server.terminate()
+    print(f"{name:28s} {len(frames) / elapsed:8.1f} blocks/sec  ({elapsed:.2f}s for {len(frames)} blocks)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-loop vs multi-process block decoding")
+    parser.add_argument("--blocks", type=int, default=40)
+    parser.add_argument("--txs", type=int, default=500, help="Transactions per block")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--port", type=int, default=8911)
+    args = parser.parse_args()
+
+    frame = block_notification(args.txs)
+    per_block = len(json.loads(frame)["params"]["result"]["value"]["block"]["transactions"])
+    # distinct slots per run: both modes share the process-wide seen-slot index
+    frames = [[frame.replace('"slot": 300000000', f'"slot": {300000000 + mode * 100000 + i}') for i in range(args.blocks)]
+              for mode in range(2)]
+    expected = per_block * args.blocks
+    print(f"{args.blocks} blocks x {args.txs} txs, {os.cpu_count()} CPUs")
+
+    run("single event loop", lambda endpoint: stream_pump_instructions(endpoint, include=INCLUDE),
+        frames[0], expected, args.port)
+
+    pipeline = None
+
+    def make_pipeline(endpoint):
+        nonlocal pipeline
+        pipeline = BlockPipeline(endpoint, include=INCLUDE, workers=args.workers)
+        return pipeline.stream()
+
+    run(f"pipeline ({args.workers} workers)", make_pipeline, frames[1], expected, args.port + 1)
+    stats = pipeline.stats()
+    for stage in ("queue_wait", "decode", "merge_wait", "end_to_end"):
+        print(f"  {stage:12s} p50 {stats[stage]['p50_ms']:8.2f} ms  p99 {stats[stage]['p99_ms']:8.2f} ms")
+    print(f"  receiver stalls: {stats['receiver_stalls']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+import struct
+import sys
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from construct import Struct, Int64ul, Flag
+
+from bonding_curve import BondingCurveState, EXPECTED_DISCRIMINATOR, CURVE_DISCRIMINATOR_U64, parse_curve_states
+
+# BondingCurveState parse: previous construct.Struct + __dict__ path vs. __slots__/struct.Struct,
+# and bulk NumPy decode of many accounts.
+
+N_BULK = 10_000
+
+
+class ConstructBondingCurveState:
+    """The construct-based parser BondingCurveState used before."""
+    _STRUCT = Struct(
+        "virtual_token_reserves" / Int64ul,
+        "virtual_sol_reserves" / Int64ul,
+        "real_token_reserves" / Int64ul,
+        "real_sol_reserves" / Int64ul,
+        "token_total_supply" / Int64ul,
+        "complete" / Flag
+    )
+
+    def __init__(self, data: bytes) -> None:
+        parsed = self._STRUCT.parse(data[8:])
+        self.__dict__.update(parsed)
+
+
+def account(i: int) -> bytes:
+    # real curve accounts carry trailing bytes after the 49-byte prefix
+    return EXPECTED_DISCRIMINATOR + struct.pack("<QQQQQ?", 1_073_000_000_000_000 - i, 30_000_000_000 + i,
+                                                793_100_000_000_000, i, 1_000_000_000_000_000, False) + bytes(32)
+
+
+def per_call(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number
+
+
+def main():
+    data = account(7)
+    old = ConstructBondingCurveState(data)
+    new = BondingCurveState(memoryview(data))
+    assert all(getattr(old, f) == getattr(new, f) for f in BondingCurveState.__slots__)
+
+    t_old = per_call(lambda: ConstructBondingCurveState(data), 20_000)
+    t_new = per_call(lambda: BondingCurveState(data), 200_000)
+    print(f"construct  BondingCurveState: {t_old * 1e6:8.2f} us/op")
+    print(f"struct     BondingCurveState: {t_new * 1e6:8.2f} us/op  ({t_old / t_new:.1f}x)")
+    print(f"instance size: construct {sys.getsizeof(old) + sys.getsizeof(old.__dict__)} B, slots {sys.getsizeof(new)} B")
+
+    buffers = [account(i) for i in range(N_BULK)]
+    t_loop = per_call(lambda: [ConstructBondingCurveState(b) for b in buffers], 1)
+    t_bulk = per_call(lambda: parse_curve_states(buffers), 10)
+    arr = parse_curve_states(buffers)
+    assert (arr["discriminator"] == CURVE_DISCRIMINATOR_U64).all() and arr["real_sol_reserves"][-1] == N_BULK - 1
+    print(f"{N_BULK} accounts, construct loop: {t_loop * 1e3:8.2f} ms")
+    print(f"{N_BULK} accounts, NumPy bulk:     {t_bulk * 1e3:8.2f} ms  ({t_loop / t_bulk:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
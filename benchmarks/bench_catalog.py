@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+
+from token_catalog import TokenCatalog, TokenQuery
+
+# Create events -> token catalog: add() cost on the event loop, sustained
+# insert rate through the batched writer, then --bro / --match style queries.
+
+
+def create_args(creators: list, i: int) -> dict:
+    return {"name": f"Token {i} {random.choice(['Moon', 'Pepe', 'Doge', 'Cat'])}", "symbol": f"T{i % 5000}",
+            "uri": f"https://ipfs.io/ipfs/{i}", "mint": str(Pubkey.new_unique()),
+            "bondingCurve": str(Pubkey.new_unique()), "associatedBondingCurve": str(Pubkey.new_unique()),
+            "user": random.choice(creators)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token catalog insert rate and query latency")
+    parser.add_argument("--tokens", type=int, default=50000)
+    parser.add_argument("--creators", type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(7)
+    creators = [str(Pubkey.new_unique()) for _ in range(args.creators)]
+    events = [create_args(creators, i) for i in range(args.tokens)]
+    signature = str(Signature.new_unique())
+    with tempfile.TemporaryDirectory() as directory:
+        catalog = TokenCatalog(os.path.join(directory, "catalog.db"))
+        samples = []
+        began = time.perf_counter()
+        for slot, token in enumerate(events):
+            start = time.perf_counter()
+            catalog.add(token, 300_000_000 + slot, signature)
+            samples.append(time.perf_counter() - start)
+        catalog.flush()
+        elapsed = time.perf_counter() - began
+        stats = catalog.stats()
+        print(f"add(): p50 {statistics.median(samples) * 1e6:.1f} us")
+        print(f"{stats['rows']} rows committed in {elapsed:.2f}s ({stats['rows'] / elapsed:,.0f}/s), "
+              f"{stats['commits']} commits, max batch {stats['max_batch']}")
+
+        queries = {
+            "--bro": TokenQuery(creator=creators[0]),
+            "--match": TokenQuery(match="pepe"),
+            "--match last 10k slots": TokenQuery(match="pepe", since_slot=300_000_000 + args.tokens - 10_000),
+            "--bro --match": TokenQuery(match="moon", creator=creators[1]),
+        }
+        for name, query in queries.items():
+            start = time.perf_counter()
+            rows = catalog.query(query, limit=100)
+            count = catalog.count(query)
+            print(f"{name:24s} {count:6d} matches ({len(rows)} returned) in "
+                  f"{(time.perf_counter() - start) * 1e3:.2f} ms")
+            assert all((not query.creator or row["creator"] == query.creator) and
+                       (not query.match or any(query.match in row[k].lower() for k in ("name", "symbol"))) for row in rows)
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import websockets
+
+# Cold start: fresh interpreter -> import the listener -> first subscription request
+# arrives at a local websocket stand-in. RPC endpoints point at a closed local port
+# so nothing leaves the machine. The child runs in a temp directory, so files it creates
+# (trades/catalog.db etc.) do not land in the repo.
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ENTRIES = {
+    "main_fun": "import main_fun as m; asyncio.run(m.main_fun())",
+    "main_fun_multi": "import main_fun_multi as m; asyncio.run(m.listen_for_new_tokens())",
+    "listen_new_direct": "import listen_new_direct as m; asyncio.run(m.listen_for_new_tokens())",
+    "listen_to_raydium_migration": "import listen_to_raydium_migration as m; asyncio.run(m.listen_for_events())",
+}
+
+CHILD = """
+import time
+_t0 = time.perf_counter()
+import asyncio, sys
+sys.path.insert(0, {repo!r})
+import config
+config.WSS_ENDPOINT = config.WSS_ENDPOINT_2 = {wss!r}
+config.WSS_RACE_ENDPOINTS = ({wss!r},)
+config.METRICS_PORT = 0
+config.RPC_ENDPOINT = config.RPC_ENDPOINT_2 = {rpc!r}
+config.RPC_POOL_SIZES = config.RPC_RATE_LIMITS = {{{rpc!r}: 5}}
+_entry = {entry!r}
+_module = __import__(_entry)
+print("IMPORT", time.perf_counter() - _t0, flush=True)
+{run}
+"""
+
+
+async def _one(entry: str, port: int) -> tuple:
+    first = asyncio.get_running_loop().create_future()
+
+    async def handler(websocket):
+        try:
+            async for message in websocket:
+                if not first.done():
+                    first.set_result(time.perf_counter())
+                request = json.loads(message)
+                await websocket.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": 1}))
+        except websockets.exceptions.ConnectionClosed:
+            pass  # the child is killed once it has subscribed
+
+    code = CHILD.format(repo=REPO, wss=f"ws://127.0.0.1:{port}", rpc="http://127.0.0.1:9", entry=entry,
+                        run=ENTRIES[entry])
+    async with websockets.serve(handler, "127.0.0.1", port):
+        workdir = tempfile.TemporaryDirectory()
+        start = time.perf_counter()
+        child = await asyncio.create_subprocess_exec(sys.executable, "-c", code, cwd=workdir.name,
+                                                     stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        import_time = None
+        try:
+            while import_time is None:
+                line = await asyncio.wait_for(child.stdout.readline(), 30)
+                if not line:
+                    raise RuntimeError(f"{entry} exited before subscribing")
+                if line.startswith(b"IMPORT"):
+                    import_time = float(line.split()[1])
+            subscribed = await asyncio.wait_for(first, 30)
+        finally:
+            child.kill()
+            await child.wait()
+            workdir.cleanup()
+    return import_time, subscribed - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time-to-first-subscription per listener")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8921)
+    parser.add_argument("entries", nargs="*", default=list(ENTRIES))
+    args = parser.parse_args()
+
+    print(f"{'entry':30s} {'import ms':>10s} {'first subscription ms':>22s}")
+    for entry in args.entries:
+        samples = [asyncio.run(_one(entry, args.port)) for _ in range(args.runs)]
+        imports = statistics.median(s[0] for s in samples) * 1e3
+        firsts = statistics.median(s[1] for s in samples) * 1e3
+        print(f"{entry:30s} {imports:10.1f} {firsts:22.1f}")
+
+
+if __name__ == "__main__":
+    main()
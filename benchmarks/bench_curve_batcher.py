@@ -0,0 +1,75 @@
+import asyncio
+import os
+import random
+import struct
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solders.pubkey import Pubkey
+
+from curve_batcher import AccountBatcher
+
+# RPC calls per 1000 bonding curve lookups: one get_account_info per lookup (before)
+# vs. coalesced getMultipleAccounts (after). Runs against an in-process fake RPC.
+
+LOOKUPS = 1000
+DISTINCT_CURVES = 300
+BURST_SIZE = 25          # lookups that arrive together (launch rush / portfolio refresh)
+BURST_GAP = 0.002        # seconds between bursts
+RPC_LATENCY = 0.020      # simulated round trip
+
+CURVE_DATA = struct.pack("<Q", 6966180631402821399) + struct.pack("<QQQQQ?", 1, 2, 3, 4, 5, False)
+
+
+class FakeRpc:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_account_info(self, pubkey):
+        self.calls += 1
+        await asyncio.sleep(RPC_LATENCY)
+        return SimpleNamespace(value=SimpleNamespace(data=CURVE_DATA))
+
+    async def get_multiple_accounts(self, pubkeys, commitment=None):
+        self.calls += 1
+        await asyncio.sleep(RPC_LATENCY)
+        return SimpleNamespace(context=SimpleNamespace(slot=1), value=[SimpleNamespace(data=CURVE_DATA) for _ in pubkeys])
+
+
+def workload():
+    random.seed(1)
+    curves = [Pubkey.new_unique() for _ in range(DISTINCT_CURVES)]
+    return [random.choice(curves) for _ in range(LOOKUPS)]
+
+
+async def run(keys, lookup):
+    start = time.perf_counter()
+    tasks = []
+    for i in range(0, len(keys), BURST_SIZE):
+        tasks += [asyncio.ensure_future(lookup(k)) for k in keys[i:i + BURST_SIZE]]
+        await asyncio.sleep(BURST_GAP)
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start
+
+
+async def main():
+    keys = workload()
+
+    before = FakeRpc()
+    t_before = await run(keys, before.get_account_info)
+
+    after = FakeRpc()
+    batcher = AccountBatcher(runner=lambda call: call(after))
+    t_after = await run(keys, batcher.get)
+
+    print(f"lookups: {LOOKUPS} ({DISTINCT_CURVES} distinct curves, bursts of {BURST_SIZE})")
+    print(f"before (get_account_info):     {before.calls:5d} RPC calls  {t_before:.3f}s")
+    print(f"after  (getMultipleAccounts):  {after.calls:5d} RPC calls  {t_after:.3f}s")
+    print(f"batcher counters: {batcher.counters}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
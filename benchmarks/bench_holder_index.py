@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solders.pubkey import Pubkey
+
+from holder_index import HolderIndex
+
+from mock_callstatic import MockCallStatic
+
+# holder_index against the local mock API: a full index of many mints at
+# concurrency 1 vs N, checked against the mock's true balances, then an
+# incremental run after new trades that should fetch only the new pages. The mock puts
+# several trades in some transactions, which all have to count.
+
+
+async def run(mock: MockCallStatic, url: str, path: str, mints: list, concurrency: int) -> float:
+    index = HolderIndex(path, url, token="", page_limit=1000, concurrency=concurrency)
+    requests = mock.requests
+    start = time.perf_counter()
+    await index.update(mints)
+    elapsed = time.perf_counter() - start
+    print(f"concurrency {concurrency}: {len(mints)} mints, {mock.requests - requests} requests "
+          f"({index.counters['retries']} retried 429s), {index.counters['trades_new']} trades in {elapsed:.2f}s")
+    await index.close()
+    return elapsed
+
+
+def check(index: HolderIndex, mock: MockCallStatic, mints: list):
+    for mint in mints:
+        truth = mock.balances(mint)
+        top = index.top_holders(mint, len(truth) + 1)
+        assert dict(top) == truth, mint
+        assert index.holder_count(mint) == len(truth)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Holder index over the mock CallStatic API")
+    parser.add_argument("--mints", type=int, default=8)
+    parser.add_argument("--trades", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.03, help="Mock seconds per request")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    mock = MockCallStatic(args.trades, latency=args.latency, throttle_rate=0.02)
+    url = await mock.serve()
+    mints = [str(Pubkey.new_unique()) for _ in range(args.mints)]
+    with tempfile.TemporaryDirectory() as directory:
+        serial = await run(mock, url, os.path.join(directory, "serial.db"), mints, 1)
+        path = os.path.join(directory, "holders.db")
+        pooled = await run(mock, url, path, mints, args.concurrency)
+        print(f"speedup {serial / pooled:.1f}x")
+
+        index = HolderIndex(path, url, token="", concurrency=args.concurrency)
+        check(index, mock, mints)
+        traders = {t["user"] for t in mock.trades[mints[0]]}
+        print(f"{mints[0][:8]}: {index.holder_count(mints[0])} holders with balance > 0 "
+              f"(old count, anyone who traded: {len(traders)}) {index.concentration(mints[0])}")
+
+        for mint in mints:
+            mock.append(mint, args.trades // 3)
+        requests = mock.requests
+        start = time.perf_counter()
+        new = await index.update(mints)
+        print(f"incremental: {sum(new.values())} new trades, {mock.requests - requests} requests "
+              f"in {time.perf_counter() - start:.2f}s")
+        assert all(count == args.trades // 3 for count in new.values()), new
+        check(index, mock, mints)
+        print("balances match the mock after both runs")
+
+        broken = str(Pubkey.new_unique())
+        mock.broken.add(broken)
+        errors = index.counters["errors"]
+        assert (await index.update([broken])) == {broken: -1} and index.counters["errors"] == errors + 1
+        print("a page that is not JSON fails that mint only")
+        await index.close()
+    mock.server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solders.pubkey import Pubkey
+
+import main_fun
+from block_stream import decode_block_instructions
+from bonding_curve import BondingCurveState
+from log_events import decode_log_events
+
+from fixtures import block_notification, create_event_data, create_instruction_data, curve_account_data, \
+    routed_trade_logs, trade_logs
+
+# Microbenchmarks for the decoding / pricing hot paths. Each stage reports ops/sec and
+# per-call p50/p99; `--save` stores them in baselines.json and later runs compare against
+# it and exit non-zero on a regression.
+# Absolute timings only mean something on the machine that recorded them, so every stage is
+# also expressed relative to REFERENCE, a fixed pure-Python workload (arithmetic plus the
+# dict / list / str allocation the decoders do) measured right before it, and the comparison
+# uses that ratio: a faster, slower or busier host moves both alike. Both are measured in
+# `--repeats` rounds and the fastest round of each is kept. --save records the median ratio of
+# --save-passes such measurements and their spread, which is added to --tolerance for that
+# stage (up to twice --tolerance in all), and a stage over its limit is measured again --confirm times,
+# after the whole pass, before it counts as a regression.
+# Ratios still differ between Python versions / implementations, so a baseline saved under a
+# different interpreter is refused (re-run with --save there).
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+BLOCK_SIZES = (50, 500, 2000)
+REFERENCE = "reference[python mix]"
+
+
+def _reference():
+    total = 0
+    rows = []
+    for i in range(500):
+        total += i * i % 7
+        rows.append({"slot": i, "key": str(i), "data": [i, total]})
+    return total, rows
+
+
+def host() -> dict:
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "machine": platform.machine(), "processor": platform.processor() or platform.machine()}
+
+
+def measure(fn, min_time: float = 0.5, min_runs: int = 5, max_runs: int = 200_000,
+            min_sample_ns: int = 20_000) -> dict:
+    """
+    Per-call p50 / p99. Calls faster than `min_sample_ns` are timed in batches
+    of `number` calls per sample, so the timer's own cost and resolution do not
+    swamp sub-microsecond stages (p99 is then of batch means).
+    """
+    perf = time.perf_counter_ns
+    t = perf()
+    fn()
+    number = max(1, min_sample_ns // max(perf() - t, 1))
+    calls = range(number)
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() < deadline):
+        t = perf()
+        for _ in calls:
+            fn()
+        samples.append((perf() - t) / number)
+    samples.sort()
+    total = sum(samples) / 1e9
+    return {
+        "runs": len(samples) * number,
+        "ops_per_sec": len(samples) / total if total else 0.0,
+        "p50_us": samples[len(samples) // 2] / 1e3,
+        "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1e3,
+    }
+
+
+def stages() -> dict:
+    create_event = create_event_data()
+    create_ix = create_instruction_data()
+    ix_accounts = [str(Pubkey.new_unique()) for _ in range(14)]
+    curve_data = curve_account_data()
+    state = BondingCurveState(curve_data)
+    logs = trade_logs(Pubkey.new_unique())
+    mint = Pubkey.new_unique()
+    routed = decode_log_events(routed_trade_logs(mint, Pubkey.new_unique()), 1, "sig")
+    # only the event pump.fun itself logged, not the router's look-alikes around the CPI
+    assert [str(e.fields["mint"]) for e in routed] == [str(mint)], routed
+
+    result = {
+        "parse_create_instruction": lambda: main_fun.parse_create_instruction(create_event),
+        "decode_create_instruction": lambda: main_fun.decode_create_instruction(create_ix, main_fun.create_instruction, ix_accounts),
+        "BondingCurveState": lambda: BondingCurveState(curve_data),
+        "calculate_pump_curve_price": lambda: main_fun.calculate_pump_curve_price(state),
+        "decode_log_events[trade tx]": lambda: decode_log_events(logs, 1, "sig"),
+    }
+    for n in BLOCK_SIZES:
+        frame = block_notification(n)
+        value = json.loads(frame)["params"]["result"]["value"]
+        result[f"block_json_parse[{n} txs]"] = lambda frame=frame: json.loads(frame)
+        result[f"block_decode[{n} txs]"] = lambda value=value: decode_block_instructions(value["block"], value["slot"], ("create", "buy", "sell"))
+    return result
+
+
+def run_stage(fn, repeats: int, min_time: float) -> dict:
+    """`repeats` rounds of (reference, stage); the fastest of each, as timeit takes the min."""
+    rounds, references = [], []
+    for _ in range(repeats):
+        references.append(measure(_reference, min_time / repeats / 4)["p50_us"])
+        rounds.append(measure(fn, min_time / repeats))
+    r = dict(min(rounds, key=lambda s: s["p50_us"]))
+    r["reference_p50_us"] = min(references)
+    r["relative"] = r["p50_us"] / r["reference_p50_us"]
+    p50s = sorted(s["p50_us"] for s in rounds)
+    r["spread"] = (p50s[len(p50s) // 2] - p50s[0]) / p50s[0]  # median round vs the fastest
+    return r
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decoding / pricing microbenchmarks")
+    parser.add_argument("--save", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown vs. baseline")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds per stage, split over the repeats")
+    parser.add_argument("--repeats", type=int, default=5, help="Rounds per stage; the fastest is kept")
+    parser.add_argument("--confirm", type=int, default=2, help="Re-measure a stage over its limit this many times")
+    parser.add_argument("--save-passes", type=int, default=5, help="Passes per stage behind a saved baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+    this_host = host()
+    if not args.save and baseline:
+        saved = baseline.get("host", {})
+        if "stages" not in baseline or any(saved.get(key) != this_host[key] for key in ("python", "implementation")):
+            print(f"❌ {BASELINE_PATH} was saved on {saved or 'an older format'}, this is {this_host}; "
+                  f"re-run with --save to record a baseline here")
+            sys.exit(2)
+        if saved != this_host:
+            print(f"note: baseline from another host ({saved}); comparing ratios to {REFERENCE}")
+    stages_baseline = baseline.get("stages", {})
+
+    results = {}
+    suspects = {}
+    all_stages = stages()
+    print(f"{'stage':34s} {'ops/sec':>12s} {'p50 us':>10s} {'p99 us':>10s} {'x ref':>8s} {'spread':>7s}  vs baseline")
+    for name, fn in all_stages.items():
+        if args.save:  # a typical run, not a lucky one: median of several passes, spread across them
+            passes = sorted((run_stage(fn, args.repeats, args.min_time) for _ in range(args.save_passes)),
+                            key=lambda p: p["relative"])
+            r = dict(passes[len(passes) // 2])
+            r["spread"] = (passes[-1]["relative"] - passes[0]["relative"]) / r["relative"]
+        else:
+            r = run_stage(fn, args.repeats, args.min_time)
+        results[name] = r
+        note = ""
+        if name in stages_baseline:
+            saved = stages_baseline[name]
+            allowed = args.tolerance + min(saved.get("spread", 0), args.tolerance)  # noisier stages get more room
+            ratio = r["relative"] / saved["relative"]
+            note = f"{ratio:5.2f}x (allowed {1 + allowed:.2f}x)"
+            if ratio > 1 + allowed:
+                note += "  over, re-checked at the end"
+                suspects[name] = (ratio, allowed)
+        print(f"{name:34s} {r['ops_per_sec']:12,.0f} {r['p50_us']:10.2f} {r['p99_us']:10.2f} {r['relative']:8.3g} "
+              f"{r['spread']:6.0%}  {note}")
+
+    # slow spells of the host last a while: re-measure suspects after the whole pass, not right away
+    for _ in range(args.confirm):
+        for name, (ratio, allowed) in list(suspects.items()):
+            r = run_stage(all_stages[name], args.repeats, args.min_time)
+            ratio = min(ratio, r["relative"] / stages_baseline[name]["relative"])
+            if ratio <= 1 + allowed:
+                del suspects[name]
+            else:
+                suspects[name] = (ratio, allowed)
+    regressions = []
+    for name, (ratio, allowed) in suspects.items():
+        print(f"REGRESSION {name}: {ratio:.2f}x the baseline (allowed {1 + allowed:.2f}x)")
+        regressions.append(name)
+
+    if args.save:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"reference": REFERENCE, "host": this_host, "stages": results}, f, indent=2)
+        print(f"baseline saved to {BASELINE_PATH}")
+    elif regressions:
+        print(f"❌ {len(regressions)} stage(s) slower than baseline beyond their tolerance, "
+              f"confirmed {args.confirm} more time(s)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
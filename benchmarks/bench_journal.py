@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+
+from trade_journal import JournalReader, JournalWriter
+
+# Cost on the event loop per trade record: the old log_trade (open + json.dump +
+# close per call) vs JournalWriter.append, plus writer throughput with batched
+# fsync and readback by mint / time range from the segment indexes.
+
+
+def old_log_trade(path: str, mint: str, signature: str):
+    with open(path, 'a') as log_file:
+        json.dump({"timestamp": time.time(), "action": "buy", "token_address": mint, "price": 1e-8,
+                   "tx_hash": signature}, log_file)
+        log_file.write("\n")
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return f"p50 {statistics.median(samples) * 1e6:8.1f} us  p99 {p99 * 1e6:8.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trade journal append latency and throughput")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--mints", type=int, default=200)
+    parser.add_argument("--segment-bytes", type=int, default=256 * 1024)
+    args = parser.parse_args()
+
+    mints = [str(Pubkey.new_unique()) for _ in range(args.mints)]
+    signature = str(Signature.new_unique())
+    with tempfile.TemporaryDirectory() as directory:
+        samples = []
+        for i in range(min(args.records, 2000)):
+            start = time.perf_counter()
+            old_log_trade(os.path.join(directory, "trades.log"), mints[i % len(mints)], signature)
+            samples.append(time.perf_counter() - start)
+        print(f"{'old log_trade':16s} {percentiles(samples)}")
+
+        journal = JournalWriter(os.path.join(directory, "journal"), segment_bytes=args.segment_bytes, jsonl_path=None)
+        samples = []
+        first = time.time()
+        began = time.perf_counter()
+        for i in range(args.records):
+            start = time.perf_counter()
+            journal.append("fill", mints[i % len(mints)], side="buy", signature=signature, lamports=100_000,
+                           tokens=3_500_000_000)
+            samples.append(time.perf_counter() - start)
+        journal.close()
+        elapsed = time.perf_counter() - began
+        last = time.time()
+        stats = journal.stats()
+        print(f"{'journal.append':16s} {percentiles(samples)}")
+        print(f"wrote {stats['records']} records / {stats['bytes'] / 1e6:.2f} MB in {elapsed:.2f}s "
+              f"({stats['records'] / elapsed:,.0f}/s), {stats['fsyncs']} fsyncs, {stats['segments']} segments, "
+              f"max batch {stats['max_batch']}")
+        # every segment is fsynced before it is rotated out, the last one on close
+        assert stats["fsyncs"] >= stats["segments"], stats
+
+        reader = JournalReader(os.path.join(directory, "journal"))
+        start = time.perf_counter()
+        count = sum(1 for _ in reader.records(mint=mints[0]))
+        print(f"by mint: {count} records in {(time.perf_counter() - start) * 1e3:.1f} ms")
+        assert count == len(range(0, args.records, len(mints)))
+        middle = first + (last - first) / 2
+        start = time.perf_counter()
+        count = sum(1 for _ in reader.records(start=middle))
+        print(f"by time: {count} records in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
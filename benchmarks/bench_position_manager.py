@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+import position_manager
+from bonding_curve import BondingCurveState
+from position_manager import ABANDONED, FAILED, OPEN, PositionManager
+from tx_builder import BlockhashCache, PumpTxBuilder
+
+from fixtures import curve_account_data
+
+# PositionManager entry against a stand-in curve cache and send: a curve the node does
+# not serve on the first read, a buy whose confirmation timed out but landed, one that
+# failed on chain and one whose outcome is unknown. Then create -> buy sent latency.
+
+
+class FakeCurves:
+    """curve_cache stand-in: each curve is missing for its first `misses` reads."""
+
+    def __init__(self, misses: int = 0):
+        self.state = BondingCurveState(curve_account_data())
+        self.misses = misses
+        self.reads = {}
+
+    async def get(self, curve):
+        self.reads[curve] = self.reads.get(curve, 0) + 1
+        return self.state if self.reads[curve] > self.misses else None
+
+    def peek(self, curve):
+        return self.state if self.reads.get(curve, 0) > self.misses else None
+
+
+def create_args() -> dict:
+    return {"mint": str(Pubkey.new_unique()), "bondingCurve": str(Pubkey.new_unique()),
+            "associatedBondingCurve": str(Pubkey.new_unique()), "symbol": "PBT"}
+
+
+async def scenario(curves: FakeCurves, confirmed: bool, status=None, balance=None):
+    position_manager.get_curve_cache = lambda: curves
+
+    async def send(tx, stage):
+        return str(tx.signatures[0]) if confirmed else None
+
+    async def get_status(signature):
+        return status
+
+    async def get_balance(mint):
+        return balance
+
+    manager = PositionManager(max_capital=1, marry=True, send=send, status=get_status, balance=get_balance)
+    position = await manager.open(create_args())
+    await manager.wait_closed(position)
+    return manager, position
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="PositionManager entry paths")
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    blockhashes = BlockhashCache()
+    blockhashes.set(Hash.default())
+    builder = PumpTxBuilder(Keypair(), blockhashes)
+    position_manager.get_tx_builder = lambda: builder
+    position_manager.ENTRY_CURVE_RETRY_DELAY = 0
+
+    manager, position = await scenario(FakeCurves(misses=1), confirmed=True)
+    assert position.state == OPEN and manager.counters["curve_retries"] == 1, (position.state, manager.counters)
+    print("curve missing on the first read: retried, position open")
+
+    manager, position = await scenario(FakeCurves(misses=position_manager.ENTRY_CURVE_RETRIES + 1), confirmed=True)
+    assert position.state == FAILED, position.state
+    print(f"curve never served: failed after {position_manager.ENTRY_CURVE_RETRIES} retries")
+
+    manager, position = await scenario(FakeCurves(), confirmed=False, status=None, balance=123)
+    assert position.state == OPEN and position.token_amount == 123 and manager.counters["late_fills"] == 1
+    print("buy unconfirmed but tokens arrived: position open with the real balance")
+
+    manager, position = await scenario(FakeCurves(), confirmed=False, status=False)
+    assert position.state == FAILED, position.state
+    print("buy failed on chain: failed")
+
+    manager, position = await scenario(FakeCurves(), confirmed=False, status=None, balance=None)
+    assert position.state == ABANDONED and manager.counters["abandoned"] == 1, position.state
+    print("buy outcome unknown: abandoned and reported")
+
+    curves = FakeCurves()
+    position_manager.get_curve_cache = lambda: curves
+    sent = []
+
+    async def send(tx, stage):
+        sent.append(time.perf_counter())
+        return str(tx.signatures[0])
+
+    manager = PositionManager(max_positions=args.runs, max_capital=args.runs, marry=True, send=send)
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):  # one fill line per position otherwise
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            position = await manager.open(create_args())
+            await manager.wait_closed(position)
+            samples.append(sent[-1] - start)
+    samples.sort()
+    print(f"create -> buy sent  p50 {statistics.median(samples) * 1e6:7.1f} us  "
+          f"p99 {samples[int(len(samples) * 0.99)] * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solders.pubkey import Pubkey
+
+from block_stream import decode_block_instructions
+from pump_decoder import get_decoder
+from token_filter import TokenFilter
+
+from fixtures import block_notification, create_instruction_data
+
+# Watchlist of hundreds of patterns and creators against raw create instructions:
+# the compiled filter on the raw bytes vs the old path (decode, base58 every
+# account, then one lower()+substring test per pattern). Also checks both agree.
+
+ACCOUNTS = bytes(range(14))
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 8)))
+
+
+def naive_match(args: dict, patterns: list, negatives: list, creators: set) -> bool:
+    text = (args['name'].lower(), args['symbol'].lower())
+    if any(p in t for p in negatives for t in text):
+        return False
+    if creators and args['user'] not in creators:
+        return False
+    return any(p in t for p in patterns for t in text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watchlist filter on raw create instructions")
+    parser.add_argument("--patterns", type=int, default=500)
+    parser.add_argument("--creators", type=int, default=200)
+    parser.add_argument("--creates", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    patterns = sorted({random_word(rng) for _ in range(args.patterns)})
+    negatives = ["rug", "scam"]
+    creators = [Pubkey.new_unique() for _ in range(args.creators)]
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("# benchmark watchlist\n" + "".join(f"{p}\n" for p in patterns)
+                + "".join(f"!{p}\n" for p in negatives) + "".join(f"creator:{c}\n" for c in creators))
+        path = f.name
+    started = time.perf_counter()
+    token_filter = TokenFilter(path)
+    print(f"compiled {len(patterns) + len(negatives)} patterns ({token_filter.compiled.automaton.states} states) "
+          f"and {len(creators)} creators in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    creates = []
+    for i in range(args.creates):
+        words = [random_word(rng) for _ in range(3)] + ([rng.choice(patterns)] if rng.random() < 0.3 else [])
+        if rng.random() < 0.05:
+            words.append(rng.choice(negatives))
+        rng.shuffle(words)
+        keys = [Pubkey.new_unique() for _ in range(14)]
+        if rng.random() < 0.5:
+            keys[7] = rng.choice(creators)
+        creates.append((create_instruction_data(" ".join(words).title(), words[0][:4].upper()), keys))
+
+    layout = get_decoder().instruction('create')
+    creator_set = {str(c) for c in creators}
+
+    def old_path(data, keys):
+        decoded = layout.decode(data)
+        decoded.update(layout.name_accounts([str(keys[i]) for i in ACCOUNTS]))
+        return naive_match(decoded, patterns, negatives, creator_set)
+
+    expected = [old_path(data, keys) for data, keys in creates]
+    got = [token_filter.match_instruction(data, keys, ACCOUNTS) for data, keys in creates]
+    assert got == expected, sum(a != b for a, b in zip(got, expected))
+    print(f"{sum(got)}/{len(got)} creates pass, filter agrees with the naive check")
+
+    for name, fn in (("decode + naive", old_path), ("raw filter", lambda d, k: token_filter.match_instruction(d, k, ACCOUNTS))):
+        samples = []
+        for data, keys in creates:
+            start = time.perf_counter()
+            fn(data, keys)
+            samples.append(time.perf_counter() - start)
+        print(f"{name:16s} p50 {statistics.median(samples) * 1e6:7.1f} us  "
+              f"{len(samples) / sum(samples):>10,.0f} creates/s")
+
+    block = json.loads(block_notification(400, create_ratio=0.5))["params"]["result"]["value"]["block"]
+    for name, kwargs in (("block, no filter", {}), ("block, filtered", {"token_filter": token_filter})):
+        start = time.perf_counter()
+        events = decode_block_instructions(block, 1, ('create',), **kwargs)
+        print(f"{name:16s} {(time.perf_counter() - start) * 1e3:7.2f} ms, {len(events)} creates decoded")
+    print(token_filter.stats())
+    os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
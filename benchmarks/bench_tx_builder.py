@@ -0,0 +1,74 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+from bonding_curve import BondingCurveState
+from pump_decoder import get_decoder
+from tx_builder import BlockhashCache, PumpTxBuilder
+
+from fixtures import curve_account_data
+
+# create event args (base58 strings, as block_stream yields them) -> signed buy
+# transaction bytes, for a mint seen for the first time (ATA derived) and again
+# (ATA cached). Also checks the result decodes as a pump.fun buy.
+
+
+def create_args() -> dict:
+    return {"mint": str(Pubkey.new_unique()), "bondingCurve": str(Pubkey.new_unique()),
+            "associatedBondingCurve": str(Pubkey.new_unique())}
+
+
+def event_to_bytes(builder: PumpTxBuilder, args: dict, state: BondingCurveState) -> bytes:
+    tx, _ = builder.buy_for_sol(Pubkey.from_string(args["mint"]), Pubkey.from_string(args["bondingCurve"]),
+                                Pubkey.from_string(args["associatedBondingCurve"]), state, 100_000, 0.2)
+    return bytes(tx)
+
+
+def measure(fn, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create event -> signed pump.fun buy transaction bytes")
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    blockhashes = BlockhashCache()
+    blockhashes.set(Hash.new_unique())
+    builder = PumpTxBuilder(Keypair(), blockhashes)
+    state = BondingCurveState(curve_account_data())
+
+    raw = event_to_bytes(builder, create_args(), state)
+    from solders.transaction import VersionedTransaction
+    message = VersionedTransaction.from_bytes(raw).message
+    name, fields = get_decoder().decode_instruction(bytes(message.instructions[-1].data))
+    assert name == "buy" and fields["amount"] > 0, (name, fields)
+    print(f"buy tx: {len(raw)} bytes, {len(message.instructions)} instructions")
+
+    cached = create_args()
+    event_to_bytes(builder, cached, state)
+    cases = {
+        "new mint (ATA derived)": lambda: event_to_bytes(builder, create_args(), state),
+        "cached ATA": lambda: event_to_bytes(builder, cached, state),
+    }
+    for name, fn in cases.items():
+        samples = measure(fn, args.runs)
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"{name:24s} p50 {statistics.median(samples) * 1e6:8.1f} us  p99 {p99 * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import base64
+import json
+import os
+import random
+import struct
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solders.hash import Hash
+from solders.instruction import AccountMeta, Instruction
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.transaction import VersionedTransaction
+
+from bonding_curve import EXPECTED_DISCRIMINATOR
+from config import PUMP_PROGRAM, PUMP_GLOBAL, PUMP_FEE, PUMP_EVENT_AUTHORITY, SYSTEM_PROGRAM, \
+    SYSTEM_TOKEN_PROGRAM, SYSTEM_RENT
+from pump_decoder import get_decoder
+
+# Synthetic but realistic pump.fun traffic for the benchmarks: full-detail base64
+# blockNotification frames, create/trade payloads with long metadata URIs, curve accounts.
+
+COMPUTE_BUDGET_PROGRAM = Pubkey.from_string("ComputeBudget111111111111111111111111111111")
+LONG_URI = "https://ipfs.io/ipfs/" + "Qm" + "x" * 44 + "/metadata.json?" + "&".join(f"k{i}=v{i}" for i in range(20))
+
+
+def borsh_string(value: str) -> bytes:
+    raw = value.encode()
+    return struct.pack("<I", len(raw)) + raw
+
+
+def create_instruction_data(name="Pump Benchmark Token", symbol="PBT", uri=LONG_URI) -> bytes:
+    return get_decoder().instruction("create").discriminator + borsh_string(name) + borsh_string(symbol) + borsh_string(uri)
+
+
+def create_event_data(name="Pump Benchmark Token", symbol="PBT", uri=LONG_URI) -> bytes:
+    return (get_decoder().event("CreateEvent").discriminator + borsh_string(name) + borsh_string(symbol)
+            + borsh_string(uri) + bytes(Pubkey.new_unique()) + bytes(Pubkey.new_unique()) + bytes(Pubkey.new_unique()))
+
+
+def trade_event_data(mint: Pubkey, is_buy=True) -> bytes:
+    return (get_decoder().event("TradeEvent").discriminator + bytes(mint)
+            + struct.pack("<QQ?", 100_000_000, 3_500_000_000_000, is_buy) + bytes(Pubkey.new_unique())
+            + struct.pack("<qQQ", 1_700_000_000, 31_000_000_000, 1_038_000_000_000_000))
+
+
+def curve_account_data() -> bytes:
+    return EXPECTED_DISCRIMINATOR + struct.pack("<QQQQQ?", 1_038_000_000_000_000, 31_000_000_000,
+                                                758_100_000_000_000, 1_000_000_000, 1_000_000_000_000_000, False) + bytes(32)
+
+
+def _transaction(kind: str, rng: random.Random) -> str:
+    payer = Pubkey.new_unique()
+    mint = Pubkey.new_unique()
+    curve = Pubkey.new_unique()
+    decoder = get_decoder()
+    budget = Instruction(COMPUTE_BUDGET_PROGRAM, bytes([2]) + struct.pack("<I", 200_000), [])
+
+    if kind == "create":
+        accounts = [mint, Pubkey.new_unique(), curve, Pubkey.new_unique(), PUMP_GLOBAL, Pubkey.new_unique(),
+                    Pubkey.new_unique(), payer, SYSTEM_PROGRAM, SYSTEM_TOKEN_PROGRAM, Pubkey.new_unique(),
+                    SYSTEM_RENT, PUMP_EVENT_AUTHORITY, PUMP_PROGRAM]
+        data = create_instruction_data(f"Token {rng.randrange(10**6)}", "TKN")
+    else:
+        accounts = [PUMP_GLOBAL, PUMP_FEE, mint, curve, Pubkey.new_unique(), Pubkey.new_unique(), payer,
+                    SYSTEM_PROGRAM, SYSTEM_TOKEN_PROGRAM, SYSTEM_RENT, PUMP_EVENT_AUTHORITY, PUMP_PROGRAM]
+        data = decoder.instruction(kind).discriminator + struct.pack("<QQ", rng.randrange(10**12), rng.randrange(10**9))
+
+    metas = [AccountMeta(k, k == payer, k not in (PUMP_PROGRAM, SYSTEM_PROGRAM)) for k in accounts]
+    message = MessageV0.try_compile(payer, [budget, Instruction(PUMP_PROGRAM, data, metas)], [], Hash.default())
+    tx = VersionedTransaction.populate(message, [Signature.new_unique()])
+    return base64.b64encode(bytes(tx)).decode()
+
+
+def block_notification(n_txs: int, slot: int = 300_000_000, create_ratio: float = 0.05, seed: int = 0) -> str:
+    """blockNotification frame (encoding base64, transactionDetails full) with n_txs pump.fun transactions."""
+    rng = random.Random(seed)
+    transactions = []
+    for _ in range(n_txs):
+        r = rng.random()
+        kind = "create" if r < create_ratio else ("buy" if r < 0.6 else "sell")
+        transactions.append({
+            "transaction": [_transaction(kind, rng), "base64"],
+            "meta": {"err": None, "fee": 5000, "logMessages": [], "preBalances": [], "postBalances": []},
+            "version": 0,
+        })
+    return json.dumps({
+        "jsonrpc": "2.0",
+        "method": "blockNotification",
+        "params": {
+            "subscription": 1,
+            "result": {
+                "context": {"slot": slot},
+                "value": {"slot": slot, "err": None,
+                          "block": {"blockhash": str(Hash.default()), "blockTime": 1_700_000_000,
+                                    "blockHeight": slot - 10, "transactions": transactions}},
+            },
+        },
+    })
+
+
+def trade_logs(mint: Pubkey) -> list:
+    return [
+        f"Program {PUMP_PROGRAM} invoke [1]",
+        "Program log: Instruction: Buy",
+        "Program data: " + base64.b64encode(trade_event_data(mint)).decode(),
+        f"Program {PUMP_PROGRAM} consumed 30000 of 200000 compute units",
+        f"Program {PUMP_PROGRAM} success",
+    ]
+
+
+def routed_trade_logs(mint: Pubkey, router: Pubkey) -> list:
+    """A router CPI-ing into pump.fun that logs a look-alike TradeEvent of its own before and after."""
+    own = "Program data: " + base64.b64encode(trade_event_data(Pubkey.new_unique())).decode()
+    return [f"Program {router} invoke [1]", own] + \
+        [log.replace("invoke [1]", "invoke [2]") for log in trade_logs(mint)] + \
+        [own, f"Program {router} consumed 60000 of 200000 compute units", f"Program {router} success"]
@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+
+# Local stand-in for the CallStatic trades/byToken API (holder_index, get_holders_from_trades):
+# keep-alive HTTP, oldest-first pages with an opaque cursor, `has_more`, optional per-request
+# latency and 429s. Every mint gets a deterministic trade history where sells never exceed
+# what the wallet holds, so balances() is the ground truth an indexer has to reproduce.
+# Trades are two-sided like the real records: the wallet on one side, the mint's bonding
+# curve on the other, plus `user` / `is_buy`. Some transactions hold several trades of a mint
+# (same signature), and mints in `broken` answer 200 with a body that is not JSON.
+
+PATH = "/pumpfun/v1/historical/trades/byToken"
+
+
+class MockCallStatic:
+    def __init__(self, trades_per_mint: int = 5000, wallets: int = 300, latency: float = 0.0,
+                 throttle_rate: float = 0.0, seed: int = 0):
+        self.trades_per_mint = trades_per_mint
+        self.wallets = [str(Pubkey.new_unique()) for _ in range(wallets)]
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.trades: Dict[str, List[dict]] = {}
+        self._holdings: Dict[str, Dict[str, int]] = {}
+        self.curves: Dict[str, str] = {}
+        self.broken = set()
+        self._rng = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+
+    def _history(self, mint: str) -> List[dict]:
+        if mint not in self.trades:
+            self.append(mint, self.trades_per_mint)
+        return self.trades[mint]
+
+    def append(self, mint: str, n: int):
+        """n more trades for `mint`, as if they just happened."""
+        trades = self.trades.setdefault(mint, [])
+        holdings = self._holdings.setdefault(mint, {})
+        curve = self.curves.setdefault(mint, str(Pubkey.new_unique()))
+        rng = self._rng
+        for _ in range(n):
+            wallet = rng.choice(self.wallets)
+            held = holdings.get(wallet, 0)
+            if held and rng.random() < 0.4:
+                amount = held if rng.random() < 0.5 else rng.randint(1, held)  # half the sells exit fully
+                trade = {"buyer": curve, "seller": wallet, "is_buy": False, "token_amount": amount}
+                holdings[wallet] = held - amount
+            else:
+                amount = rng.randint(1_000_000, 50_000_000_000)
+                trade = {"buyer": wallet, "seller": curve, "is_buy": True, "token_amount": amount}
+                holdings[wallet] = held + amount
+            # one in ten trades shares the previous trade's transaction (a bundle / multi-buy)
+            signature = trades[-1]["signature"] if trades and rng.random() < 0.1 else str(Signature.new_unique())
+            trade.update(user=wallet, signature=signature, timestamp=1_700_000_000 + len(trades), token=mint)
+            trades.append(trade)
+
+    def balances(self, mint: str) -> Dict[str, int]:
+        """Wallet balances; the curve's own holdings come from the create, not from trades."""
+        self._history(mint)
+        return {wallet: amount for wallet, amount in self._holdings[mint].items() if amount > 0}
+
+    def page(self, mint: str, cursor: Optional[str], limit: int) -> dict:
+        trades = self._history(mint)
+        start = int(cursor, 16) if cursor else 0
+        data = trades[start:start + limit]
+        end = start + len(data)
+        has_more = end < len(trades)
+        return {"success": True, "data": data, "has_more": has_more, "cursor": format(end, "x") if has_more else None}
+
+    async def _respond(self, target: str):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        url = urlsplit(target)
+        if url.path != PATH:
+            return "404 Not Found", {"success": False, "error": "not found"}
+        if self.throttle_rate and self._rng.random() < self.throttle_rate:
+            self.throttled += 1
+            return "429 Too Many Requests", {"success": False, "error": "rate limited"}
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if query["token"] in self.broken:
+            return "200 OK", b"<html>502 Bad Gateway</html>"
+        return "200 OK", self.page(query["token"], query.get("cursor"), min(int(query.get("limit", 100)), 1000))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:  # keep-alive: many requests per connection
+                request = await reader.readuntil(b"\r\n\r\n")
+                target = request.split(b" ", 2)[1].decode()
+                status, payload = await self._respond(target)
+                body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving; returns the trades URL to give holder_index."""
+        self.server = await asyncio.start_server(self._handle, host, port)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}{PATH}"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Serve a mock CallStatic trades API")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--trades", type=int, default=5000, help="Trades per mint")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    args = parser.parse_args()
+    mock = MockCallStatic(args.trades, latency=args.latency)
+    url = await mock.serve(port=args.port)
+    print(f"python get_holders_from_trades.py <mint> --url {url}")
+    await mock.server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterable, Optional, Tuple
+
+import websockets
+
+from block_stream import PumpInstruction, SUBSCRIBE_REQUEST_ID, block_subscribe_message, decode_block_instructions
+from config import WSS_ENDPOINT, PUMP_PROGRAM, BLOCK_DECODE_WORKERS, BLOCK_PIPELINE_MAX_INFLIGHT
+from metrics import observe, register_collector
+from pump_decoder import get_decoder
+from seen_index import NS_BLOCK, get_seen_index
+from slot_backfill import SlotBackfiller, SlotGapTracker
+from subscription_manager import ssl_context
+
+# 多行程解碼: 事件迴圈只收 frame，json.loads / base64 / VersionedTransaction.from_bytes
+# 都交給 decoder 行程池，結果依收到的順序 (= 節點推送的 slot 順序) 合併回來。
+# 這條連線不走 subscription_manager: 共用連線會在事件迴圈上 json.loads 每個 frame。
+
+# blockNotification frames start with {"jsonrpc":"2.0","method":"blockNotification",...
+# so the receiver can route them without parsing the (multi-MB) body
+_NOTIFICATION_MARKER = '"blockNotification"'
+_MARKER_WINDOW = 96
+_LATENCY_SAMPLES = 2048
+
+
+def _init_worker():
+    get_decoder()  # compile the IDL once per process, not on the first block
+
+
+def decode_block_frame(frame: str, include: Tuple[str, ...]):
+    """Worker side: full blockNotification frame -> (subscription, slot, block_time, instructions, start, end)."""
+    started = time.time()
+    params = json.loads(frame)['params']
+    value = params['result']['value']
+    block = value.get('block')
+    events = decode_block_instructions(block, value['slot'], include) if block else []
+    return params.get('subscription'), value['slot'], (block or {}).get('blockTime'), events, started, time.time()
+
+
+def decode_backfilled_block(block: dict, slot: int, include: Tuple[str, ...]):
+    """Worker side: getBlock result -> the same tuple as decode_block_frame, events marked late."""
+    started = time.time()
+    events = decode_block_instructions(block, slot, include, late=True)
+    return None, slot, block.get('blockTime'), events, started, time.time()
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"p50_ms": 0.0, "p99_ms": 0.0}
+    ordered = sorted(samples)
+    return {
+        "p50_ms": ordered[len(ordered) // 2] * 1e3,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e3,
+    }
+
+
+class BlockPipeline:
+    """
+    blockSubscribe (full, base64) with decoding spread over `workers` processes.
+
+    receiver (event loop) -> bounded in-flight queue -> decoder pool -> in-order merge -> consumer
+
+    At most `max_inflight` blocks are queued or decoding; when the consumer or the
+    pool falls behind, the receiver stops reading and the backlog stays in the
+    socket instead of in memory. Per-stage lag (queue wait, decode, merge wait,
+    end-to-end, block age) is kept in stats().
+    """
+
+    def __init__(
+        self,
+        endpoint: str = WSS_ENDPOINT,
+        include: Iterable[str] = ('create',),
+        commitment: str = "confirmed",
+        workers: int = BLOCK_DECODE_WORKERS,
+        max_inflight: int = BLOCK_PIPELINE_MAX_INFLIGHT,
+        reconnect_delay: float = 5,
+    ):
+        self.endpoint = endpoint
+        self.include = tuple(include)
+        self.commitment = commitment
+        self.workers = max(1, workers)
+        self.max_inflight = max_inflight
+        self.reconnect_delay = reconnect_delay
+        self._inflight: Optional[asyncio.Queue] = None
+        self.counters = {"blocks_received": 0, "blocks_decoded": 0, "instructions": 0,
+                         "decode_errors": 0, "stale_subscription": 0, "duplicate_blocks": 0, "receiver_stalls": 0, "reconnects": 0}
+        self._lag = {stage: deque(maxlen=_LATENCY_SAMPLES)
+                     for stage in ("queue_wait", "decode", "merge_wait", "end_to_end", "block_age")}
+        self.last_slot = 0
+        self._gaps = SlotGapTracker()
+        self._backfiller = SlotBackfiller(commitment)
+        self._reconnected = False
+
+    async def _receive(self, pool: ProcessPoolExecutor):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                async with websockets.connect(self.endpoint, ssl=ssl_context if self.endpoint.startswith("wss") else None,
+                                              max_size=None, compression=None, ping_interval=20) as websocket:
+                    await websocket.send(block_subscribe_message(commitment=self.commitment))
+                    subscription_id = None
+
+                    async for frame in websocket:
+                        if _NOTIFICATION_MARKER not in frame[:_MARKER_WINDOW]:
+                            data = json.loads(frame)
+                            if data.get('id') == SUBSCRIBE_REQUEST_ID:
+                                if 'error' in data:
+                                    raise RuntimeError(f"blockSubscribe failed: {data['error']}")
+                                subscription_id = data.get('result')
+                                self._reconnected = self.counters["reconnects"] > 0
+                                print(f"Subscribed to blocks mentioning program: {PUMP_PROGRAM} "
+                                      f"(subscription {subscription_id}, {self.workers} decoder processes)")
+                            continue
+
+                        received = time.time()
+                        self.counters["blocks_received"] += 1
+                        future = loop.run_in_executor(pool, decode_block_frame, frame, self.include)
+                        if self._inflight.full():
+                            self.counters["receiver_stalls"] += 1
+                        await self._inflight.put((future, subscription_id, received))
+
+            except (websockets.exceptions.WebSocketException, OSError, asyncio.TimeoutError) as e:
+                self.counters["reconnects"] += 1
+                print(f"⚠️ WebSocket 連線中斷 ({e})，等待 {self.reconnect_delay} 秒後重新訂閱...")
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def stream(self) -> AsyncIterator[PumpInstruction]:
+        """
+        Yield every matching instruction, blocks in the order the node sent them.
+        Slots missed across a reconnect are backfilled through the same decoder
+        pool and merged in as they arrive, with `late=True`.
+        """
+        self._inflight = asyncio.Queue(maxsize=self.max_inflight)
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        receiver = asyncio.ensure_future(self._receive(pool))
+        seen = get_seen_index()
+        loop = asyncio.get_running_loop()
+        register_collector("pipeline", lambda: dict(self.counters, inflight=self._inflight.qsize()))
+
+        async def deliver(slot: int, block: dict):
+            future = loop.run_in_executor(pool, decode_backfilled_block, block, slot, self.include)
+            await self._inflight.put((future, None, time.time()))
+        try:
+            while True:
+                get = asyncio.ensure_future(self._inflight.get())
+                await asyncio.wait({get, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    get.cancel()
+                    receiver.result()  # receiver died (e.g. subscribe error): surface it
+                future, subscription_id, received = get.result()
+                try:
+                    subscription, slot, block_time, events, started, finished = await future
+                except (ValueError, KeyError, TypeError) as e:
+                    self.counters["decode_errors"] += 1
+                    print(f"❌ Block decode failed: {e}")
+                    continue
+
+                if subscription_id is not None and subscription != subscription_id:
+                    self.counters["stale_subscription"] += 1
+                    continue
+                if subscription is not None:  # live block, not a backfilled one
+                    gap = self._gaps.observe(slot, self._reconnected)
+                    self._reconnected = False
+                    if gap:
+                        self._backfiller.start(gap, deliver)
+                if seen.check_and_add(NS_BLOCK, slot):
+                    self.counters["duplicate_blocks"] += 1
+                    continue
+
+                now = time.time()
+                self.counters["blocks_decoded"] += 1
+                self.counters["instructions"] += len(events)
+                self.last_slot = max(self.last_slot, slot)
+                self._lag["queue_wait"].append(started - received)
+                self._lag["decode"].append(finished - started)
+                self._lag["merge_wait"].append(now - finished)
+                self._lag["end_to_end"].append(now - received)
+                if block_time:
+                    self._lag["block_age"].append(now - block_time)
+                observe("queue_wait", started - received)
+                observe("tx_decode", finished - started)
+                observe("merge_wait", now - finished)
+                if block_time and subscription is not None:
+                    observe("block_age", received - block_time)
+
+                for event in events:
+                    event.received = received
+                    yield event
+        finally:
+            self._backfiller.cancel()
+            receiver.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        stats = dict(self.counters, workers=self.workers, last_slot=self.last_slot,
+                     inflight=self._inflight.qsize() if self._inflight is not None else 0,
+                     backfill=self._backfiller.stats())
+        for stage, samples in self._lag.items():
+            stats[stage] = _percentiles(samples)
+        return stats
+
+
+def stream_pump_instructions_parallel(
+    endpoint: str = WSS_ENDPOINT,
+    include: Iterable[str] = ('create',),
+    commitment: str = "confirmed",
+    workers: int = BLOCK_DECODE_WORKERS,
+) -> AsyncIterator[PumpInstruction]:
+    """Drop-in for block_stream.stream_pump_instructions with decoding in `workers` processes."""
+    return BlockPipeline(endpoint, include, commitment, workers).stream()
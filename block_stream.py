@@ -0,0 +1,162 @@
+import base64
+import json
+import struct
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from solders.transaction import VersionedTransaction
+
+from config import WSS_ENDPOINT, PUMP_PROGRAM
+from metrics import observe
+from pump_decoder import get_decoder
+from seen_index import NS_BLOCK, get_seen_index
+from slot_backfill import SlotBackfiller, SlotGapTracker, late_notification
+from subscription_manager import block_subscribe_params, get_subscription_manager
+
+if TYPE_CHECKING:
+    from token_filter import TokenFilter
+
+# Accounts copied onto the decoded args (same keys decode_create_instruction has always returned)
+EXPOSED_ACCOUNTS = ('mint', 'bondingCurve', 'associatedBondingCurve', 'user')
+
+SUBSCRIBE_REQUEST_ID = 1
+
+
+@dataclass
+class PumpInstruction:
+    slot: int
+    signature: str
+    name: str            # create / buy / sell / ...
+    args: Dict[str, Any]  # decoded instruction args + EXPOSED_ACCOUNTS
+    tx_index: int
+    ix_index: int
+    late: bool = False   # backfilled after a slot gap (slot_backfill), not pushed live
+    received: float = 0.0  # wall clock the block arrived (websocket frame or getBlock response)
+
+
+def block_subscribe_message(program=PUMP_PROGRAM, commitment="confirmed", request_id=SUBSCRIBE_REQUEST_ID) -> str:
+    return json.dumps({
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "blockSubscribe",
+        "params": block_subscribe_params(program, commitment),
+    })
+
+
+def decode_block_instructions(block: dict, slot: int, include: Iterable[str] = ('create',),
+                              late: bool = False, token_filter: Optional["TokenFilter"] = None) -> List[PumpInstruction]:
+    """
+    Decode every pump.fun instruction in a blockNotification (or getBlock) block, in transaction order.
+    Only instructions whose IDL name is in `include` are returned; failed transactions are skipped.
+    Creates rejected by `token_filter` are dropped on the raw bytes, before any decoding
+    (handed to its on_reject as they are).
+    """
+    decoder = get_decoder()
+    include = frozenset(include)
+    instructions = decoder.instructions
+    events = []
+
+    for tx_index, tx in enumerate(block.get('transactions', [])):
+        if not isinstance(tx, dict) or 'transaction' not in tx:
+            continue
+        meta = tx.get('meta')
+        if meta and meta.get('err') is not None:
+            continue
+
+        transaction = VersionedTransaction.from_bytes(base64.b64decode(tx['transaction'][0]))
+        message = transaction.message
+        keys = message.account_keys
+        signature = None
+
+        for ix_index, ix in enumerate(message.instructions):
+            if keys[ix.program_id_index] != PUMP_PROGRAM:
+                continue
+            ix_data = bytes(ix.data)
+            layout = instructions.get(ix_data[:8])
+            if layout is None or layout.name not in include:
+                continue
+            if token_filter is not None and layout.name == 'create' and \
+                    not token_filter.match_instruction(ix_data, keys, ix.accounts):
+                if token_filter.on_reject is not None:
+                    token_filter.on_reject(ix_data, keys, ix.accounts, slot, transaction.signatures[0])
+                continue
+
+            account_keys = [str(keys[index]) for index in ix.accounts if index < len(keys)]
+            try:
+                args = layout.decode(ix_data)
+            except (struct.error, UnicodeDecodeError):
+                continue
+            named = layout.name_accounts(account_keys)
+            for name in EXPOSED_ACCOUNTS:
+                if name in named:
+                    args[name] = named[name]
+
+            if signature is None:
+                signature = str(transaction.signatures[0])
+            events.append(PumpInstruction(slot, signature, layout.name, args, tx_index, ix_index, late))
+
+    return events
+
+
+def decode_notification(result: dict, include: Iterable[str] = ('create',),
+                        token_filter: Optional["TokenFilter"] = None) -> List[PumpInstruction]:
+    """decode_block_instructions for one blockNotification result (live or backfilled), timing each stage."""
+    value = result['value']
+    block = value['block']
+    late = result.get('late', False)
+    received = result.get('received', 0.0)
+    if received:
+        observe("queue_wait", time.time() - received)
+        if not late and block.get('blockTime'):
+            observe("block_age", received - block['blockTime'])
+    started = time.perf_counter()
+    events = decode_block_instructions(block, value['slot'], include, late, token_filter)
+    observe("tx_decode", time.perf_counter() - started)
+    for event in events:
+        event.received = received
+    return events
+
+
+async def stream_pump_instructions(
+    endpoint: str = WSS_ENDPOINT,
+    include: Iterable[str] = ('create',),
+    commitment: str = "confirmed",
+    token_filter: Optional["TokenFilter"] = None,
+) -> AsyncIterator[PumpInstruction]:
+    """
+    Subscribe once to blocks mentioning PUMP_PROGRAM and yield every matching
+    instruction of every block, in order. The subscription lives on the shared
+    connection of subscription_manager, which resubscribes after a reconnect,
+    so callers just keep iterating; slots already handled (seen_index) are skipped.
+    Slots missed while disconnected are backfilled into the same queue and come
+    out with `late=True`.
+    """
+    include = frozenset(include)
+    seen = get_seen_index()
+    subscription = await get_subscription_manager(endpoint).block_subscribe(PUMP_PROGRAM, commitment)
+    print(f"Subscribed to blocks mentioning program: {PUMP_PROGRAM}")
+    gaps = SlotGapTracker()
+    backfiller = SlotBackfiller(commitment)
+    generation = 0
+
+    async def deliver(slot: int, block: dict):
+        await subscription.queue.put(late_notification(slot, block))
+
+    try:
+        async for result in subscription:
+            value = result['value']
+            block = value.get('block')
+            if not result.get('late'):
+                reconnected = generation != 0 and subscription.generation != generation
+                gap = gaps.observe(value['slot'], reconnected)
+                generation = subscription.generation
+                if gap:
+                    backfiller.start(gap, deliver)
+            if not block or seen.check_and_add(NS_BLOCK, value['slot']):
+                continue
+            for event in decode_notification(result, include, token_filter):
+                yield event
+    finally:
+        backfiller.cancel()
+        await subscription.close()
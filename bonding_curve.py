@@ -0,0 +1,90 @@
+import struct
+from typing import Final, Optional, Sequence
+
+# Bonding Curve 解析
+EXPECTED_DISCRIMINATOR: Final[bytes] = struct.pack("<Q", 6966180631402821399)
+CURVE_DISCRIMINATOR_U64: Final[int] = 6966180631402821399
+
+# discriminator (u64) + 5 x u64 reserves/supply + complete (bool) = 49 bytes.
+# Accounts may be longer (newer fields are appended), only the prefix is read.
+_LAYOUT = struct.Struct("<8xQQQQQ?")
+CURVE_STATE_SIZE: Final[int] = _LAYOUT.size
+
+_FIELDS = (
+    "virtual_token_reserves",
+    "virtual_sol_reserves",
+    "real_token_reserves",
+    "real_sol_reserves",
+    "token_total_supply",
+    "complete",
+)
+
+
+class BondingCurveState:
+    """Parsed BondingCurve account. `data` may be bytes or a memoryview; it is never sliced."""
+
+    __slots__ = _FIELDS
+
+    def __init__(self, data: bytes) -> None:
+        (
+            self.virtual_token_reserves,
+            self.virtual_sol_reserves,
+            self.real_token_reserves,
+            self.real_sol_reserves,
+            self.token_total_supply,
+            self.complete,
+        ) = _LAYOUT.unpack_from(data)
+
+    @classmethod
+    def from_fields(cls, virtual_token_reserves: int, virtual_sol_reserves: int, real_token_reserves: int,
+                    real_sol_reserves: int, token_total_supply: int, complete: bool) -> "BondingCurveState":
+        """Build a state from known values (e.g. derived from TradeEvents) instead of account bytes."""
+        state = cls.__new__(cls)
+        state.virtual_token_reserves = virtual_token_reserves
+        state.virtual_sol_reserves = virtual_sol_reserves
+        state.real_token_reserves = real_token_reserves
+        state.real_sol_reserves = real_sol_reserves
+        state.token_total_supply = token_total_supply
+        state.complete = complete
+        return state
+
+    def __repr__(self):
+        return "BondingCurveState(" + ", ".join(f"{f}={getattr(self, f)}" for f in _FIELDS) + ")"
+
+
+_CURVE_DTYPE = None
+
+
+def curve_dtype():
+    """NumPy structured dtype matching the raw account prefix (packed, little endian)."""
+    global _CURVE_DTYPE
+    if _CURVE_DTYPE is None:
+        import numpy as np
+        _CURVE_DTYPE = np.dtype([
+            ("discriminator", "<u8"),
+            ("virtual_token_reserves", "<u8"),
+            ("virtual_sol_reserves", "<u8"),
+            ("real_token_reserves", "<u8"),
+            ("real_sol_reserves", "<u8"),
+            ("token_total_supply", "<u8"),
+            ("complete", "?"),
+        ])
+    return _CURVE_DTYPE
+
+
+def parse_curve_states(buffers: Sequence[Optional[bytes]]):
+    """
+    Decode many raw BondingCurve accounts into one NumPy structured array, one row per buffer.
+    Missing (None) or short buffers become zero rows; filter with
+    `arr["discriminator"] == CURVE_DISCRIMINATOR_U64` to keep only valid curves.
+    """
+    import numpy as np
+
+    raw = bytearray(len(buffers) * CURVE_STATE_SIZE)
+    view = memoryview(raw)
+    offset = 0
+    for buf in buffers:
+        if buf is not None and len(buf) >= CURVE_STATE_SIZE:
+            view[offset:offset + CURVE_STATE_SIZE] = memoryview(buf)[:CURVE_STATE_SIZE]
+        offset += CURVE_STATE_SIZE
+    return np.frombuffer(raw, dtype=curve_dtype())
@@ -25,5 +25,101 @@ WSS_ENDPOINT = "wss://solana-mainnet.core.chainstack.com/846994ce033bba58f0a47c9
 RPC_ENDPOINT_2 = "https://solana-mainnet.core.chainstack.com/c2d7e05c4909f59843e6c38ef60ccae0"
 WSS_ENDPOINT_2 = "wss://solana-mainnet.core.chainstack.com/c2d7e05c4909f59843e6c38ef60ccae0"
 
+# Keep-alive connections per RPC endpoint in the shared client pool (rpc_pool.py)
+RPC_POOL_SIZES = {
+    RPC_ENDPOINT: 10,
+    RPC_ENDPOINT_2: 10,
+}
+
+# Requests per second each RPC endpoint allows (rate_limiter.py token buckets)
+RPC_RATE_LIMITS = {
+    RPC_ENDPOINT: 5,
+    RPC_ENDPOINT_2: 5,
+}
+
+# Bonding curve lookups arriving within this window are merged into one getMultipleAccounts call
+CURVE_BATCH_WINDOW = 0.005  # seconds
+CURVE_BATCH_MAX_KEYS = 100
+# The pooled clients default to "finalized", where a curve created a moment ago does not exist yet
+CURVE_FETCH_COMMITMENT = "processed"
+
+# accountSubscribe-backed bonding curve cache (curve_cache.py)
+CURVE_CACHE_MAX_ENTRIES = 1000
+CURVE_CACHE_TTL = 600  # seconds without a read before a curve is evicted and unsubscribed
+
+# Log-fed bonding curve reserves (curve_tracker.py): LRU beyond this many curves, and curves
+# with no event or read for TTL seconds are dropped (a later read falls back to RPC once)
+CURVE_TRACKER_MAX_ENTRIES = 20000
+CURVE_TRACKER_TTL = 1800
+
+# WebSocket connections per endpoint shared by every subscription (subscription_manager.py)
+WSS_CONNECTIONS = 1
+
+# Listeners subscribe on every endpoint here and keep whichever copy arrives first (stream_race.py);
+# a single entry turns racing off
+WSS_RACE_ENDPOINTS = (WSS_ENDPOINT, WSS_ENDPOINT_2)
+RACE_DEDUPE_WINDOW = 10000  # slots / signatures remembered while waiting for the slower endpoint
+
+# Seen slots / signatures / mints (seen_index.py): exact LRU + rotating Bloom filter within this budget
+SEEN_INDEX_MAX_BYTES = 16 * 1024 * 1024
+SEEN_INDEX_LRU_ENTRIES = 20000
+SEEN_INDEX_FP_RATE = 1e-5  # a false positive skips a genuinely new event, keep it tiny
+
+# blockSubscribe decoding (block_pipeline.py): processes decoding blocks; 0 = decode on the event loop
+BLOCK_DECODE_WORKERS = 0
+BLOCK_PIPELINE_MAX_INFLIGHT = 32  # blocks queued or decoding before the receiver stops reading
+
+# Slot gap backfill (slot_backfill.py): after a reconnect, or when this many slots go missing,
+# the missing blocks are fetched with getBlocks/getBlock and replayed as late events
+BACKFILL_MIN_GAP = 8
+BACKFILL_MAX_SLOTS = 750  # ~5 minutes of slots; older history is not worth replaying
+BACKFILL_CONCURRENCY = 8  # getBlock calls in flight (still bounded by RPC_RATE_LIMITS)
+
+# Prometheus text endpoint with stage latency histograms and counters (metrics.py); 0 disables it
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
+# pump.fun buy / sell transactions (tx_builder.py)
+COMPUTE_UNIT_LIMIT = 100_000
+PRIORITY_FEE_MICROLAMPORTS = 100_000  # per compute unit; 0 = no SetComputeUnitPrice instruction
+BLOCKHASH_REFRESH_INTERVAL = 2.0  # seconds between getLatestBlockhash calls in the background
+BLOCKHASH_MAX_AGE = 60.0  # refuse to sign with a blockhash older than this (valid for ~150 slots)
+ATA_CACHE_SIZE = 1000  # mints whose associated token account address is kept
+CONFIRM_TIMEOUT = 30.0  # seconds to wait for signatureSubscribe after sending
+
+# Concurrent positions (position_manager.py); exits fire on curve updates, not timers
+MAX_OPEN_POSITIONS = 5
+MAX_CAPITAL_SOL = 0.001  # SOL committed across all open positions
+TAKE_PROFIT = 0.5  # sell once a sell would return +50% of the SOL paid
+STOP_LOSS = 0.25  # ... or -25%
+TIME_STOP = 60.0  # seconds after entry to sell regardless
+SELL_RETRIES = 3
+ENTRY_CURVE_RETRIES = 5  # curve not visible to the RPC node yet: read it again ...
+ENTRY_CURVE_RETRY_DELAY = 0.4  # ... after about a slot
+
+# Trade journal (trade_journal.py): binary segments written off the event loop
+JOURNAL_DIR = "trades/journal"
+JOURNAL_SEGMENT_BYTES = 64 * 1024 * 1024  # start a new segment file past this size
+JOURNAL_FSYNC_INTERVAL = 0.2  # seconds between fsyncs while records are pending ...
+JOURNAL_FSYNC_BYTES = 1024 * 1024  # ... or sooner once this much is unsynced
+JOURNAL_JSONL = None  # e.g. "trades/trades.log" to also append every record as a JSON line
+JOURNAL_SYNC_TIMEOUT = 10.0  # longest sync() / close() wait for the writer thread
+
+# Token catalog (token_catalog.py): every create event seen, in SQLite
+CATALOG_PATH = "trades/catalog.db"
+CATALOG_BATCH_SIZE = 500  # rows per insert transaction ...
+CATALOG_FLUSH_INTERVAL = 0.5  # ... or commit whatever is queued after this many seconds
+CATALOG_FLUSH_TIMEOUT = 10.0  # longest flush() / close() wait for the writer thread
+
+# Watchlist filter (token_filter.py, trade.py --watchlist)
+WATCHLIST_RELOAD_INTERVAL = 2.0  # seconds between mtime checks of the watchlist file
+
+# Holder index (holder_index.py): net balances from the CallStatic trades API
+CALLSTATIC_TRADES_URL = "https://api.callstaticrpc.com/pumpfun/v1/historical/trades/byToken"
+HOLDER_INDEX_PATH = "trades/holders.db"
+HOLDER_PAGE_LIMIT = 1000  # trades per API page
+HOLDER_CONCURRENCY = 4  # mints paged at once (= pooled connections)
+HOLDER_REQUEST_RETRIES = 3  # on 429 / 5xx, with exponential backoff
+
 #Private key
 PRIVATE_KEY = "SOLANA_PRIVATE_KEY"
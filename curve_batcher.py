@@ -0,0 +1,110 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+from solders.pubkey import Pubkey
+
+from config import CURVE_BATCH_WINDOW, CURVE_BATCH_MAX_KEYS, CURVE_FETCH_COMMITMENT
+from metrics import register_collector
+from rate_limiter import get_rpc_limiter
+
+if TYPE_CHECKING:
+    from solana.rpc.async_api import AsyncClient
+
+# getMultipleAccounts accepts at most 100 keys per call
+MAX_KEYS_PER_CALL = 100
+
+Runner = Callable[[Callable[["AsyncClient"], Awaitable]], Awaitable]
+
+
+class AccountBatcher:
+    """
+    Coalesces account lookups that arrive within `window` seconds (or until
+    `max_batch` distinct keys are queued) into one getMultipleAccounts call and
+    fans the raw account data back out to every awaiting caller. Identical keys
+    that are already queued or in flight share the same request. Reads use
+    `commitment` (not the clients' finalized default), so fresh curves are seen.
+    """
+
+    def __init__(self, window: float = CURVE_BATCH_WINDOW, max_batch: int = CURVE_BATCH_MAX_KEYS,
+                 runner: Optional[Runner] = None, commitment: str = CURVE_FETCH_COMMITMENT):
+        self.window = window
+        self.commitment = commitment
+        self.max_batch = min(max_batch, MAX_KEYS_PER_CALL)
+        self._runner = runner
+        self._pending: Dict[Pubkey, asyncio.Future] = {}
+        self._inflight: Dict[Pubkey, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._fetches: Set[asyncio.Task] = set()  # keeps in-flight fetch tasks referenced
+        self.counters = {"lookups": 0, "deduped": 0, "rpc_calls": 0, "keys_fetched": 0}
+
+    @property
+    def runner(self) -> Runner:
+        # default: rate limited + load balanced over both RPC endpoints
+        return self._runner or get_rpc_limiter().run
+
+    async def get(self, pubkey: Pubkey) -> Optional[bytes]:
+        """Raw account data for `pubkey`, or None if the account does not exist."""
+        data, _ = await self.get_with_slot(pubkey)
+        return data
+
+    async def get_with_slot(self, pubkey: Pubkey) -> Tuple[Optional[bytes], int]:
+        """(raw account data or None, context slot of the getMultipleAccounts response)"""
+        self.counters["lookups"] += 1
+        fut = self._pending.get(pubkey) or self._inflight.get(pubkey)
+        if fut is not None:
+            self.counters["deduped"] += 1
+            return await asyncio.shield(fut)
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending[pubkey] = fut
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(fut)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._inflight.update(batch)
+        task = asyncio.ensure_future(self._fetch(batch))  # _fetch settles every future itself
+        self._fetches.add(task)
+        task.add_done_callback(self._fetches.discard)
+
+    async def _fetch(self, batch: Dict[Pubkey, asyncio.Future]):
+        keys: List[Pubkey] = list(batch)
+        self.counters["rpc_calls"] += 1
+        self.counters["keys_fetched"] += len(keys)
+        try:
+            response = await self.runner(lambda client: client.get_multiple_accounts(keys, self.commitment))
+            slot = response.context.slot
+            for key, account in zip(keys, response.value):
+                fut = batch[key]
+                if not fut.done():
+                    fut.set_result((account.data if account is not None else None, slot))
+        except Exception as e:
+            for fut in batch.values():
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            for key in keys:
+                if self._inflight.get(key) is batch[key]:
+                    del self._inflight[key]
+
+    def stats(self) -> dict:
+        return dict(self.counters, pending=len(self._pending), inflight=len(self._inflight))
+
+
+_BATCHER: Optional[AccountBatcher] = None
+
+
+def get_account_batcher() -> AccountBatcher:
+    global _BATCHER
+    if _BATCHER is None:
+        _BATCHER = AccountBatcher()
+        register_collector("curve_batcher", _BATCHER.stats)
+    return _BATCHER
@@ -0,0 +1,161 @@
+import asyncio
+import base64
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from solders.pubkey import Pubkey
+
+from bonding_curve import BondingCurveState, EXPECTED_DISCRIMINATOR
+from config import WSS_ENDPOINT, CURVE_CACHE_MAX_ENTRIES, CURVE_CACHE_TTL
+from curve_batcher import get_account_batcher
+from metrics import register_collector
+from subscription_manager import Subscription, get_subscription_manager
+from warmup import background
+
+
+class CurveEntry:
+    __slots__ = ("state", "slot", "last_access", "subscription")
+
+    def __init__(self, state: BondingCurveState, slot: int):
+        self.state = state
+        self.slot = slot
+        self.last_access = time.monotonic()
+        self.subscription: Optional[Subscription] = None
+
+
+class CurveCache:
+    """
+    In-memory BondingCurveState cache kept fresh by accountSubscribe.
+
+    - get() is a dict hit for watched curves; a miss does one batched fetch and
+      starts watching the curve.
+    - Updates are applied only if their slot is >= the cached one.
+    - Curves not read for `ttl` seconds, or beyond `max_entries` (LRU), are
+      evicted and unsubscribed, unless watched.
+    Subscriptions live on the shared subscription_manager connection; call run()
+    once in the background for TTL eviction. watch() registers a callback for
+    every accepted update of one curve (position exits react to it).
+    """
+
+    def __init__(self, endpoint: str = WSS_ENDPOINT, max_entries: int = CURVE_CACHE_MAX_ENTRIES,
+                 ttl: float = CURVE_CACHE_TTL, commitment: str = "processed"):
+        self.endpoint = endpoint
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.commitment = commitment
+        self._entries: "OrderedDict[Pubkey, CurveEntry]" = OrderedDict()
+        self.counters = {"hits": 0, "misses": 0, "updates": 0, "stale_updates": 0, "evictions": 0}
+        self._watchers: Dict[Pubkey, List[Callable[[BondingCurveState, int], None]]] = {}
+
+    def peek(self, curve: Pubkey) -> Optional[BondingCurveState]:
+        """Cached state or None; never touches the network."""
+        entry = self._entries.get(curve)
+        if entry is None:
+            return None
+        self.counters["hits"] += 1
+        entry.last_access = time.monotonic()
+        self._entries.move_to_end(curve)
+        return entry.state
+
+    async def get(self, curve: Pubkey) -> Optional[BondingCurveState]:
+        state = self.peek(curve)
+        if state is not None:
+            return state
+
+        self.counters["misses"] += 1
+        data, slot = await get_account_batcher().get_with_slot(curve)
+        if not data or data[:8] != EXPECTED_DISCRIMINATOR:
+            return None
+        is_new = curve not in self._entries  # a concurrent miss may have inserted it already
+        self.apply(curve, data, slot)
+        if is_new:
+            await self._subscribe(curve)
+        return self._entries[curve].state if curve in self._entries else None
+
+    def apply(self, curve: Pubkey, data: bytes, slot: int) -> bool:
+        """Store account data seen at `slot`; older slots than the cached one are ignored."""
+        entry = self._entries.get(curve)
+        if entry is not None:
+            if slot < entry.slot:
+                self.counters["stale_updates"] += 1
+                return False
+            entry.state = BondingCurveState(data)
+            entry.slot = slot
+            self.counters["updates"] += 1
+            watchers = self._watchers.get(curve)
+            if watchers:
+                entry.last_access = time.monotonic()  # a watched curve is in use even if nobody reads it
+                self._entries.move_to_end(curve)  # LRU order follows last_access
+                for callback in list(watchers):
+                    callback(entry.state, slot)
+            return True
+
+        self._entries[curve] = CurveEntry(BondingCurveState(data), slot)
+        self._evict(keep=curve)
+        return True
+
+    def watch(self, curve: Pubkey, callback: Callable[[BondingCurveState, int], None]):
+        """Call `callback(state, slot)` inline on every accepted update of `curve` (keep it cheap)."""
+        self._watchers.setdefault(curve, []).append(callback)
+
+    def unwatch(self, curve: Pubkey, callback: Callable[[BondingCurveState, int], None]):
+        watchers = self._watchers.get(curve)
+        if watchers and callback in watchers:
+            watchers.remove(callback)
+            if not watchers:
+                del self._watchers[curve]
+
+    def _evict(self, keep: Optional[Pubkey] = None):
+        # oldest first; watched curves (an open position's exit) are never evicted, by TTL or by count,
+        # nor is `keep`, the curve just stored for the caller
+        now = time.monotonic()
+        excess = len(self._entries) - self.max_entries
+        victims = []
+        for curve, entry in self._entries.items():
+            if excess <= 0 and now - entry.last_access < self.ttl:
+                break
+            if curve in self._watchers or curve == keep:
+                continue
+            victims.append((curve, entry))
+            excess -= 1
+        for curve, entry in victims:
+            del self._entries[curve]
+            self.counters["evictions"] += 1
+            if entry.subscription is not None:
+                background(entry.subscription.close(), f"unsubscribe {curve}")
+
+    def _on_notification(self, curve: Pubkey, result: dict):
+        raw = base64.b64decode(result["value"]["data"][0])
+        if raw[:8] == EXPECTED_DISCRIMINATOR:
+            self.apply(curve, raw, result["context"]["slot"])
+
+    async def _subscribe(self, curve: Pubkey):
+        subscription = await get_subscription_manager(self.endpoint).account_subscribe(
+            curve, self.commitment, callback=lambda result: self._on_notification(curve, result))
+        entry = self._entries.get(curve)
+        if entry is None:  # evicted while subscribing
+            await subscription.close()
+            return
+        entry.subscription = subscription
+
+    async def run(self):
+        """TTL eviction loop; notifications arrive through the subscription manager."""
+        while True:
+            await asyncio.sleep(max(self.ttl / 4, 1))
+            self._evict()
+
+    def stats(self) -> dict:
+        subscriptions = sum(1 for entry in self._entries.values() if entry.subscription is not None)
+        return dict(self.counters, entries=len(self._entries), subscriptions=subscriptions)
+
+
+_CACHE: Optional[CurveCache] = None
+
+
+def get_curve_cache() -> CurveCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = CurveCache()
+        register_collector("curve_cache", _CACHE.stats)
+    return _CACHE
@@ -0,0 +1,129 @@
+from typing import Tuple
+
+import numpy as np
+
+from bonding_curve import BondingCurveState
+
+# pump.fun constant-product quotes in exact integer lamports / token base units,
+# rounded the way the program (and the official SDK) rounds them.
+#   buy  (SOL in -> tokens out): vt - (vs * vt // (vs + sol) + 1), capped at real_token_reserves
+#   cost (tokens -> SOL needed): amount * vs // (vt - amount) + 1, plus fee
+#   sell (tokens in -> SOL out): amount * vs // (vt + amount), minus fee
+# The products overflow u64, so the vectorized path uses mul_div() below.
+
+DEFAULT_FEE_BASIS_POINTS = 100  # Global.feeBasisPoints (1%)
+BPS = 10_000
+
+
+# ------------------------
+# Scalar fast path (plain Python ints, exact)
+# ------------------------
+def quote_buy(state: BondingCurveState, sol_in: int, fee_bps: int = DEFAULT_FEE_BASIS_POINTS) -> int:
+    """Tokens received for spending `sol_in` lamports (fee included)."""
+    if state.complete or sol_in <= 0:
+        return 0
+    vs, vt = state.virtual_sol_reserves, state.virtual_token_reserves
+    sol_net = sol_in * BPS // (BPS + fee_bps)
+    tokens = vt - (vs * vt // (vs + sol_net) + 1)
+    return max(0, min(tokens, state.real_token_reserves))
+
+
+def buy_sol_cost(state: BondingCurveState, token_amount: int, fee_bps: int = DEFAULT_FEE_BASIS_POINTS) -> int:
+    """Lamports (fee included) the program charges for buying exactly `token_amount`."""
+    vs, vt = state.virtual_sol_reserves, state.virtual_token_reserves
+    if token_amount <= 0:
+        return 0
+    if token_amount >= vt:
+        raise ValueError("token_amount exceeds virtual token reserves")
+    cost = token_amount * vs // (vt - token_amount) + 1
+    return cost + cost * fee_bps // BPS
+
+
+def quote_sell(state: BondingCurveState, token_amount: int, fee_bps: int = DEFAULT_FEE_BASIS_POINTS) -> int:
+    """Lamports received (after fee) for selling `token_amount`."""
+    if state.complete or token_amount <= 0:
+        return 0
+    vs, vt = state.virtual_sol_reserves, state.virtual_token_reserves
+    sol_out = token_amount * vs // (vt + token_amount)
+    return sol_out - sol_out * fee_bps // BPS
+
+
+# ------------------------
+# Vectorized path: curves x amount ladders
+# ------------------------
+def mul_div(a, b, d) -> np.ndarray:
+    """
+    Exact floor(a * b / d) for uint64 arrays (broadcast) whose product would overflow.
+    The result must fit in u64 and d < 2**61. Works by splitting b into k-bit
+    chunks so every intermediate stays below 2**64.
+    """
+    a = np.asarray(a, dtype=np.uint64)
+    b = np.asarray(b, dtype=np.uint64)
+    d = np.asarray(d, dtype=np.uint64)
+    if d.size and int(d.min()) == 0:
+        raise ZeroDivisionError("mul_div by zero")
+    d_bits = int(d.max()).bit_length() if d.size else 1
+    k = 62 - d_bits  # R * 2**k + ra * chunk < d * 2**(k+1) <= 2**63
+    if k < 1:
+        raise ValueError("divisor too large for mul_div")
+
+    qa, ra = np.divmod(a, d)
+    q = qa * b
+    shift = np.uint64(k)
+    mask = np.uint64((1 << k) - 1)
+    n_chunks = -(-64 // k)
+
+    Q = np.zeros(np.broadcast(ra, b, d).shape, dtype=np.uint64)
+    R = np.zeros_like(Q)
+    for i in range(n_chunks - 1, -1, -1):
+        chunk = (b >> np.uint64(i * k)) & mask
+        T = (R << shift) + ra * chunk
+        t_q, R = np.divmod(T, d)
+        Q = (Q << shift) + t_q
+    return q + Q
+
+
+def _curve_columns(curves) -> Tuple[np.ndarray, ...]:
+    """(vs, vt, real_tokens, complete) columns shaped (n_curves, 1) for broadcasting."""
+    def col(name):
+        return np.asarray(curves[name]).astype(np.uint64)[:, None]
+    complete = np.asarray(curves["complete"]).astype(bool)[:, None]
+    return col("virtual_sol_reserves"), col("virtual_token_reserves"), col("real_token_reserves"), complete
+
+
+def quote_buy_ladder(curves, sol_amounts, fee_bps: int = DEFAULT_FEE_BASIS_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tokens out for every (curve, SOL amount) pair.
+    `curves` is a structured array from bonding_curve.parse_curve_states (or any mapping of
+    equal-length columns); returns (tokens_out uint64 [n_curves, n_amounts], price_impact float64).
+    """
+    vs, vt, real_tokens, complete = _curve_columns(curves)
+    sol_in = np.asarray(sol_amounts, dtype=np.uint64)[None, :]
+    sol_net = mul_div(sol_in, np.uint64(BPS), np.uint64(BPS + fee_bps))
+
+    after = mul_div(vs, vt, vs + sol_net) + np.uint64(1)
+    tokens = np.where(vt > after, vt - after, np.uint64(0))
+    tokens = np.minimum(tokens, real_tokens)
+    tokens = np.where(complete | (sol_in == 0), np.uint64(0), tokens)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spot = vs.astype(np.float64) / vt.astype(np.float64)
+        execution = sol_in.astype(np.float64) / tokens.astype(np.float64)
+        impact = np.where(tokens > 0, execution / spot - 1.0, np.nan)
+    return tokens, impact
+
+
+def quote_sell_ladder(curves, token_amounts, fee_bps: int = DEFAULT_FEE_BASIS_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """SOL out (lamports, after fee) for every (curve, token amount) pair; returns (sol_out, price_impact)."""
+    vs, vt, _, complete = _curve_columns(curves)
+    tokens_in = np.asarray(token_amounts, dtype=np.uint64)[None, :]
+
+    sol_out = mul_div(tokens_in, vs, vt + tokens_in)
+    sol_out = sol_out - sol_out * np.uint64(fee_bps) // np.uint64(BPS)
+    sol_out = np.where(complete, np.uint64(0), sol_out)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spot = vs.astype(np.float64) / vt.astype(np.float64)
+        execution = sol_out.astype(np.float64) / tokens_in.astype(np.float64)
+        impact = np.where(sol_out > 0, 1.0 - execution / spot, np.nan)
+    return sol_out, impact
@@ -0,0 +1,215 @@
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from solders.pubkey import Pubkey
+
+from bonding_curve import BondingCurveState, EXPECTED_DISCRIMINATOR
+from config import PUMP_PROGRAM, CURVE_TRACKER_MAX_ENTRIES, CURVE_TRACKER_TTL
+from curve_batcher import get_account_batcher
+from log_events import PumpEvent, decode_log_events
+from metrics import register_collector
+
+# Global 帳戶的預設參數 (SetParamsEvent 會更新)；新曲線從這些初始儲備開始
+DEFAULT_GLOBAL_PARAMS = {
+    "initialVirtualTokenReserves": 1_073_000_000_000_000,
+    "initialVirtualSolReserves": 30_000_000_000,
+    "initialRealTokenReserves": 793_100_000_000_000,
+    "tokenTotalSupply": 1_000_000_000_000_000,
+}
+
+# where a tracked state came from; an RPC snapshot is end-of-slot, events are mid-slot
+SOURCE_EVENT = "event"
+SOURCE_SNAPSHOT = "snapshot"
+
+
+class TrackedCurve:
+    __slots__ = ("state", "slot", "source", "token_offset", "sol_offset", "last_access")
+
+    def __init__(self, state: BondingCurveState, slot: int, source: str, token_offset: int, sol_offset: int):
+        self.state = state
+        self.slot = slot
+        self.source = source
+        # virtual - real reserves; constant for the life of a curve
+        self.token_offset = token_offset
+        self.sol_offset = sol_offset
+        self.last_access = time.monotonic()
+
+
+class CurveTracker:
+    """
+    Keeps every bonding curve's reserves current from CreateEvent / TradeEvent /
+    CompleteEvent payloads in the program logs, so prices need no RPC read.
+
+    Ordering: an update older than the tracked slot is dropped. Within one slot,
+    events apply in arrival order, but an RPC snapshot (end-of-slot state) wins
+    over events of the same slot. Only curves never seen in the logs fall back to
+    one batched getMultipleAccounts read.
+
+    Memory: curves with no event or read for `ttl` seconds, or beyond
+    `max_entries` (LRU), are dropped whenever a new curve is added; the
+    mint -> curve map is an LRU of the same size.
+    """
+
+    def __init__(self, max_entries: int = CURVE_TRACKER_MAX_ENTRIES, ttl: float = CURVE_TRACKER_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._curves: "OrderedDict[Pubkey, TrackedCurve]" = OrderedDict()
+        self._curve_by_mint: "OrderedDict[str, Pubkey]" = OrderedDict()
+        self.global_params = dict(DEFAULT_GLOBAL_PARAMS)
+        self.counters = {"creates": 0, "trades": 0, "completes": 0, "snapshots": 0,
+                         "stale": 0, "rpc_fallbacks": 0, "unknown_curve_trades": 0, "evictions": 0}
+
+    def _tracked(self, curve: Pubkey) -> Optional[TrackedCurve]:
+        tracked = self._curves.get(curve)
+        if tracked is not None:
+            tracked.last_access = time.monotonic()
+            self._curves.move_to_end(curve)
+        return tracked
+
+    def _track(self, curve: Pubkey, tracked: TrackedCurve):
+        self._curves[curve] = tracked
+        self._curves.move_to_end(curve)
+        now = tracked.last_access
+        while self._curves:
+            oldest = next(iter(self._curves.values()))
+            if len(self._curves) <= self.max_entries and now - oldest.last_access < self.ttl:
+                break
+            self._curves.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _map_mint(self, mint: str, curve: Pubkey):
+        self._curve_by_mint[mint] = curve
+        self._curve_by_mint.move_to_end(mint)
+        if len(self._curve_by_mint) > self.max_entries:
+            self._curve_by_mint.popitem(last=False)
+
+    def bonding_curve_for_mint(self, mint: str) -> Pubkey:
+        curve = self._curve_by_mint.get(mint)
+        if curve is None:
+            curve, _ = Pubkey.find_program_address([b"bonding-curve", bytes(Pubkey.from_string(mint))], PUMP_PROGRAM)
+            self._map_mint(mint, curve)
+        else:
+            self._curve_by_mint.move_to_end(mint)
+        return curve
+
+    def _accepts(self, tracked: Optional[TrackedCurve], slot: int, source: str) -> bool:
+        if tracked is None or slot > tracked.slot:
+            return True
+        if slot == tracked.slot and not (source == SOURCE_EVENT and tracked.source == SOURCE_SNAPSHOT):
+            return True
+        self.counters["stale"] += 1
+        return False
+
+    # ------------------------
+    # Event handlers (fields as decoded by pump_decoder)
+    # ------------------------
+    def on_create(self, fields: dict, slot: int):
+        self.counters["creates"] += 1
+        curve = Pubkey.from_string(fields["bondingCurve"])
+        self._map_mint(fields["mint"], curve)
+        if self._tracked(curve) is not None:
+            return
+        p = self.global_params
+        vt, vs = p["initialVirtualTokenReserves"], p["initialVirtualSolReserves"]
+        token_offset = vt - p["initialRealTokenReserves"]
+        state = BondingCurveState.from_fields(vt, vs, p["initialRealTokenReserves"], 0, p["tokenTotalSupply"], False)
+        self._track(curve, TrackedCurve(state, slot, SOURCE_EVENT, token_offset, vs))
+
+    def on_trade(self, fields: dict, slot: int):
+        self.counters["trades"] += 1
+        curve = self.bonding_curve_for_mint(fields["mint"])
+        tracked = self._tracked(curve)
+        if tracked is None:
+            # never saw the create or a snapshot: real-reserve offsets unknown, use the Global defaults
+            self.counters["unknown_curve_trades"] += 1
+            p = self.global_params
+            tracked = TrackedCurve(None, -1, SOURCE_EVENT,
+                                   p["initialVirtualTokenReserves"] - p["initialRealTokenReserves"],
+                                   p["initialVirtualSolReserves"])
+            self._track(curve, tracked)
+        elif not self._accepts(tracked, slot, SOURCE_EVENT):
+            return
+
+        vt, vs = fields["virtualTokenReserves"], fields["virtualSolReserves"]
+        supply = tracked.state.token_total_supply if tracked.state else self.global_params["tokenTotalSupply"]
+        complete = tracked.state.complete if tracked.state else False
+        tracked.state = BondingCurveState.from_fields(
+            vt, vs, max(0, vt - tracked.token_offset), max(0, vs - tracked.sol_offset), supply, complete)
+        tracked.slot = slot
+        tracked.source = SOURCE_EVENT
+
+    def on_complete(self, fields: dict, slot: int):
+        self.counters["completes"] += 1
+        tracked = self._tracked(Pubkey.from_string(fields["bondingCurve"]))
+        if tracked is not None and tracked.state is not None:
+            tracked.state.complete = True
+
+    def on_set_params(self, fields: dict, slot: int):
+        for key in DEFAULT_GLOBAL_PARAMS:
+            self.global_params[key] = fields[key]
+
+    def apply_event(self, name: str, fields: dict, slot: int):
+        handler = self._HANDLERS.get(name)
+        if handler is not None:
+            handler(self, fields, slot)
+
+    _HANDLERS = {
+        "CreateEvent": on_create,
+        "TradeEvent": on_trade,
+        "CompleteEvent": on_complete,
+        "SetParamsEvent": on_set_params,
+    }
+
+    def apply(self, event: PumpEvent):
+        self.apply_event(event.kind, event.fields, event.slot)
+
+    def ingest_logs(self, logs: Iterable[str], slot: int) -> int:
+        """Apply every pump.fun event in one transaction's logs. Returns events applied."""
+        events = decode_log_events(logs, slot, None)
+        for event in events:
+            self.apply(event)
+        return len(events)
+
+    # ------------------------
+    # Reads
+    # ------------------------
+    def apply_snapshot(self, curve: Pubkey, state: BondingCurveState, slot: int):
+        """Account state read over RPC at `slot` (end of that slot)."""
+        tracked = self._tracked(curve)
+        if not self._accepts(tracked, slot, SOURCE_SNAPSHOT):
+            return
+        self.counters["snapshots"] += 1
+        token_offset = state.virtual_token_reserves - state.real_token_reserves
+        sol_offset = state.virtual_sol_reserves - state.real_sol_reserves
+        self._track(curve, TrackedCurve(state, slot, SOURCE_SNAPSHOT, token_offset, sol_offset))
+
+    def peek(self, curve: Pubkey) -> Optional[BondingCurveState]:
+        tracked = self._tracked(curve)
+        return tracked.state if tracked is not None else None
+
+    async def get(self, curve: Pubkey) -> Optional[BondingCurveState]:
+        """Tracked state, or one batched RPC read for a curve never seen in the logs."""
+        state = self.peek(curve)
+        if state is not None:
+            return state
+        self.counters["rpc_fallbacks"] += 1
+        data, slot = await get_account_batcher().get_with_slot(curve)
+        if not data or data[:8] != EXPECTED_DISCRIMINATOR:
+            return None
+        self.apply_snapshot(curve, BondingCurveState(data), slot)
+        return self.peek(curve)
+
+    def stats(self) -> dict:
+        return dict(self.counters, curves=len(self._curves), mints=len(self._curve_by_mint))
+
+
+_TRACKER: Optional[CurveTracker] = None
+
+
+def get_curve_tracker() -> CurveTracker:
+    global _TRACKER
+    if _TRACKER is None:
+        _TRACKER = CurveTracker()
+        register_collector("curve_tracker", _TRACKER.stats)
+    return _TRACKER
@@ -1,71 +1,36 @@
-import requests
+import argparse
+import asyncio
 import os
 from dotenv import load_dotenv
 
+from holder_index import HolderIndex
+
 load_dotenv()
 
 # CallStatic API 設定
-API_URL = "https://api.callstaticrpc.com/pumpfun/v1/historical/trades/byToken"
 CALLSTATIC_BEARER_TOKEN = os.getenv("CALLSTATIC_BEARER_TOKEN")  # 從 .env 讀取 API Key
 TOKEN_MINT = "EnbmFmgxfDfWUj389HN8pt5wjXBTkxk9vL3dwiD3pump"  # 代幣 Mint 地址
 
-def get_holders_from_trades():
-    headers = {
-        "Accept": "application/json",
-        "Authorization": f"Bearer {CALLSTATIC_BEARER_TOKEN}"
-    }
-
-    unique_holders = set()
-    cursor = None  # 初始 cursor 為 None，API 會自動返回第一批數據
-    total_trades = 0
-    max_iterations = 20  # 增加最大迴圈次數，提高準確度
-    iteration = 0
-
-    while iteration < max_iterations:
-        params = {"token": TOKEN_MINT, "limit": 1000}  # 設置較大 limit 獲取更多數據
-        if cursor:
-            params["cursor"] = cursor  # 若有 cursor，則查詢下一頁數據
-
-        response = requests.get(API_URL, headers=headers, params=params)
-
-        if response.status_code == 200:
-            data = response.json()
-            print("✅ API 回應成功：")
-
-            if data.get("success") and "data" in data:
-                trades = data["data"]
-                total_trades += len(trades)
-
-                # 提取交易數據中的持有者地址（包括買家和賣家）
-                for trade in trades:
-                    buyer = trade.get("buyer")
-                    seller = trade.get("seller")
-                    if buyer:
-                        unique_holders.add(buyer)
-                    if seller:
-                        unique_holders.add(seller)
-
-                # 檢查是否還有更多數據
-                if data.get("has_more") and data.get("cursor"):
-                    cursor = data.get("cursor")  # 更新 cursor，繼續查詢
-                    print(f"🔄 發現更多交易數據，繼續加載... (已處理 {total_trades} 筆交易)")
-                else:
-                    break  # 沒有更多數據時結束查詢
-            else:
-                print("❌ 無法解析 API 回應數據，請檢查 Mint 地址是否正確。")
-                break
-        elif response.status_code == 404:
-            print("❌ 找不到該代幣的交易數據，請檢查 Mint 地址是否正確。")
-            break
-        else:
-            print(f"❌ API 請求失敗: {response.status_code}")
-            print(response.text)
-            break
-        
-        iteration += 1  # 增加迴圈次數，防止無限循環
-
-    print(f"✅ 完成查詢！總共處理 {total_trades} 筆交易")
-    print(f"✅ 該代幣的持有人數（基於歷史交易）: {len(unique_holders)}")
+async def get_holders_from_trades(mints=(TOKEN_MINT,), top=10, url=None):
+    # 交易逐頁抓進 holder_index，只抓上次之後的新交易；持有人 = 淨持幣量 > 0 的錢包
+    index = HolderIndex(token=CALLSTATIC_BEARER_TOKEN, **({"url": url} if url else {}))
+    try:
+        for mint, new_trades in (await index.update(mints)).items():
+            if new_trades < 0:
+                continue
+            stats = index.concentration(mint, top)
+            print(f"✅ {mint}: 新交易 {new_trades} 筆，持有人數 {stats['holders']}")
+            if stats["holders"]:
+                print(f"   最大持有人 {stats['top1_share']:.1%}，前 {top} 名 {stats[f'top{top}_share']:.1%}，HHI {stats['hhi']:.4f}")
+            for rank, (wallet, balance) in enumerate(index.top_holders(mint, top), 1):
+                print(f"   {rank:>3}. {wallet} {balance / 10 ** 6:,.2f}")
+    finally:
+        await index.close()
 
 if __name__ == "__main__":
-    get_holders_from_trades()
+    parser = argparse.ArgumentParser(description="Holders (net token balance > 0) of pump.fun tokens from their trades")
+    parser.add_argument("mints", nargs="*", default=[TOKEN_MINT], help="Token mint addresses")
+    parser.add_argument("--top", type=int, default=10, help="How many of the largest holders to list")
+    parser.add_argument("--url", type=str, help="Trades API URL (e.g. a local mock)")
+    args = parser.parse_args()
+    asyncio.run(get_holders_from_trades(args.mints, args.top, args.url))
@@ -0,0 +1,292 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from config import CALLSTATIC_TRADES_URL, HOLDER_INDEX_PATH, HOLDER_PAGE_LIMIT, HOLDER_CONCURRENCY, \
+    HOLDER_REQUEST_RETRIES
+from metrics import register_collector
+
+# 持有人索引：CallStatic 的歷史交易逐頁抓進 SQLite，每個錢包記淨持幣量 (買入 - 賣出)，
+# 餘額 > 0 才算持有人。每個 mint 的 cursor 存起來，下次只抓新的交易；多個 mint 同時抓，共用一個連線池。
+# Trades are keyed by (mint, trade_key(trade)), so a page fetched twice (resuming from the stored
+# cursor re-reads the last page) never counts twice, while several trades of one transaction all count.
+
+TOKEN_DECIMALS = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS holder_cursors (
+    mint TEXT PRIMARY KEY,
+    cursor TEXT,
+    trades INTEGER NOT NULL DEFAULT 0,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS holder_trades (
+    mint TEXT NOT NULL,
+    trade_key TEXT NOT NULL,
+    PRIMARY KEY (mint, trade_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS holder_balances (
+    mint TEXT NOT NULL,
+    wallet TEXT NOT NULL,
+    balance INTEGER NOT NULL,
+    PRIMARY KEY (mint, wallet)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS holder_balances_top ON holder_balances (mint, balance DESC);
+"""
+
+_UPSERT_BALANCE = ("INSERT INTO holder_balances (mint, wallet, balance) VALUES (?, ?, ?) "
+                   "ON CONFLICT (mint, wallet) DO UPDATE SET balance = balance + excluded.balance")
+
+
+class CallStaticError(RuntimeError):
+    pass
+
+
+def trade_deltas(trade: dict) -> List[Tuple[str, int]]:
+    """
+    (wallet, signed raw token amount) pairs of one API trade: the buyer gains
+    the tokens and the seller loses them. Records that name a single `user`
+    with an `is_buy` / `side` field instead are booked on that side only.
+    Empty if the trade names no wallet.
+    """
+    amount = trade.get("token_amount", trade.get("amount", 0)) or 0
+    # integers are raw units, anything else is a UI amount
+    amount = amount if isinstance(amount, int) else int(round(float(amount) * 10 ** TOKEN_DECIMALS))
+    buyer, seller = trade.get("buyer"), trade.get("seller")
+    if not buyer and not seller:
+        user = trade.get("user") or trade.get("trader")
+        if "is_buy" in trade:
+            is_buy = bool(trade["is_buy"])
+        elif "side" in trade:
+            is_buy = str(trade["side"]).lower() == "buy"
+        else:
+            return []
+        buyer, seller = (user, None) if is_buy else (None, user)
+    if buyer == seller:
+        return []
+    # 對手方通常是 bonding curve：它的餘額從 0 往下扣成負數，餘額 > 0 的查詢自然不會算到它
+    return ([(buyer, amount)] if buyer else []) + ([(seller, -amount)] if seller else [])
+
+
+def trade_key(trade: dict, legs: List[Tuple[str, int]]) -> Optional[str]:
+    """
+    Identity of one API trade: its own id if the record has one, else the
+    signature plus the instruction index, else the signature plus the legs
+    (wallet and signed amount). A transaction can hold several trades of
+    one mint, so the signature alone is not enough. None without a signature.
+    """
+    for field in ("id", "trade_id"):
+        if trade.get(field) is not None:
+            return f"id:{trade[field]}"
+    signature = trade.get("signature") or trade.get("tx_hash")
+    if not signature:
+        return None
+    for field in ("instruction_index", "ix_index", "inner_index"):
+        if trade.get(field) is not None:
+            return f"{signature}:{trade[field]}"
+    return signature + "".join(f":{wallet}:{amount}" for wallet, amount in legs)
+
+
+class HolderIndex:
+    """
+    Incremental per-mint holder balances from the CallStatic trades API.
+
+    update(mints) pages every mint from its stored cursor, up to
+    `concurrency` mints at once over one pooled httpx client; a mint's
+    pages are sequential (each cursor comes from the previous page) but
+    the next request goes out while the previous page is being written.
+    Each page is applied in one transaction together with its cursor, so
+    an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, path: str = HOLDER_INDEX_PATH, url: str = CALLSTATIC_TRADES_URL,
+                 token: Optional[str] = None, page_limit: int = HOLDER_PAGE_LIMIT,
+                 concurrency: int = HOLDER_CONCURRENCY, retries: int = HOLDER_REQUEST_RETRIES):
+        self.path = path
+        self.url = url
+        self.token = token if token is not None else os.getenv("CALLSTATIC_BEARER_TOKEN")
+        self.page_limit = page_limit
+        self.concurrency = concurrency
+        self.retries = retries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._legacy = self._migrate()
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()  # pages are written from worker threads
+        self._client: Optional[httpx.AsyncClient] = None
+        self.counters = {"requests": 0, "retries": 0, "pages": 0, "trades_new": 0, "trades_duplicate": 0,
+                         "mints_updated": 0, "errors": 0}
+        register_collector("holders", self.stats)
+
+    def _migrate(self) -> bool:
+        """
+        Indexes from before trade_key stored bare signatures: rename the column
+        and return True so this run also skips trades whose signature is already
+        there under the old key (the page re-read from each stored cursor).
+        """
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(holder_trades)")]
+        if "signature" not in columns:
+            return False
+        with self._db:
+            self._db.execute("ALTER TABLE holder_trades RENAME COLUMN signature TO trade_key")
+        return True
+
+    # ------------------------
+    # fetching
+    # ------------------------
+    def _session(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Accept": "application/json"}
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+            self._client = httpx.AsyncClient(
+                headers=headers, timeout=30.0,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency))
+        return self._client
+
+    async def _page(self, mint: str, cursor: Optional[str]) -> dict:
+        params = {"token": mint, "limit": self.page_limit}
+        if cursor:
+            params["cursor"] = cursor
+        attempt = 0
+        while True:
+            self.counters["requests"] += 1
+            response = await self._session().get(self.url, params=params)
+            if (response.status_code == 429 or response.status_code >= 500) and attempt < self.retries:
+                self.counters["retries"] += 1
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                attempt += 1
+                continue
+            if response.status_code == 404:
+                return {"success": True, "data": [], "has_more": False}
+            if response.status_code != 200:  # also the last 429 / 5xx once retries run out
+                raise CallStaticError(f"{mint}: HTTP {response.status_code} {response.text[:200]}")
+            try:
+                data = response.json()
+            except ValueError as e:  # an HTML error page from a proxy, a truncated body ...
+                raise CallStaticError(f"{mint}: invalid JSON ({e}): {response.text[:200]}") from e
+            if not isinstance(data, dict) or not data.get("success") or "data" not in data:
+                raise CallStaticError(f"{mint}: unexpected response {str(data)[:200]}")
+            return data
+
+    def cursor(self, mint: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT cursor FROM holder_cursors WHERE mint = ?", (mint,)).fetchone()
+        return row[0] if row else None
+
+    def _apply(self, mint: str, trades: List[dict], cursor: Optional[str]) -> int:
+        """Apply one page and store the cursor it was fetched with; returns how many trades were new."""
+        deltas: Dict[str, int] = {}
+        new = 0
+        with self._lock, self._db:
+            for trade in trades:
+                legs = trade_deltas(trade)
+                key = trade_key(trade, legs) if legs else None
+                if key is None:
+                    continue
+                if self._legacy and self._db.execute(
+                        "SELECT 1 FROM holder_trades WHERE mint = ? AND trade_key = ?",
+                        (mint, trade.get("signature") or trade.get("tx_hash"))).fetchone():
+                    continue  # counted before the upgrade, under its bare signature
+                if self._db.execute("INSERT OR IGNORE INTO holder_trades (mint, trade_key) VALUES (?, ?)",
+                                    (mint, key)).rowcount != 1:
+                    continue
+                for wallet, amount in legs:
+                    deltas[wallet] = deltas.get(wallet, 0) + amount
+                new += 1
+            self._db.executemany(_UPSERT_BALANCE, [(mint, wallet, amount) for wallet, amount in deltas.items()])
+            self._db.execute(
+                "INSERT INTO holder_cursors (mint, cursor, trades, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (mint) DO UPDATE SET cursor = excluded.cursor, trades = trades + excluded.trades, "
+                "updated = excluded.updated", (mint, cursor, new, time.time()))
+        self.counters["trades_new"] += new
+        self.counters["trades_duplicate"] += len(trades) - new
+        return new
+
+    async def update_mint(self, mint: str) -> int:
+        """Fetch everything after the stored cursor; returns the number of new trades."""
+        cursor = self.cursor(mint)
+        new = 0
+        page = await self._page(mint, cursor)
+        while True:
+            self.counters["pages"] += 1
+            following = page.get("cursor") if page.get("has_more") else None
+            # request the next page while this one is written
+            fetch = asyncio.ensure_future(self._page(mint, following)) if following else None
+            try:
+                # the cursor stored is the one this page was fetched with: when the API reports
+                # no more, the next run re-reads this page and picks up whatever was appended to it
+                new += await asyncio.to_thread(self._apply, mint, page["data"], cursor)
+            except BaseException:
+                if fetch is not None:
+                    fetch.cancel()
+                raise
+            if fetch is None:
+                break
+            cursor, page = following, await fetch
+        self.counters["mints_updated"] += 1
+        return new
+
+    async def update(self, mints: Iterable[str]) -> Dict[str, int]:
+        """update_mint for many mints, `concurrency` at a time; failed mints map to -1."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        mints = list(dict.fromkeys(mints))
+
+        async def one(mint: str) -> int:
+            async with semaphore:
+                try:
+                    return await self.update_mint(mint)
+                except (httpx.HTTPError, CallStaticError) as e:
+                    self.counters["errors"] += 1
+                    print(f"❌ {mint} 持有人更新失敗: {e}")
+                    return -1
+
+        return dict(zip(mints, await asyncio.gather(*(one(mint) for mint in mints))))
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        with self._lock:
+            self._db.close()
+
+    # ------------------------
+    # queries
+    # ------------------------
+    def top_holders(self, mint: str, n: int = 10) -> List[Tuple[str, int]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT wallet, balance FROM holder_balances WHERE mint = ? AND balance > 0 "
+                "ORDER BY balance DESC LIMIT ?", (mint, n)).fetchall()
+
+    def holder_count(self, mint: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM holder_balances WHERE mint = ? AND balance > 0",
+                                    (mint,)).fetchone()[0]
+
+    def concentration(self, mint: str, top: int = 10) -> dict:
+        """
+        Holder count, share of the held supply in the largest / top `top`
+        wallets and the Herfindahl index (sum of squared shares, 1.0 = one
+        holder). Supply here is what the indexed trades put in wallets, so
+        tokens still on the bonding curve are not counted.
+        """
+        with self._lock:
+            balances = [row[0] for row in self._db.execute(
+                "SELECT balance FROM holder_balances WHERE mint = ? AND balance > 0 ORDER BY balance DESC", (mint,))]
+        held = sum(balances)
+        if not held:
+            return {"holders": 0, "held": 0, "top1_share": 0.0, f"top{top}_share": 0.0, "hhi": 0.0}
+        return {"holders": len(balances), "held": held, "top1_share": balances[0] / held,
+                f"top{top}_share": sum(balances[:top]) / held,
+                "hhi": sum((balance / held) ** 2 for balance in balances)}
+
+    def stats(self) -> dict:
+        return dict(self.counters)
@@ -1,27 +1,10 @@
-import websockets
 import asyncio
-import json
-import base64
-from solders.pubkey import Pubkey
 import sys
 import os
 
 from config import WSS_ENDPOINT, PUMP_LIQUIDITY_MIGRATOR
+from subscription_manager import get_subscription_manager
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-import os
-import ssl
-import websocket
-
-# 使用websocket-client套件的寫法
-
-ssl_context = ssl.create_default_context()
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE  # 不驗證 SSL 憑證
-
-ws = websocket.create_connection(
-    WSS_ENDPOINT,
-    sslopt={"cert_reqs": ssl.CERT_NONE}  # 禁用證書驗證
-)
 
 
 
@@ -49,60 +32,21 @@ def process_initialize2_transaction(data):
         print(f"\nError: {str(e)}")
 
 async def listen_for_events():
-    while True:
-        try:
-            async with websockets.connect(WSS_ENDPOINT, ssl=ssl_context) as websocket:
-                subscription_message = json.dumps({
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "blockSubscribe",
-                    "params": [
-                        {"mentionsAccountOrProgram": str(PUMP_LIQUIDITY_MIGRATOR)},
-                        {
-                            "commitment": "confirmed",
-                            "encoding": "json",
-                            "showRewards": False,
-                            "transactionDetails": "full",
-                            "maxSupportedTransactionVersion": 0
-                        }
-                    ]
-                })
-                
-                await websocket.send(subscription_message)
-                response = await websocket.recv()
-                print(f"Subscription response: {response}")
-                print("\nListening for Raydium pool initialization events...")
-
-                while True:
-                    try:
-                        response = await asyncio.wait_for(websocket.recv(), timeout=30)
-                        data = json.loads(response)
-                        
-                        if 'method' in data and data['method'] == 'blockNotification':
-                            if 'params' in data and 'result' in data['params']:
-                                block_data = data['params']['result']
-                                if 'value' in block_data and 'block' in block_data['value']:
-                                    block = block_data['value']['block']
-                                    if 'transactions' in block:
-                                        for tx in block['transactions']:
-                                            logs = tx.get('meta', {}).get('logMessages', [])
-                                            
-                                            # Check for initialize2 instruction
-                                            for log in logs:
-                                                if "Program log: initialize2: InitializeInstruction2" in log:
-                                                    print("Found initialize2 instruction!")
-                                                    process_initialize2_transaction(tx)
-                                                    break
-                                        
-                    except asyncio.TimeoutError:
-                        print("\nChecking connection...")
-                        print("Connection alive")
-                        continue
-                        
-        except Exception as e:
-            print(f"\nConnection error: {str(e)}")
-            print("Retrying in 5 seconds...")
-            await asyncio.sleep(5)
+    # blockSubscribe on the migrator rides the shared connection; reconnects resubscribe automatically
+    subscription = await get_subscription_manager(WSS_ENDPOINT).block_subscribe(PUMP_LIQUIDITY_MIGRATOR, encoding="json")
+    print("\nListening for Raydium pool initialization events...")
+
+    async for block_data in subscription:
+        block = block_data['value'].get('block') or {}
+        for tx in block.get('transactions', []):
+            logs = (tx.get('meta') or {}).get('logMessages', [])
+
+            # Check for initialize2 instruction
+            for log in logs:
+                if "Program log: initialize2: InitializeInstruction2" in log:
+                    print("Found initialize2 instruction!")
+                    process_initialize2_transaction(tx)
+                    break
 
 if __name__ == "__main__":
     asyncio.run(listen_for_events())
\ No newline at end of file
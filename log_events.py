@@ -0,0 +1,174 @@
+import asyncio
+import base64
+import binascii
+import json
+import struct
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import WSS_ENDPOINT, PUMP_PROGRAM
+from metrics import observe
+from pump_decoder import CompiledLayout, get_decoder
+from seen_index import NS_TX, get_seen_index
+from subscription_manager import get_subscription_manager, logs_subscribe_params
+
+PROGRAM_DATA_PREFIX = "Program data: "
+_DATA_START = len(PROGRAM_DATA_PREFIX)
+_PROGRAM_PREFIX = "Program "
+_PUMP_PROGRAM_ID = str(PUMP_PROGRAM)
+# 10 base64 chars = the first 60 bits of the 8-byte event discriminator; enough to
+# classify a payload without decoding it
+_B64_PREFIX_LEN = 10
+
+SUBSCRIBE_REQUEST_ID = 1
+
+EVENT_KINDS = ("CreateEvent", "TradeEvent", "CompleteEvent", "SetParamsEvent")
+
+
+@dataclass
+class PumpEvent:
+    kind: str               # CreateEvent / TradeEvent / CompleteEvent / SetParamsEvent
+    slot: int
+    signature: str
+    fields: Dict[str, Any]  # decoded event fields (IDL names, pubkeys base58)
+    received: float = 0.0   # wall clock the logsNotification frame arrived
+
+
+_PREFIX_TABLE: Optional[Dict[str, CompiledLayout]] = None
+
+
+def _prefix_table() -> Dict[str, CompiledLayout]:
+    global _PREFIX_TABLE
+    if _PREFIX_TABLE is None:
+        table = {}
+        for disc, layout in get_decoder().events.items():
+            prefix = base64.b64encode(disc).decode()[:_B64_PREFIX_LEN]
+            assert prefix not in table, f"base64 prefix collision for {layout.name}"
+            table[prefix] = layout
+        _PREFIX_TABLE = table
+    return _PREFIX_TABLE
+
+
+def classify_program_data(log: str) -> Optional[CompiledLayout]:
+    """
+    Event layout for a `Program data:` log line, by base64 prefix only; None for
+    anything else. The line alone does not say which program emitted it: other
+    Anchor programs have events named TradeEvent too, see decode_log_events.
+    """
+    if not log.startswith(PROGRAM_DATA_PREFIX):
+        return None
+    return _prefix_table().get(log[_DATA_START:_DATA_START + _B64_PREFIX_LEN])
+
+
+def _track_invocation(log: str, stack: List[str]):
+    """Follow `Program <id> invoke [n]` / `success` / `failed: ...` lines on the call stack."""
+    program, _, rest = log[len(_PROGRAM_PREFIX):].partition(" ")
+    if program.endswith(":"):  # Program log: / return: / consumption: ..., not a program id
+        return
+    if rest.startswith("invoke ["):
+        stack.append(program)
+    elif (rest == "success" or rest.startswith("failed")) and stack:
+        stack.pop()
+
+
+def decode_log_events(logs: Iterable[str], slot: int, signature: str,
+                      kinds: Optional[Iterable[str]] = None) -> List[PumpEvent]:
+    """
+    Decode every pump.fun event in one transaction's logs, in log order. The
+    invoke / success lines are followed so `Program data:` is only decoded while
+    PUMP_PROGRAM is the program executing (a router CPI-ing into pump.fun logs
+    its own events in the same transaction).
+    """
+    kinds = frozenset(kinds) if kinds is not None else None
+    events = []
+    stack: List[str] = []
+    for log in logs:
+        if not log.startswith(PROGRAM_DATA_PREFIX):
+            if log.startswith(_PROGRAM_PREFIX):
+                _track_invocation(log, stack)
+            continue
+        if not stack or stack[-1] != _PUMP_PROGRAM_ID:
+            continue
+        layout = classify_program_data(log)
+        if layout is None or (kinds is not None and layout.name not in kinds):
+            continue
+        try:
+            data = base64.b64decode(log[_DATA_START:])
+            if data[:8] != layout.discriminator:
+                continue
+            fields = layout.decode(data)
+        except (binascii.Error, struct.error, UnicodeDecodeError):
+            continue
+        events.append(PumpEvent(layout.name, slot, signature, fields))
+    return events
+
+
+def decode_notification_events(result: dict, kinds: Optional[Iterable[str]] = None) -> List[PumpEvent]:
+    """decode_log_events for one logsNotification result, timing each stage."""
+    value = result['value']
+    received = result.get('received', 0.0)
+    if received:
+        observe("queue_wait", time.time() - received)
+    started = time.perf_counter()
+    events = decode_log_events(value.get('logs', []), result['context']['slot'], value.get('signature'), kinds)
+    observe("tx_decode", time.perf_counter() - started)
+    for event in events:
+        event.received = received
+    return events
+
+
+def logs_subscribe_message(program=PUMP_PROGRAM, commitment="processed", request_id=SUBSCRIBE_REQUEST_ID) -> str:
+    return json.dumps({
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "logsSubscribe",
+        "params": logs_subscribe_params(program, commitment),
+    })
+
+
+async def stream_log_events(
+    queue: asyncio.Queue,
+    endpoint: str = WSS_ENDPOINT,
+    commitment: str = "processed",
+    kinds: Optional[Iterable[str]] = None,
+):
+    """
+    One logsSubscribe on PUMP_PROGRAM turned into a market-data feed: every
+    Create/Trade/Complete/SetParams event of every successful transaction is put
+    on `queue` as a PumpEvent. Runs on the shared subscription_manager
+    connection, which resubscribes on disconnect; transactions already handled
+    (seen_index) are skipped.
+    """
+    seen = get_seen_index()
+    subscription = await get_subscription_manager(endpoint).logs_subscribe(PUMP_PROGRAM, commitment)
+    print(f"Listening for pump.fun events from program: {PUMP_PROGRAM}")
+    try:
+        async for result in subscription:
+            value = result['value']
+            if value.get('err') is not None or seen.check_and_add(NS_TX, value.get('signature')):
+                continue
+            for event in decode_notification_events(result, kinds):
+                await queue.put(event)
+    finally:
+        await subscription.close()
+
+
+async def next_event(queue: asyncio.Queue, producer: asyncio.Future) -> PumpEvent:
+    """
+    queue.get() for a queue `producer` (the stream_log_events / race_log_events
+    task) fills: if the producer dies first its exception is raised here
+    instead of the consumer waiting on the queue forever.
+    """
+    if not queue.empty():
+        return queue.get_nowait()
+    get = asyncio.ensure_future(queue.get())
+    try:
+        await asyncio.wait({get, producer}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        if not get.done():
+            get.cancel()
+    if get.done() and not get.cancelled():
+        return get.result()
+    producer.result()  # producer died (e.g. subscribe error): surface it
+    raise RuntimeError("event stream ended")
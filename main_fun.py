@@ -1,51 +1,34 @@
 import asyncio
 import json
-import websockets
 import base58
-import base64
 import struct
-import sys
-import os
-import ssl
-import websocket
-from typing import Final
-import time  # <-- Make sure we import time if we're using it
-import httpx
-
-
-# 使用websocket-client套件的寫法
-
-import hashlib
-
-
-from solana.rpc.async_api import AsyncClient
-from solana.rpc.commitment import Confirmed
-from solana.rpc.types import TxOpts
+import time
+from typing import Final, TYPE_CHECKING
 
 from solders.pubkey import Pubkey
-from solders.keypair import Keypair
-from solders.instruction import Instruction, AccountMeta
-from solders.system_program import TransferParams, transfer
-from solders.transaction import VersionedTransaction
-
-from spl.token.instructions import get_associated_token_address
-import spl.token.instructions as spl_token
 
 from config import *
-
-from construct import Struct, Int64ul, Flag
-
+from pump_decoder import get_decoder
+from block_stream import stream_pump_instructions
+from block_pipeline import stream_pump_instructions_parallel
+from stream_race import race_pump_instructions
+from rate_limiter import RpcThrottledError
+from bonding_curve import BondingCurveState, EXPECTED_DISCRIMINATOR
+from curve_cache import get_curve_cache
+from warmup import background, prewarm
+from seen_index import NS_MINT, get_seen_index
+from token_catalog import get_token_catalog
+from metrics import StageTimer, observe, serve_metrics
+
+# solana / httpx 只在真的要打 RPC 時才載入，啟動時直接進入訂閱
+if TYPE_CHECKING:
+    from solana.rpc.async_api import AsyncClient
 
 
-ssl_context = ssl.create_default_context()
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE  # 不驗證 SSL 憑證
-
 LAMPORTS_PER_SOL: Final[int] = 1_000_000_000
 TOKEN_DECIMALS: Final[int] = 6
 CURVE_ADDRESS = "   "
 
-api_counter = 0
 
 # ------------------------
 # 1. Define or import your TokenStorage class
@@ -99,46 +82,22 @@ def load_idl(path: str) -> dict:
 # ------------------------
 # 3. Bonding Curve / Price Logic
 # ------------------------
-EXPECTED_DISCRIMINATOR: Final[bytes] = struct.pack("<Q", 6966180631402821399)
-
-class BondingCurveState:
-    _STRUCT = Struct(
-        "virtual_token_reserves" / Int64ul,
-        "virtual_sol_reserves" / Int64ul,
-        "real_token_reserves" / Int64ul,
-        "real_sol_reserves" / Int64ul,
-        "token_total_supply" / Int64ul,
-        "complete" / Flag
-    )
-
-    def __init__(self, data: bytes) -> None:
-        parsed = self._STRUCT.parse(data[8:])
-        self.__dict__.update(parsed)
-
-async def get_pump_curve_state(conn: AsyncClient, curve_address: Pubkey) -> BondingCurveState:
-    try:
-        response = await conn.get_account_info(curve_address)
-        if not response.value or not response.value.data:
-            print(f"Warning: No data found for bonding curve address {curve_address}")
-            return None  # 這裡改成返回 None，而不是直接 raise error
-
-        data = response.value.data
-        if data[:8] != EXPECTED_DISCRIMINATOR:
-            print(f"Warning: Invalid curve state discriminator for {curve_address}")
-            return None
-
-        return BondingCurveState(data)
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code == 429:  # 如果是 429 Too Many Requests
-            raise RuntimeError("⚠️ API 過載，請求次數超限")  # 直接拋出錯誤，讓 main_fun() 處理
-        else:
-            raise  # 其他錯誤直接拋出
-    except httpx.RequestError as e:
-        print(f"🚨 網絡錯誤: {e}, 可能是 API 連線問題")
-        return None  # 避免因為網路問題影響流程
-    
-    
-    
+async def get_pump_curve_state(conn: "AsyncClient", curve_address: Pubkey) -> BondingCurveState:
+    # RPC errors propagate as solana-py's SolanaRpcException (httpx error in __cause__);
+    # rate_limiter handles 429s, the caller skips the token on anything else
+    response = await conn.get_account_info(curve_address)
+    if not response.value or not response.value.data:
+        print(f"Warning: No data found for bonding curve address {curve_address}")
+        return None  # 這裡改成返回 None，而不是直接 raise error
+
+    data = response.value.data
+    if data[:8] != EXPECTED_DISCRIMINATOR:
+        print(f"Warning: Invalid curve state discriminator for {curve_address}")
+        return None
+
+    return BondingCurveState(data)
+
+
 def calculate_pump_curve_price(curve_state: BondingCurveState) -> float:
     if curve_state.virtual_token_reserves <= 0 or curve_state.virtual_sol_reserves <= 0:
         raise ValueError("Invalid reserve state")
@@ -148,9 +107,21 @@ def calculate_pump_curve_price(curve_state: BondingCurveState) -> float:
 
 
 
-# Load the IDL JSON file
-with open('pump_fun_idl.json', 'r') as f:
-    idl = json.load(f)
+# The IDL is compiled on first use, not at import;
+# PUMP_DECODER / create_instruction / create_event resolve through __getattr__ below
+_LAZY_LAYOUTS = {
+    "PUMP_DECODER": get_decoder,
+    "create_instruction": lambda: get_decoder().instruction('create'),
+    "create_event": lambda: get_decoder().event('CreateEvent'),
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_LAYOUTS:
+        value = _LAZY_LAYOUTS[name]()
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ------------------------
@@ -160,22 +131,8 @@ with open('pump_fun_idl.json', 'r') as f:
 # ------------------------
 
 def decode_create_instruction(ix_data, ix_def, accounts):
-    args = {}
-    offset = 8  # Skip 8-byte discriminator
-
-    for arg in ix_def['args']:
-        if arg['type'] == 'string':
-            length = struct.unpack_from('<I', ix_data, offset)[0]
-            offset += 4
-            value = ix_data[offset:offset+length].decode('utf-8')
-            offset += length
-        elif arg['type'] == 'publicKey':
-            value = base64.b64encode(ix_data[offset:offset+32]).decode('utf-8')
-            offset += 32
-        else:
-            raise ValueError(f"Unsupported type: {arg['type']}")
-        
-        args[arg['name']] = value
+    # ix_def is the compiled "create" layout from pump_decoder
+    args = ix_def.decode(ix_data)
 
     # Add accounts
     args['mint'] = str(accounts[0])
@@ -188,40 +145,13 @@ def decode_create_instruction(ix_data, ix_def, accounts):
 
 
 
-# Extract the "create" instruction definition
-create_instruction = next(instr for instr in idl['instructions'] if instr['name'] == 'create')
-
 def parse_create_instruction(data):
-    if len(data) < 8:
+    create_event = get_decoder().event('CreateEvent')
+    if len(data) < 8 or data[:8] != create_event.discriminator:
         return None
-    offset = 8
-    parsed_data = {}
-
-    # Parse fields based on CreateEvent structure
-    fields = [
-        ('name', 'string'),
-        ('symbol', 'string'),
-        ('uri', 'string'),
-        ('mint', 'publicKey'),
-        ('bondingCurve', 'publicKey'),
-        ('user', 'publicKey'),
-    ]
-
     try:
-        for field_name, field_type in fields:
-            if field_type == 'string':
-                length = struct.unpack('<I', data[offset:offset+4])[0]
-                offset += 4
-                value = data[offset:offset+length].decode('utf-8')
-                offset += length
-            elif field_type == 'publicKey':
-                value = base58.b58encode(data[offset:offset+32]).decode('utf-8')
-                offset += 32
-
-            parsed_data[field_name] = value
-
-        return parsed_data
-    except:
+        return create_event.decode(data)
+    except (struct.error, UnicodeDecodeError):
         return None
 
 def print_transaction_details(log_data):
@@ -236,147 +166,9 @@ def print_transaction_details(log_data):
                 pass
             
 # ------------------------
-# 5. The two main "listeners" for block notifications
-# ------------------------            
-async def connect_websocket():
-    return await websockets.connect(WSS_ENDPOINT, ssl=ssl_context)
-
-async def listen_for_create_transaction_blocksubscribe(websocket):
-    idl = load_idl('pump_fun_idl.json')
-    create_discriminator = 8576854823835016728
-    # print(f"decode_create_instruction in globals: {'decode_create_instruction' in globals()}")
-
-    subscription_message = json.dumps({
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "blockSubscribe",
-        "params": [
-            {"mentionsAccountOrProgram": str(PUMP_PROGRAM)},
-            {
-                "commitment": "confirmed",
-                "encoding": "base64",
-                "showRewards": False,
-                "transactionDetails": "full",
-                "maxSupportedTransactionVersion": 0
-            }
-        ]
-    })
-    await websocket.send(subscription_message)
-    print(f"Subscribed to blocks mentioning program: {PUMP_PROGRAM}")
-
-    ping_interval = 20
-    last_ping_time = time.time()
-
-    while True:
-        try:
-            current_time = time.time()
-            if current_time - last_ping_time > ping_interval:
-                await websocket.ping()
-                last_ping_time = current_time
-
-            response = await asyncio.wait_for(websocket.recv(), timeout=30)
-            data = json.loads(response)
-            
-            if 'method' in data and data['method'] == 'blockNotification':
-                if 'params' in data and 'result' in data['params']:
-                    block_data = data['params']['result']
-                    if 'value' in block_data and 'block' in block_data['value']:
-                        block = block_data['value']['block']
-                        if 'transactions' in block:
-                            for tx in block['transactions']:
-                                if isinstance(tx, dict) and 'transaction' in tx:
-                                    tx_data_decoded = base64.b64decode(tx['transaction'][0])
-                                    transaction = VersionedTransaction.from_bytes(tx_data_decoded)
-                                    
-                                    for ix in transaction.message.instructions:
-                                        if str(transaction.message.account_keys[ix.program_id_index]) == str(PUMP_PROGRAM):
-                                            ix_data = bytes(ix.data)
-                                            discriminator = struct.unpack('<Q', ix_data[:8])[0]
-                                            
-                                            if discriminator == create_discriminator:
-                                                create_ix = next(instr for instr in idl['instructions'] if instr['name'] == 'create')
-                                                account_keys = [
-                                                    str(transaction.message.account_keys[index]) 
-                                                    for index in ix.accounts if index < len(transaction.message.account_keys)
-                                                ]
-                                                decoded_args = decode_create_instruction(ix_data, create_ix, account_keys)
-                                                return decoded_args
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 429:  # 如果是 429 Too Many Requests
-                raise RuntimeError("⚠️ API 過載，請求次數超限")
-        except asyncio.TimeoutError:
-            print("No data received for 30 seconds, sending ping...")
-            await websocket.ping()
-            last_ping_time = time.time()
-        except websockets.exceptions.ConnectionClosed:
-            print("WebSocket connection closed. Reconnecting...")
-            raise            
-            
-            
-            
-async def listen_for_create_transaction(websocket):
-    idl = load_idl('idl/pump_fun_idl.json')
-    create_discriminator = 8576854823835016728
-    
-    subscription_message = json.dumps({
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "blockSubscribe",
-        "params": [
-            {"mentionsAccountOrProgram": str(PUMP_PROGRAM)},
-            {
-                "commitment": "confirmed",
-                "encoding": "base64",
-                "showRewards": False,
-                "transactionDetails": "full",
-                "maxSupportedTransactionVersion": 0
-            }
-        ]
-    })
-    await websocket.send(subscription_message)
-    print(f"Subscribed to blocks mentioning program: {PUMP_PROGRAM}")
-
-    ping_interval = 20
-    last_ping_time = time.time()
-
-    while True:
-        try:
-            current_time = time.time()
-            if current_time - last_ping_time > ping_interval:
-                await websocket.ping()
-                last_ping_time = current_time
-
-            response = await asyncio.wait_for(websocket.recv(), timeout=30)
-            data = json.loads(response)
-            
-            if 'method' in data and data['method'] == 'blockNotification':
-                if 'params' in data and 'result' in data['params']:
-                    block_data = data['params']['result']
-                    if 'value' in block_data and 'block' in block_data['value']:
-                        block = block_data['value']['block']
-                        if 'transactions' in block:
-                            for tx in block['transactions']:
-                                if isinstance(tx, dict) and 'transaction' in tx:
-                                    tx_data_decoded = base64.b64decode(tx['transaction'][0])
-                                    transaction = VersionedTransaction.from_bytes(tx_data_decoded)
-                                    
-                                    for ix in transaction.message.instructions:
-                                        if str(transaction.message.account_keys[ix.program_id_index]) == str(PUMP_PROGRAM):
-                                            ix_data = bytes(ix.data)
-                                            discriminator = struct.unpack('<Q', ix_data[:8])[0]
-                                            
-                                            if discriminator == create_discriminator:
-                                                create_ix = next(instr for instr in idl['instructions'] if instr['name'] == 'create')
-                                                account_keys = [str(transaction.message.account_keys[index]) for index in ix.accounts]
-                                                decoded_args = decode_create_instruction(ix_data, create_ix, account_keys)
-                                                return decoded_args
-        except asyncio.TimeoutError:
-            print("No data received for 30 seconds, sending ping...")
-            await websocket.ping()
-            last_ping_time = time.time()
-        except websockets.exceptions.ConnectionClosed:
-            print("WebSocket connection closed. Reconnecting...")
-            raise
+# 5. Block listener: one blockSubscribe, every pump.fun create in every block
+#    (see block_stream.stream_pump_instructions)
+# ------------------------
         
         
 # ------------------------
@@ -385,56 +177,60 @@ async def listen_for_create_transaction(websocket):
         
         
 async def main_fun():
-    global api_counter
-    while True:
+    # 已看過的 bonding curve 由 accountSubscribe 推送更新，讀價格只是查 dict
+    curve_cache = get_curve_cache()
+    background(curve_cache.run(), "curve_cache")  # 任務參考留在 warmup，失敗會印出來
+    # RPC / WSS 連線和訂閱同時建立，不擋住第一個訂閱
+    background(prewarm(), "prewarm")
+    await serve_metrics()  # 各階段延遲 p50/p99: curl 127.0.0.1:METRICS_PORT/metrics
+    print("🤖 等待新代幣創建...")
+    # BLOCK_DECODE_WORKERS > 0: 區塊解碼交給多個行程，事件迴圈只負責收訊息
+    if BLOCK_DECODE_WORKERS > 0:
+        events = stream_pump_instructions_parallel(WSS_ENDPOINT, include=('create',), workers=BLOCK_DECODE_WORKERS)
+    elif len(WSS_RACE_ENDPOINTS) > 1:
+        # 同時訂閱多個節點，每個區塊只用最先到的那一份
+        events = race_pump_instructions(WSS_RACE_ENDPOINTS, include=('create',))
+    else:
+        events = stream_pump_instructions(WSS_ENDPOINT, include=('create',))
+    catalog = get_token_catalog()  # 每個 create 都記下來: python token_catalog.py --bro / --match 查詢
+    async for event in events:
+        token_data = event.args
+        catalog.add(token_data, event.slot, event.signature, event.received or None)
         try:
-            websocket = await connect_websocket(max_size=2**20, compression=None)
-            print("✅ WebSocket 連線成功")
-
-            while True:
-                try:
-                    print("🤖 等待新代幣創建...")
-                    token_data = await listen_for_create_transaction_blocksubscribe(websocket)
-
-                    print("新代幣💰: --------------------------------------")
-                    print(json.dumps(token_data, indent=2))
-
-                    mint = Pubkey.from_string(token_data['mint'])
-                    bonding_curve = Pubkey.from_string(token_data['bondingCurve'])
-                    associated_bonding_curve = Pubkey.from_string(token_data['associatedBondingCurve'])
-                    api_counter += 5.1
-
-                    if api_counter >= 5:
-                        await asyncio.sleep(1)
-                        api_counter = 0
-
-                    async with AsyncClient(RPC_ENDPOINT_2) as client:
-                        try:
-                            curve_state = await get_pump_curve_state(client, bonding_curve)
-                            if curve_state is None:
-                                print(f"代幣 {token_data['symbol']} 尚未有人購買")
-                                continue
-
-                            token_price_sol = calculate_pump_curve_price(curve_state)
-                            print(f"Bonding curve address: {bonding_curve}")
-                            print(f"💵 代幣價格: {token_price_sol:.10f} SOL")
-
-                        except RuntimeError as e:
-                            print(f"🚨 {e}，暫停 1 秒後繼續...")
-                            await asyncio.sleep(1)
-
-                except IndexError as e:
-                    print(f"⚠️ 交易索引錯誤: {e}")
-                except RuntimeError as e:
-                    print(f"🚨 遇到錯誤: {e}，暫停 3 秒後繼續...")
-                    await asyncio.sleep(3)
-
-        except websockets.exceptions.ConnectionClosedError:
-            print("⚠️ WebSocket 連線中斷，等待 5 秒後重新連線...")
-            await asyncio.sleep(5)
+            # late: 斷線期間漏掉、事後用 getBlock 補抓回來的 create
+            print("新代幣💰 (補抓): ------------------------------" if event.late else "新代幣💰: --------------------------------------")
+            print(json.dumps(token_data, indent=2))
+
+            # 重連後重送的 create 不再查價
+            if get_seen_index().check_and_add(NS_MINT, token_data['mint']):
+                continue
+
+            mint = Pubkey.from_string(token_data['mint'])
+            bonding_curve = Pubkey.from_string(token_data['bondingCurve'])
+            associated_bonding_curve = Pubkey.from_string(token_data['associatedBondingCurve'])
+
+            try:
+                with StageTimer("curve_fetch"):
+                    curve_state = await curve_cache.get(bonding_curve)
+                if curve_state is None:
+                    print(f"代幣 {token_data['symbol']} 尚未有人購買")
+                    continue
+
+                with StageTimer("price_compute"):
+                    token_price_sol = calculate_pump_curve_price(curve_state)
+                if event.received:
+                    observe("receive_to_price", time.time() - event.received)
+                print(f"Bonding curve address: {bonding_curve}")
+                print(f"💵 代幣價格: {token_price_sol:.10f} SOL")
+
+            except RpcThrottledError as e:
+                print(f"🚨 {e}，兩個節點都被限流，略過此代幣")
+
+        except (KeyError, IndexError) as e:
+            print(f"⚠️ 交易索引錯誤: {e}")
         except Exception as e:
-            print(f"❌ 無法建立 WebSocket 連線: {e}，等待 10 秒後重試...")
-            await asyncio.sleep(10)
+            # SolanaRpcException / RPCException / 網路錯誤: 只略過這個代幣，繼續監聽
+            print(f"🚨 遇到錯誤: {type(e).__name__}: {e}，略過此代幣")
 
 if __name__ == "__main__":
-    asyncio.run(main_fun())
+    asyncio.run(main_fun())
\ No newline at end of file
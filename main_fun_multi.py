@@ -1,66 +1,34 @@
 import asyncio
-import json
-import websockets
-import base58
-import base64
-import struct
-import sys
-import os
-import ssl
-import websocket
-import requests
+import time
 from typing import Final
-from config import WSS_ENDPOINT, PUMP_PROGRAM
-from construct import Struct, Int64ul, Flag
-from solana.rpc.async_api import AsyncClient
+from config import WSS_ENDPOINT, WSS_RACE_ENDPOINTS
 from solders.pubkey import Pubkey
-from config import RPC_ENDPOINT
-
-# SSL 設定
-ssl_context = ssl.create_default_context()
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE  # 不驗證 SSL 憑證
+from log_events import next_event, stream_log_events
+from stream_race import race_log_events
+from curve_tracker import get_curve_tracker
+from bonding_curve import BondingCurveState
+from warmup import background, prewarm
+from seen_index import NS_MINT, get_seen_index
+from token_catalog import get_token_catalog
+from metrics import StageTimer, observe, serve_metrics
 
 LAMPORTS_PER_SOL: Final[int] = 1_000_000_000
 TOKEN_DECIMALS: Final[int] = 6
 
-# Bonding Curve 解析
-EXPECTED_DISCRIMINATOR: Final[bytes] = struct.pack("<Q", 6966180631402821399)
-
-class BondingCurveState:
-    _STRUCT = Struct(
-        "virtual_token_reserves" / Int64ul,
-        "virtual_sol_reserves" / Int64ul,
-        "real_token_reserves" / Int64ul,
-        "real_sol_reserves" / Int64ul,
-        "token_total_supply" / Int64ul,
-        "complete" / Flag
-    )
-
-    def __init__(self, data: bytes) -> None:
-        parsed = self._STRUCT.parse(data[8:])
-        self.__dict__.update(parsed)
-
-async def get_bonding_curve_state(conn: AsyncClient, curve_address: Pubkey):
+async def get_bonding_curve_state(curve_address: Pubkey):
     """
-    取得 Bonding Curve 狀態
+    取得 Bonding Curve 狀態 (由 logs 裡的 TradeEvent 推算，從沒看過的曲線才查 RPC)
     """
     print(f"Fetching bonding curve state for: {curve_address}")
 
-    response = await conn.get_account_info(curve_address)
-    print(f"Raw response: {response}")
+    state = await get_curve_tracker().get(curve_address)
 
-    if not response.value or not response.value.data:
+    if state is None:
         print(f"Warning: Bonding Curve {curve_address} has no data yet. Sleeping for 5 seconds...")
         await asyncio.sleep(5)  # 如果沒有數據，等待 5 秒
         return None
 
-    data = response.value.data
-    if data[:8] != EXPECTED_DISCRIMINATOR:
-        print(f"Error: Invalid curve state discriminator for {curve_address}")
-        return None
-
-    return BondingCurveState(data)
+    return state
 
 def calculate_bonding_curve_price(curve_state: BondingCurveState) -> float:
     """
@@ -71,121 +39,54 @@ def calculate_bonding_curve_price(curve_state: BondingCurveState) -> float:
 
     return (curve_state.virtual_sol_reserves / LAMPORTS_PER_SOL) / (curve_state.virtual_token_reserves / 10 ** TOKEN_DECIMALS)
 
-async def process_bonding_curve(curve_address):
+async def process_bonding_curve(curve_address, received: float = 0.0):
     """
     異步處理 Bonding Curve 查詢
     """
-    async with AsyncClient(RPC_ENDPOINT) as conn:
-        try:
-            curve_pubkey = Pubkey.from_string(curve_address)
-            bonding_curve_state = await get_bonding_curve_state(conn, curve_pubkey)
-
-            if bonding_curve_state:
-                token_price_sol = calculate_bonding_curve_price(bonding_curve_state)
-                print(f"Token price for {curve_address}: {token_price_sol:.10f} SOL")
-            else:
-                print(f"Skipping {curve_address} due to missing data.")
-        except Exception as e:
-            print(f"Error processing {curve_address}: {e}")
-
-def parse_create_instruction(data):
-    """
-    解析 Create 指令
-    """
-    if len(data) < 8:
-        return None
-    offset = 8
-    parsed_data = {}
-
-    fields = [
-        ('name', 'string'),
-        ('symbol', 'string'),
-        ('uri', 'string'),
-        ('mint', 'publicKey'),
-        ('bondingCurve', 'publicKey'),
-        ('user', 'publicKey'),
-    ]
-
     try:
-        for field_name, field_type in fields:
-            if field_type == 'string':
-                length = struct.unpack('<I', data[offset:offset+4])[0]
-                offset += 4
-                value = data[offset:offset+length].decode('utf-8')
-                offset += length
-            elif field_type == 'publicKey':
-                value = base58.b58encode(data[offset:offset+32]).decode('utf-8')
-                offset += 32
-
-            parsed_data[field_name] = value
+        curve_pubkey = Pubkey.from_string(curve_address)
+        with StageTimer("curve_fetch"):
+            bonding_curve_state = await get_bonding_curve_state(curve_pubkey)
 
-        return parsed_data
-    except:
-        return None
+        if bonding_curve_state:
+            with StageTimer("price_compute"):
+                token_price_sol = calculate_bonding_curve_price(bonding_curve_state)
+            if received:
+                observe("receive_to_price", time.time() - received)
+            print(f"Token price for {curve_address}: {token_price_sol:.10f} SOL")
+        else:
+            print(f"Skipping {curve_address} due to missing data.")
+    except Exception as e:
+        print(f"Error processing {curve_address}: {e}")
 
 async def listen_for_new_tokens():
     """
-    監聽新代幣的創建
+    監聽 pump.fun 事件：Create 觸發價格查詢，Trade/Complete 更新曲線儲備
     """
-    while True:
-        try:
-            async with websockets.connect(WSS_ENDPOINT, ssl=ssl_context) as websocket:
-                subscription_message = json.dumps({
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "logsSubscribe",
-                    "params": [
-                        {"mentions": ["6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P"]},
-                        {"commitment": "processed"}
-                    ]
-                })
-                await websocket.send(subscription_message)
-                print("Listening for new token creations...")
+    curve_tracker = get_curve_tracker()
+    events = asyncio.Queue(maxsize=10000)
+    if len(WSS_RACE_ENDPOINTS) > 1:
+        # 兩個節點都訂閱，同一筆交易只處理最先到的那份
+        producer = asyncio.ensure_future(race_log_events(events, WSS_RACE_ENDPOINTS))
+    else:
+        producer = asyncio.ensure_future(stream_log_events(events, WSS_ENDPOINT))
+    background(prewarm(), "prewarm")  # RPC 連線先握手，第一個 fallback 查詢不用等
+    await serve_metrics()
+    print("Listening for new token creations...")
+    catalog = get_token_catalog()
 
-                response = await websocket.recv()
-                print(f"Subscription response: {response}")
-
-                while True:
-                    try:
-                        response = await websocket.recv()
-                        data = json.loads(response)
-
-                        if 'method' in data and data['method'] == 'logsNotification':
-                            log_data = data['params']['result']['value']
-                            logs = log_data.get('logs', [])
-                            
-                            if any("Program log: Instruction: Create" in log for log in logs):
-                                for log in logs:
-                                    if "Program data:" in log:
-                                        try:
-                                            encoded_data = log.split(": ")[1]
-                                            decoded_data = base64.b64decode(encoded_data)
-
-                                            parsed_data = parse_create_instruction(decoded_data)
-                                            if parsed_data and 'name' in parsed_data:
-                                                print("Signature:", log_data.get('signature'))
-                                                for key, value in parsed_data.items():
-                                                    print(f"{key}: {value}")
-
-                                                    if key == "bondingCurve":
-                                                        curve_address = value.strip()
-                                                        print(f"Extracted bondingCurve address: '{curve_address}'")
-                                                        print(f"Length: {len(curve_address)}")
-
-                                                        if len(curve_address) == 44:
-                                                            asyncio.create_task(process_bonding_curve(curve_address))
-                                                        else:
-                                                            print(f"Invalid bondingCurve address: {curve_address}")
-                                        except Exception as e:
-                                            print(f"Failed to decode: {log}")
-                                            print(f"Error: {str(e)}")
-                    except Exception as e:
-                        print(f"An error occurred while processing message: {e}")
-                        break
-        except Exception as e:
-            print(f"Connection error: {e}")
-            print("Reconnecting in 5 seconds...")
-            await asyncio.sleep(5)
+    while True:
+        event = await next_event(events, producer)  # 訂閱掛掉時直接拋出，不會卡在 get() 上
+        curve_tracker.apply(event)
+        if event.kind == 'CreateEvent':
+            catalog.add(event.fields, event.slot, event.signature, event.received or None)
+        if event.kind != 'CreateEvent' or get_seen_index().check_and_add(NS_MINT, event.fields['mint']):
+            continue
+
+        print("Signature:", event.signature)
+        for key, value in event.fields.items():
+            print(f"{key}: {value}")
+        background(process_bonding_curve(event.fields['bondingCurve'], event.received), f"price {event.fields['mint']}")
 
 if __name__ == "__main__":
     asyncio.run(listen_for_new_tokens())
@@ -0,0 +1,223 @@
+import asyncio
+import math
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import METRICS_HOST, METRICS_PORT
+
+# 每個階段的延遲記錄在 HDR 式直方圖裡 (固定記憶體、約 1% 精度)，加上各模組的計數器 /
+# 佇列深度，一起由本機 HTTP 以 Prometheus text 格式輸出 (GET /metrics)。
+#
+# Stages (seconds):
+#   block_age        blockTime -> websocket frame received (1s resolution on blockTime)
+#   json_parse       json.loads of one websocket frame
+#   queue_wait       frame received -> consumer starts decoding it
+#   tx_decode        decoding one block's / transaction's pump.fun instructions or events
+#   curve_fetch      bonding curve state lookup (cache, batcher or RPC)
+#   price_compute    price from curve reserves
+#   receive_to_price frame received -> price printed
+#   buy_submit / buy_confirm / sell_submit / sell_confirm   tx_builder.send_and_confirm
+#   position_detect_to_send / position_entry / position_exit / position_hold   position_manager
+
+NAMESPACE = "pumpmoney"
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+# log-linear buckets over integer microseconds: values below 2**_SUB_BITS are exact,
+# above that each power of two is split into 64 buckets (<= 1.6% relative error)
+_SUB_BITS = 7
+_SUB = 1 << _SUB_BITS
+_HALF = _SUB >> 1
+_MAX_SHIFT = 30  # up to ~2**37 us (38 hours); anything longer lands in the last bucket
+_BUCKETS = _SUB + _MAX_SHIFT * _HALF
+
+Collector = Callable[[], dict]
+
+
+def _bucket(micros: int) -> int:
+    if micros < _SUB:
+        return micros
+    shift = micros.bit_length() - _SUB_BITS
+    return min(_BUCKETS - 1, _SUB + (shift - 1) * _HALF + (micros >> shift) - _HALF)
+
+
+def _bucket_high(index: int) -> int:
+    """Largest value (us) that falls into bucket `index`."""
+    if index < _SUB:
+        return index
+    shift = (index - _SUB) // _HALF + 1
+    low = ((index - _SUB) % _HALF + _HALF) << shift
+    return low + (1 << shift) - 1
+
+
+class Histogram:
+    """Fixed-size HDR-style latency histogram; record() is O(1), percentiles are bucket upper bounds."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        if seconds < 0:  # clock skew between the node's blockTime and ours
+            seconds = 0.0
+        self.counts[_bucket(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(_bucket_high(index) / 1e6, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return dict({f"p{q * 100:g}_ms": self.percentile(q) * 1e3 for q in QUANTILES},
+                    count=self.count, max_ms=self.max * 1e3)
+
+
+def _name(*parts: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(parts))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r'\"').replace("\n", r"\n")
+
+
+class MetricsRegistry:
+    """
+    Stage histograms plus collectors: `register_collector(name, fn, label)` adds a
+    stats() callable whose numeric values become `pumpmoney_<name>_<key>`; nested
+    dicts become the same metrics with `label="<outer key>"` (e.g. per endpoint).
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self._collectors: Dict[str, tuple] = {}
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        return histogram
+
+    def observe(self, stage: str, seconds: float):
+        self.histogram(stage).record(seconds)
+
+    def register_collector(self, name: str, collector: Collector, label: str = "key"):
+        self._collectors[name] = (collector, label)
+
+    def _collector_lines(self, name: str, collector: Collector, label: str) -> List[str]:
+        # the exposition format wants every sample of one metric in a single group
+        families: Dict[str, List[str]] = {}
+
+        def emit(key, value, labels=""):
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                metric = _name(NAMESPACE, name, key)
+                families.setdefault(metric, []).append(f"{metric}{labels} {value}")
+
+        for key, value in collector().items():
+            if isinstance(value, dict):
+                labels = f'{{{label}="{_escape(key)}"}}'
+                for inner_key, inner_value in value.items():
+                    emit(inner_key, inner_value, labels)
+            else:
+                emit(key, value)
+        return [line for lines in families.values() for line in lines]
+
+    def render(self) -> str:
+        """Everything in Prometheus text exposition format."""
+        metric = f"{NAMESPACE}_stage_seconds"
+        lines = [f"# HELP {metric} Per-stage latency (HDR histogram, bucket upper bounds).",
+                 f"# TYPE {metric} summary"]
+        for stage, histogram in sorted(self.histograms.items()):
+            for q in QUANTILES:
+                lines.append(f'{metric}{{stage="{stage}",quantile="{q}"}} {histogram.percentile(q):.6f}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram.total:.6f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {histogram.count}')
+        for stage, histogram in sorted(self.histograms.items()):
+            lines.append(f'{NAMESPACE}_stage_max_seconds{{stage="{stage}"}} {histogram.max:.6f}')
+
+        for name, (collector, label) in sorted(self._collectors.items()):
+            try:
+                lines.extend(self._collector_lines(name, collector, label))
+            except Exception as e:  # one broken collector must not take the endpoint down
+                lines.append(f"# collector {name} failed: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+_REGISTRY: Optional[MetricsRegistry] = None
+
+
+def get_metrics() -> MetricsRegistry:
+    global _REGISTRY
+    if _REGISTRY is None:
+        _REGISTRY = MetricsRegistry()
+    return _REGISTRY
+
+
+def observe(stage: str, seconds: float):
+    get_metrics().observe(stage, seconds)
+
+
+def register_collector(name: str, collector: Collector, label: str = "key"):
+    get_metrics().register_collector(name, collector, label)
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+        path = request.split(b" ", 2)[1] if request.count(b" ") >= 2 else b""
+        if path.split(b"?")[0] == b"/metrics":
+            status, body = "200 OK", get_metrics().render().encode()
+        else:
+            status, body = "404 Not Found", b"GET /metrics\n"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_metrics(host: str = METRICS_HOST, port: int = METRICS_PORT) -> Optional[asyncio.AbstractServer]:
+    """Serve GET /metrics on host:port from the running loop; port 0 / None disables it."""
+    if not port:
+        return None
+    try:
+        server = await asyncio.start_server(_handle_http, host, port)
+    except OSError as e:
+        print(f"⚠️ metrics endpoint {host}:{port} 無法啟動: {e}")
+        return None
+    print(f"📈 Prometheus metrics: http://{host}:{port}/metrics")
+    return server
+
+
+class StageTimer:
+    """`with StageTimer("curve_fetch"): ...` records the block's duration."""
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
@@ -0,0 +1,324 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional
+
+from solders.pubkey import Pubkey
+from solders.transaction import VersionedTransaction
+
+from bonding_curve import BondingCurveState
+from config import BUY_AMOUNT, BUY_SLIPPAGE, SELL_SLIPPAGE, LAMPORTS_PER_SOL, MAX_OPEN_POSITIONS, MAX_CAPITAL_SOL, \
+    TAKE_PROFIT, STOP_LOSS, TIME_STOP, SELL_RETRIES, ENTRY_CURVE_RETRIES, ENTRY_CURVE_RETRY_DELAY
+from curve_cache import get_curve_cache
+from curve_quote import quote_sell
+from metrics import observe, register_collector
+from tx_builder import get_tx_builder, send_and_confirm, signature_landed, token_balance
+
+# 每個部位一個 asyncio task，各自跑 進場 -> 持有 -> 出場 的狀態機：
+# 出場由 accountSubscribe 推來的曲線更新觸發 (停利 / 停損)，或持有超過 TIME_STOP (時間停損)，
+# 不再用固定的 sleep；同時持有的部位數和投入的 SOL 有上限。
+
+PENDING = "pending"   # buy sent, waiting for confirmation
+OPEN = "open"         # holding, watching the curve
+EXITING = "exiting"   # exit triggered, sell in flight
+CLOSED = "closed"
+FAILED = "failed"     # buy failed on chain, or was never sent
+MIGRATED = "migrated"  # curve completed while holding: tokens kept, sell them on the AMM
+ABANDONED = "abandoned"  # sells kept failing, or the buy's outcome is unknown: check the wallet by hand
+TERMINAL = (CLOSED, FAILED, MIGRATED, ABANDONED)  # no longer counted against the caps
+
+Send = Callable[[VersionedTransaction, str], Awaitable[Optional[str]]]
+Status = Callable[[str], Awaitable[Optional[bool]]]
+Balance = Callable[[Pubkey], Awaitable[Optional[int]]]
+
+
+@dataclass
+class Position:
+    mint: Pubkey
+    bonding_curve: Pubkey
+    associated_bonding_curve: Pubkey
+    symbol: str
+    sol_in: int                       # lamports committed
+    detected: float                   # wall clock the create arrived (0 if unknown)
+    state: str = PENDING
+    token_amount: int = 0
+    value: int = 0                    # lamports a sell would return at the last curve update
+    exit_reason: Optional[str] = None
+    sol_out: int = 0
+    buy_signature: Optional[str] = None
+    sell_signature: Optional[str] = None
+    opened_at: float = 0.0            # monotonic, buy confirmed
+    exit_triggered_at: float = 0.0
+    closed_at: float = 0.0
+    _exit: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def pnl(self) -> int:
+        return self.sol_out - self.sol_in if self.state == CLOSED else self.value - self.sol_in
+
+
+class PositionManager:
+    """
+    Runs many positions concurrently, each as its own task.
+
+    open() refuses new positions beyond `max_positions` open ones or
+    `max_capital` SOL committed. Once the buy confirms, every curve update
+    re-values the position and take_profit / stop_loss (fractions of the SOL
+    paid) trigger the exit immediately; time_stop seconds after entry it exits
+    regardless. A curve that completes is not sold (MIGRATED), and a sell
+    still failing after SELL_RETRIES attempts, send errors included, gives
+    up (ABANDONED); both free their slot under the caps.
+    A curve the RPC node does not show yet is read again ENTRY_CURVE_RETRIES
+    times. A buy `send` reports unconfirmed is looked up with `status`
+    (getSignatureStatuses) and `balance` before giving up: it is filled if it
+    landed, FAILED if it failed on chain, and ABANDONED if neither can tell.
+    marry=True holds without exits. `on_event(kind, position,
+    fields)` is called for each buy / sell sent, each confirmed fill and each
+    error, with the trade_journal record kinds and fields.
+    """
+
+    def __init__(self, buy_amount: float = BUY_AMOUNT, max_positions: int = MAX_OPEN_POSITIONS,
+                 max_capital: float = MAX_CAPITAL_SOL, take_profit: float = TAKE_PROFIT, stop_loss: float = STOP_LOSS,
+                 time_stop: float = TIME_STOP, marry: bool = False, send: Send = send_and_confirm,
+                 on_event: Optional[Callable[[str, Position, dict], None]] = None,
+                 status: Status = signature_landed, balance: Balance = token_balance):
+        self.buy_lamports = int(buy_amount * LAMPORTS_PER_SOL)
+        self.max_positions = max_positions
+        self.max_capital = int(max_capital * LAMPORTS_PER_SOL)
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.time_stop = time_stop
+        self.marry = marry
+        self.send = send
+        self.status = status
+        self.balance = balance
+        self.on_event = on_event
+        self.positions: Dict[Pubkey, Position] = {}
+        self._tasks: Dict[Pubkey, asyncio.Task] = {}
+        self.counters = {"opened": 0, "rejected_cap": 0, "failed": 0, "curve_retries": 0, "late_fills": 0,
+                         "closed": 0, "take_profit": 0, "stop_loss": 0, "time_stop": 0, "migrated": 0,
+                         "abandoned": 0, "wins": 0, "losses": 0, "realized_pnl_lamports": 0}
+        register_collector("positions", self.stats)
+
+    @property
+    def active(self):
+        return [p for p in self.positions.values() if p.state in (PENDING, OPEN, EXITING)]
+
+    @property
+    def capital_committed(self) -> int:
+        return sum(p.sol_in for p in self.active)
+
+    def can_open(self) -> bool:
+        return len(self.active) < self.max_positions and self.capital_committed + self.buy_lamports <= self.max_capital
+
+    async def open(self, token_data: dict, detected: float = 0.0) -> Optional[Position]:
+        """Start a position for a create event's args; None if a cap is hit or the mint is already held."""
+        mint = Pubkey.from_string(token_data['mint'])
+        if mint in self.positions:
+            return None
+        if not self.can_open():
+            self.counters["rejected_cap"] += 1
+            print(f"⛔ 部位已滿 ({len(self.active)}/{self.max_positions}, "
+                  f"{self.capital_committed / LAMPORTS_PER_SOL:.4f} SOL)，略過 {token_data.get('symbol')}")
+            return None
+        position = Position(mint, Pubkey.from_string(token_data['bondingCurve']),
+                            Pubkey.from_string(token_data['associatedBondingCurve']),
+                            token_data.get('symbol', ''), self.buy_lamports, detected)
+        self.positions[mint] = position
+        self.counters["opened"] += 1
+        self._tasks[mint] = asyncio.ensure_future(self._run(position))
+        return position
+
+    async def wait_closed(self, position: Position):
+        task = self._tasks.get(position.mint)
+        if task is not None:
+            await asyncio.shield(task)
+
+    # ------------------------
+    # state machine
+    # ------------------------
+    async def _run(self, position: Position):
+        try:
+            if not await self._enter(position):
+                return
+            if self.marry:
+                print(f"💍 {position.symbol} 持有不賣 (marry mode)")
+                return
+            await self._hold(position)
+            await self._exit(position)
+        except Exception as e:
+            print(f"❌ 部位 {position.symbol} ({position.mint}) 錯誤: {e}")
+            self._emit("error", position, message=f"{position.state}: {e}")
+            if position.state == PENDING:
+                position.state = FAILED
+                self.counters["failed"] += 1
+            elif position.state not in TERMINAL:
+                self._abandon(position, f"{position.state}: {e}")
+        finally:
+            self._tasks.pop(position.mint, None)
+            if position.state in TERMINAL:  # the counters keep the history
+                self.positions.pop(position.mint, None)
+
+    async def _curve_for_entry(self, position: Position) -> Optional[BondingCurveState]:
+        # the create can reach us before the RPC node serves its curve account
+        curves = get_curve_cache()
+        for attempt in range(ENTRY_CURVE_RETRIES + 1):
+            state = await curves.get(position.bonding_curve)
+            if state is not None or attempt == ENTRY_CURVE_RETRIES:
+                return state
+            self.counters["curve_retries"] += 1
+            await asyncio.sleep(ENTRY_CURVE_RETRY_DELAY)
+
+    async def _enter(self, position: Position) -> bool:
+        curves = get_curve_cache()
+        state = await self._curve_for_entry(position)
+        if state is None or state.complete:
+            position.state = FAILED
+            self.counters["failed"] += 1
+            self._emit("error", position, message="bonding curve not found" if state is None else "curve complete")
+            return False
+        tx, position.token_amount = get_tx_builder().buy_for_sol(
+            position.mint, position.bonding_curve, position.associated_bonding_curve, state, position.sol_in,
+            BUY_SLIPPAGE)
+        if position.detected:
+            observe("position_detect_to_send", time.time() - position.detected)
+        self._emit("buy", position, signature=str(tx.signatures[0]), lamports=position.sol_in,
+                   tokens=position.token_amount)
+        signature = await self.send(tx, "buy") or await self._recover_buy(position, str(tx.signatures[0]))
+        if signature is None:
+            return False
+        position.buy_signature = signature
+        position.state = OPEN
+        position.opened_at = time.monotonic()
+        position.value = quote_sell(curves.peek(position.bonding_curve) or state, position.token_amount)
+        if position.detected:
+            observe("position_entry", time.time() - position.detected)
+        print(f"🟢 買入 {position.symbol}: {position.token_amount} tokens / {position.sol_in / LAMPORTS_PER_SOL:.6f} SOL")
+        self._emit("fill", position, side="buy", signature=signature, lamports=position.sol_in,
+                   tokens=position.token_amount)
+        return True
+
+    async def _recover_buy(self, position: Position, signature: str) -> Optional[str]:
+        """The buy was not confirmed in time (or failed): find out whether it landed after all."""
+        try:
+            landed = await self.status(signature)
+        except Exception as e:
+            print(f"⚠️ 查不到買單 {signature} 的狀態: {e}")
+            landed = None
+        if landed is False:
+            position.state = FAILED
+            self.counters["failed"] += 1
+            self._emit("error", position, message="buy failed on chain")
+            return None
+        tokens = await self.balance(position.mint)
+        if tokens:
+            position.token_amount = tokens  # what actually arrived, not the quote
+            landed = True
+        if not landed:
+            self._abandon(position, f"buy {signature} not confirmed, may still land: check the wallet")
+            return None
+        self.counters["late_fills"] += 1
+        print(f"⚠️ 買單 {signature} 逾時後才確認，照常持有")
+        return signature
+
+    def _on_curve(self, position: Position, state: BondingCurveState, slot: int):
+        if position.state != OPEN:
+            return
+        position.value = quote_sell(state, position.token_amount)
+        if state.complete:
+            self._trigger(position, "complete")  # migrated: the curve no longer trades
+        elif position.value >= position.sol_in * (1 + self.take_profit):
+            self._trigger(position, "take_profit")
+        elif position.value <= position.sol_in * (1 - self.stop_loss):
+            self._trigger(position, "stop_loss")
+
+    def _trigger(self, position: Position, reason: str):
+        if position.exit_reason is None:
+            position.exit_reason = reason
+            position.exit_triggered_at = time.monotonic()
+            position._exit.set()
+
+    async def _hold(self, position: Position):
+        curves = get_curve_cache()
+        callback = lambda state, slot: self._on_curve(position, state, slot)
+        curves.watch(position.bonding_curve, callback)
+        try:
+            state = curves.peek(position.bonding_curve)
+            if state is not None:
+                self._on_curve(position, state, 0)  # the curve may already be past a threshold
+            try:
+                await asyncio.wait_for(position._exit.wait(), self.time_stop)
+            except asyncio.TimeoutError:
+                self._trigger(position, "time_stop")
+        finally:
+            curves.unwatch(position.bonding_curve, callback)
+
+    async def _exit(self, position: Position):
+        position.state = EXITING
+        curves = get_curve_cache()
+        for attempt in range(1, SELL_RETRIES + 1):
+            try:
+                state = curves.peek(position.bonding_curve) or await curves.get(position.bonding_curve)
+                if state is None:
+                    break
+                if state.complete:  # the program rejects sells on a completed curve
+                    self._migrated(position)
+                    return
+                tx, expected = get_tx_builder().sell_for_min(
+                    position.mint, position.bonding_curve, position.associated_bonding_curve, state,
+                    position.token_amount, SELL_SLIPPAGE)
+                self._emit("sell", position, signature=str(tx.signatures[0]), lamports=expected,
+                           tokens=position.token_amount)
+                signature = await self.send(tx, "sell")
+                error = "sell not confirmed"
+            except Exception as e:  # RPC / throttling errors count as a failed attempt
+                signature, error = None, f"sell failed: {e}"
+            if signature is not None:
+                self._closed(position, signature, expected)
+                return
+            print(f"⚠️ 賣出 {position.symbol} 失敗 ({attempt}/{SELL_RETRIES}): {error}")
+            self._emit("error", position, message=f"{error} ({attempt}/{SELL_RETRIES})")
+        self._abandon(position, "sell abandoned, still holding")
+
+    def _migrated(self, position: Position):
+        position.state = MIGRATED
+        position.closed_at = time.monotonic()
+        self.counters["migrated"] += 1
+        print(f"🎓 {position.symbol} ({position.mint}) 曲線已完成，代幣轉到 AMM，請在那邊賣出")
+        self._emit("error", position, message="curve complete, tokens held for the AMM")
+
+    def _abandon(self, position: Position, reason: str):
+        # terminal so it stops counting against the caps; the tokens are still in the wallet
+        position.state = ABANDONED
+        position.closed_at = time.monotonic()
+        self.counters["abandoned"] += 1
+        print(f"🚨 {position.symbol} ({position.mint}) {reason}，請手動處理")
+        self._emit("error", position, message=reason)
+
+    def _closed(self, position: Position, signature: str, sol_out: int):
+        position.state = CLOSED
+        position.sell_signature = signature
+        position.sol_out = sol_out
+        position.closed_at = time.monotonic()
+        observe("position_exit", position.closed_at - position.exit_triggered_at)
+        observe("position_hold", position.closed_at - position.opened_at)
+        self.counters["closed"] += 1
+        if position.exit_reason in self.counters:
+            self.counters[position.exit_reason] += 1
+        self.counters["wins" if position.pnl > 0 else "losses"] += 1
+        self.counters["realized_pnl_lamports"] += position.pnl
+        print(f"🔴 賣出 {position.symbol} ({position.exit_reason}): "
+              f"{position.pnl / LAMPORTS_PER_SOL:+.6f} SOL")
+        self._emit("fill", position, side="sell", signature=signature, lamports=sol_out,
+                   tokens=position.token_amount)
+
+    def _emit(self, kind: str, position: Position, **fields):
+        if self.on_event:
+            self.on_event(kind, position, fields)
+
+    def stats(self) -> dict:
+        by_state = {s: 0 for s in (PENDING, OPEN, EXITING)}
+        for position in self.active:
+            by_state[position.state] += 1
+        return dict(self.counters, **by_state, capital_committed_lamports=self.capital_committed,
+                    unrealized_pnl_lamports=sum(p.pnl for p in self.active if p.state == OPEN))
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import re
+import struct
+from typing import Any, Dict, Final, List, Optional, Tuple
+
+from solders.pubkey import Pubkey
+
+# pump.fun IDL 解碼器：啟動時把 pump_fun_idl.json 編譯成以 discriminator 為 key 的分派表，
+# 之後每個指令 / 事件 / 帳戶只需要一次 dict 查找 + 預先編譯好的 struct.Struct 解包。
+
+IDL_PATH: Final[str] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pump_fun_idl.json")
+DISCRIMINATOR_SIZE: Final[int] = 8
+
+# IDL primitive type -> struct format character
+_FIXED_FORMATS: Final[Dict[str, str]] = {
+    "bool": "?",
+    "u8": "B",
+    "i8": "b",
+    "u16": "H",
+    "i16": "h",
+    "u32": "I",
+    "i32": "i",
+    "u64": "Q",
+    "i64": "q",
+    "publicKey": "32s",
+}
+
+_U32 = struct.Struct("<I")
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def anchor_discriminator(namespace: str, name: str) -> bytes:
+    """Anchor discriminator: sha256("<namespace>:<name>")[:8]"""
+    return hashlib.sha256(f"{namespace}:{name}".encode()).digest()[:DISCRIMINATOR_SIZE]
+
+
+class CompiledLayout:
+    """
+    One IDL instruction / event / account compiled into a list of segments.
+    Consecutive fixed-size fields share a single struct.Struct; strings are
+    length-prefixed (u32) and handled between the fixed segments.
+    """
+
+    __slots__ = ("name", "kind", "discriminator", "fields", "account_names", "_segments")
+
+    def __init__(self, name: str, kind: str, discriminator: bytes, fields: List[dict], account_names: List[str]):
+        self.name = name
+        self.kind = kind
+        self.discriminator = discriminator
+        self.fields = [(f["name"], f["type"]) for f in fields]
+        self.account_names = account_names
+        self._segments = self._compile(self.fields)
+
+    @staticmethod
+    def _compile(fields: List[Tuple[str, Any]]) -> List[tuple]:
+        segments = []
+        names: List[str] = []
+        fmt = "<"
+        pubkey_idx: List[int] = []
+
+        def flush():
+            nonlocal names, fmt, pubkey_idx
+            if names:
+                segments.append(("fixed", struct.Struct(fmt), tuple(names), tuple(pubkey_idx)))
+            names, fmt, pubkey_idx = [], "<", []
+
+        for field_name, field_type in fields:
+            if field_type == "string":
+                flush()
+                segments.append(("string", field_name))
+            elif isinstance(field_type, str) and field_type in _FIXED_FORMATS:
+                if field_type == "publicKey":
+                    pubkey_idx.append(len(names))
+                names.append(field_name)
+                fmt += _FIXED_FORMATS[field_type]
+            else:
+                raise ValueError(f"Unsupported type: {field_type}")
+        flush()
+        return segments
+
+    def decode(self, data: bytes, offset: int = DISCRIMINATOR_SIZE, raw_pubkeys: bool = False) -> Dict[str, Any]:
+        """
+        Decode the payload that follows the discriminator.
+        publicKey fields come back base58 encoded unless raw_pubkeys=True (32 raw bytes).
+        Raises struct.error / UnicodeDecodeError on truncated or malformed data.
+        """
+        out: Dict[str, Any] = {}
+        for segment in self._segments:
+            if segment[0] == "string":
+                length = _U32.unpack_from(data, offset)[0]
+                offset += 4
+                end = offset + length
+                if end > len(data):
+                    raise struct.error(f"string field '{segment[1]}' runs past end of buffer")
+                out[segment[1]] = bytes(data[offset:end]).decode("utf-8")
+                offset = end
+            else:
+                _, layout, names, pubkey_idx = segment
+                values = layout.unpack_from(data, offset)
+                offset += layout.size
+                if pubkey_idx and not raw_pubkeys:
+                    values = list(values)
+                    for i in pubkey_idx:
+                        values[i] = str(Pubkey.from_bytes(values[i]))
+                out.update(zip(names, values))
+        return out
+
+    def name_accounts(self, account_keys: List[str]) -> Dict[str, str]:
+        """Map the instruction's account list to the IDL account names."""
+        return dict(zip(self.account_names, account_keys))
+
+    def __repr__(self):
+        return f"CompiledLayout({self.kind}:{self.name})"
+
+
+class PumpDecoder:
+    """Discriminator-keyed dispatch tables for every pump.fun instruction, event and account."""
+
+    def __init__(self, idl: dict):
+        self.instructions: Dict[bytes, CompiledLayout] = {}
+        self.events: Dict[bytes, CompiledLayout] = {}
+        self.accounts: Dict[bytes, CompiledLayout] = {}
+        self._by_name: Dict[Tuple[str, str], CompiledLayout] = {}
+
+        for ix in idl.get("instructions", []):
+            disc = anchor_discriminator("global", _snake_case(ix["name"]))
+            account_names = [a["name"] for a in ix.get("accounts", [])]
+            self._add(self.instructions, CompiledLayout(ix["name"], "instruction", disc, ix.get("args", []), account_names))
+        for ev in idl.get("events", []):
+            disc = anchor_discriminator("event", ev["name"])
+            self._add(self.events, CompiledLayout(ev["name"], "event", disc, ev.get("fields", []), []))
+        for acc in idl.get("accounts", []):
+            disc = anchor_discriminator("account", acc["name"])
+            self._add(self.accounts, CompiledLayout(acc["name"], "account", disc, acc["type"].get("fields", []), []))
+
+    def _add(self, table: Dict[bytes, CompiledLayout], layout: CompiledLayout):
+        table[layout.discriminator] = layout
+        self._by_name[(layout.kind, layout.name)] = layout
+
+    def instruction(self, name: str) -> CompiledLayout:
+        return self._by_name[("instruction", name)]
+
+    def event(self, name: str) -> CompiledLayout:
+        return self._by_name[("event", name)]
+
+    def account(self, name: str) -> CompiledLayout:
+        return self._by_name[("account", name)]
+
+    @staticmethod
+    def _dispatch(table: Dict[bytes, CompiledLayout], data: bytes, raw_pubkeys: bool) -> Optional[Tuple[str, Dict[str, Any]]]:
+        layout = table.get(bytes(data[:DISCRIMINATOR_SIZE]))
+        if layout is None:
+            return None
+        try:
+            return layout.name, layout.decode(data, raw_pubkeys=raw_pubkeys)
+        except (struct.error, UnicodeDecodeError):
+            return None
+
+    def decode_instruction(self, data: bytes, raw_pubkeys: bool = False) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Returns (instruction name, args) or None if the data is not a known / valid pump.fun instruction."""
+        return self._dispatch(self.instructions, data, raw_pubkeys)
+
+    def decode_event(self, data: bytes, raw_pubkeys: bool = False) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Returns (event name, fields) for a decoded `Program data:` payload, or None."""
+        return self._dispatch(self.events, data, raw_pubkeys)
+
+    def decode_account(self, data: bytes, raw_pubkeys: bool = False) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Returns (account type, fields) for raw account data, or None."""
+        return self._dispatch(self.accounts, data, raw_pubkeys)
+
+
+_DECODER: Optional[PumpDecoder] = None
+
+
+def get_decoder() -> PumpDecoder:
+    """Process-wide decoder, compiled from pump_fun_idl.json on first use."""
+    global _DECODER
+    if _DECODER is None:
+        with open(IDL_PATH, "r") as f:
+            _DECODER = PumpDecoder(json.load(f))
+    return _DECODER
@@ -0,0 +1,170 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar, TYPE_CHECKING
+
+from config import RPC_RATE_LIMITS
+from metrics import register_collector
+
+# httpx / solana (via rpc_pool) load on the first RPC call, not at import
+if TYPE_CHECKING:
+    from solana.rpc.async_api import AsyncClient
+
+T = TypeVar("T")
+
+# AIMD 參數：成功時每次加回 max_rate 的 5%，遇到 429 時速率減半
+ADDITIVE_INCREASE = 0.05
+MULTIPLICATIVE_DECREASE = 0.5
+MIN_RATE_FRACTION = 0.1
+MAX_BACKOFF = 10.0  # seconds, cap for the no-Retry-After backoff
+
+
+class RpcThrottledError(RuntimeError):
+    """Every endpoint kept answering 429 Too Many Requests."""
+
+
+def throttle_retry_after(exc: BaseException) -> Optional[float]:
+    """
+    If `exc` (or the exception it wraps -- solana-py re-raises httpx errors as
+    SolanaRpcException) is a 429, return Retry-After in seconds (0.0 when absent).
+    Returns None for anything that is not a 429.
+    """
+    import httpx
+
+    while exc is not None:
+        if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429:
+            try:
+                return max(0.0, float(exc.response.headers.get("Retry-After", 0)))
+            except ValueError:  # HTTP-date form, treat as unknown
+                return 0.0
+        exc = exc.__cause__
+    return None
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.tokens
+
+    def take(self, now: float, n: float = 1.0) -> bool:
+        self._refill(now)
+        if self.tokens >= n:
+            self.tokens -= n
+            return True
+        return False
+
+    def wait_time(self, now: float, n: float = 1.0) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens >= n else (n - self.tokens) / self.rate
+
+
+class EndpointLimiter:
+    """Token bucket for one RPC endpoint whose rate adapts AIMD-style to 429s."""
+
+    def __init__(self, endpoint: str, max_rate: float):
+        self.endpoint = endpoint
+        self.max_rate = max_rate
+        self.min_rate = max_rate * MIN_RATE_FRACTION
+        self.bucket = TokenBucket(max_rate)
+        self.cooldown_until = 0.0
+        self.consecutive_throttles = 0
+        self.counters = {"requests": 0, "successes": 0, "throttled": 0, "errors": 0, "wait_seconds": 0.0}
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def wait_time(self, now: float) -> float:
+        return max(self.cooldown_until - now, self.bucket.wait_time(now))
+
+    def on_success(self):
+        self.counters["successes"] += 1
+        self.consecutive_throttles = 0
+        self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate * ADDITIVE_INCREASE)
+
+    def on_throttled(self, retry_after: float):
+        now = time.monotonic()
+        self.counters["throttled"] += 1
+        self.consecutive_throttles += 1
+        self.bucket.rate = max(self.min_rate, self.bucket.rate * MULTIPLICATIVE_DECREASE)
+        self.bucket.tokens = 0.0
+        backoff = retry_after or min(MAX_BACKOFF, 0.5 * 2 ** (self.consecutive_throttles - 1))
+        self.cooldown_until = max(self.cooldown_until, now + backoff)
+
+
+class RpcLoadBalancer:
+    """
+    Routes each RPC call to an endpoint that still has budget, weighted by its
+    current (AIMD-adjusted) rate, instead of sleeping on a single node.
+    """
+
+    def __init__(self, rate_limits: Dict[str, float], max_attempts: int = 4):
+        self.limiters = {endpoint: EndpointLimiter(endpoint, rate) for endpoint, rate in rate_limits.items()}
+        self.max_attempts = max_attempts
+
+    async def acquire(self) -> EndpointLimiter:
+        """Wait until some endpoint has a token, take it and return that endpoint's limiter."""
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            ready = [l for l in self.limiters.values() if now >= l.cooldown_until and l.bucket.available(now) >= 1]
+            if ready:
+                limiter = random.choices(ready, weights=[l.rate for l in ready])[0]
+                limiter.bucket.take(now)
+                limiter.counters["requests"] += 1
+                limiter.counters["wait_seconds"] += waited
+                return limiter
+            delay = min(l.wait_time(now) for l in self.limiters.values())
+            await asyncio.sleep(max(delay, 0.001))
+            waited += max(delay, 0.001)
+
+    async def run(self, call: Callable[["AsyncClient"], Awaitable[T]]) -> T:
+        """
+        Run `call(client)` on whichever endpoint has budget. A 429 shrinks that
+        endpoint's rate and the call is retried elsewhere; raises RpcThrottledError
+        after max_attempts throttled tries.
+        """
+        from rpc_pool import get_rpc_client
+
+        for _ in range(self.max_attempts):
+            limiter = await self.acquire()
+            try:
+                result = await call(get_rpc_client(limiter.endpoint))
+            except Exception as e:
+                retry_after = throttle_retry_after(e)
+                if retry_after is None:
+                    limiter.counters["errors"] += 1
+                    raise
+                limiter.on_throttled(retry_after)
+                print(f"⚠️ {limiter.endpoint} 回應 429，速率降為 {limiter.rate:.2f} req/s")
+                continue
+            limiter.on_success()
+            return result
+        raise RpcThrottledError("⚠️ API 過載，請求次數超限")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            endpoint: dict(l.counters, rate=round(l.rate, 3), consecutive_throttles=l.consecutive_throttles)
+            for endpoint, l in self.limiters.items()
+        }
+
+
+_LIMITER: Optional[RpcLoadBalancer] = None
+
+
+def get_rpc_limiter() -> RpcLoadBalancer:
+    global _LIMITER
+    if _LIMITER is None:
+        _LIMITER = RpcLoadBalancer(RPC_RATE_LIMITS)
+        register_collector("rpc_limiter", _LIMITER.stats, label="endpoint")
+    return _LIMITER
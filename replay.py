@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import gzip
+import json
+import multiprocessing
+import resource
+import ssl
+import struct
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import websockets
+
+from config import WSS_ENDPOINT
+
+# 錄製 / 重播 WebSocket 訊息，讓監聽器可以離線在同一份流量上做效能比較。
+# Capture file: gzip stream of records [recv_time f64][length u32][raw frame bytes].
+
+# 不驗證憑證就不必載入系統 CA (create_default_context 會多花 ~50ms 啟動時間)
+ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+ssl_context.check_hostname = False
+ssl_context.verify_mode = ssl.CERT_NONE  # 不驗證 SSL 憑證
+
+_RECORD_HEADER = struct.Struct("<dI")
+NOTIFICATION_METHODS = {"blocks": "blockNotification", "logs": "logsNotification"}
+
+
+# ------------------------
+# Capture file
+# ------------------------
+class CaptureWriter:
+    def __init__(self, path: str):
+        self._file = gzip.open(path, "wb", compresslevel=6)
+        self.frames = 0
+
+    def write(self, frame, recv_time: Optional[float] = None):
+        raw = frame.encode() if isinstance(frame, str) else frame
+        self._file.write(_RECORD_HEADER.pack(recv_time if recv_time is not None else time.time(), len(raw)))
+        self._file.write(raw)
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+
+def read_capture(path: str) -> Iterator[Tuple[float, bytes]]:
+    with gzip.open(path, "rb") as f:
+        while True:
+            header = f.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                return
+            recv_time, length = _RECORD_HEADER.unpack(header)
+            yield recv_time, f.read(length)
+
+
+def _subscription_id(frames: List[Tuple[float, bytes]]):
+    for _, raw in frames:
+        data = json.loads(raw)
+        if "params" in data and "subscription" in data["params"]:
+            return data["params"]["subscription"]
+    return 1
+
+
+# ------------------------
+# Recorder
+# ------------------------
+async def record(path: str, feed: str = "blocks", endpoint: str = WSS_ENDPOINT, duration: float = 60):
+    """Subscribe to `feed` (blocks / logs) on a live node and store every raw frame with its receive time."""
+    from block_stream import block_subscribe_message
+    from log_events import logs_subscribe_message
+
+    message = block_subscribe_message() if feed == "blocks" else logs_subscribe_message()
+    writer = CaptureWriter(path)
+    deadline = time.monotonic() + duration
+    try:
+        async with websockets.connect(endpoint, ssl=ssl_context if endpoint.startswith("wss") else None,
+                                      max_size=None, compression=None, ping_interval=20) as websocket:
+            await websocket.send(message)
+            while time.monotonic() < deadline:
+                try:
+                    frame = await asyncio.wait_for(websocket.recv(), timeout=deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                writer.write(frame, time.time())
+    finally:
+        writer.close()
+    print(f"✅ 錄製完成: {writer.frames} frames -> {path}")
+
+
+# ------------------------
+# Local websocket stand-in
+# ------------------------
+async def serve(path: str, host: str = "127.0.0.1", port: int = 8900, speed: float = 1.0, loop_forever: bool = False):
+    """
+    Replay a capture to every client that subscribes. speed=1 keeps the recorded
+    timing, speed=N is N times faster, speed=0 sends as fast as possible.
+    Subscription requests are answered with the recorded subscription id, so
+    listeners filtering on it work unchanged.
+    """
+    frames = [(t, raw) for t, raw in read_capture(path) if b'"method"' in raw]
+    subscription = _subscription_id(frames)
+
+    async def handler(websocket):
+        request = json.loads(await websocket.recv())
+        await websocket.send(json.dumps({"jsonrpc": "2.0", "id": request.get("id"), "result": subscription}))
+        while True:
+            start = time.monotonic()
+            first = frames[0][0] if frames else 0.0
+            for recv_time, raw in frames:
+                if speed > 0:
+                    delay = (recv_time - first) / speed - (time.monotonic() - start)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await websocket.send(raw.decode())
+            if not loop_forever:
+                break
+        await websocket.close()
+
+    async with websockets.serve(handler, host, port, max_size=None, compression=None):
+        print(f"Replaying {len(frames)} frames from {path} on ws://{host}:{port} (speed {speed or 'max'})")
+        await asyncio.Future()
+
+
+def _serve_process(path, host, port, speed):
+    asyncio.run(serve(path, host, port, speed))
+
+
+# ------------------------
+# Replay benchmark
+# ------------------------
+def _percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+
+
+async def _bench_listener(feed: str, endpoint: str, expected: int) -> Tuple[int, List[float]]:
+    """Run the repo's stream for `feed` against `endpoint`, timing every per-message decode call."""
+    import block_stream
+    import log_events
+
+    module, name = (block_stream, "decode_block_instructions") if feed == "blocks" else (log_events, "decode_log_events")
+    original = getattr(module, name)
+    latencies: List[float] = []
+    done = asyncio.Event()
+
+    def timed(*args, **kwargs):
+        t = time.perf_counter()
+        result = original(*args, **kwargs)
+        latencies.append(time.perf_counter() - t)
+        if len(latencies) >= expected:
+            done.set()
+        return result
+
+    setattr(module, name, timed)
+    events = 0
+    try:
+        if feed == "blocks":
+            async def consume():
+                nonlocal events
+                async for _ in block_stream.stream_pump_instructions(endpoint, include=("create", "buy", "sell")):
+                    events += 1
+            task = asyncio.ensure_future(consume())
+        else:
+            queue = asyncio.Queue()
+            task = asyncio.ensure_future(log_events.stream_log_events(queue, endpoint))
+
+        await done.wait()
+        await asyncio.sleep(0)  # let the last message's events reach the consumer
+        task.cancel()
+        if feed != "blocks":
+            events = queue.qsize()
+    finally:
+        setattr(module, name, original)
+    return events, latencies
+
+
+def bench(path: str, feed: str = "blocks", speed: float = 0, port: int = 8900):
+    """Replay a capture (in a separate server process) into the repo's listener and report throughput."""
+    method = NOTIFICATION_METHODS[feed].encode()
+    expected = sum(1 for _, raw in read_capture(path) if method in raw)
+    if not expected:
+        print(f"❌ {path} 裡沒有 {NOTIFICATION_METHODS[feed]}")
+        return
+
+    server = multiprocessing.Process(target=_serve_process, args=(path, "127.0.0.1", port, speed), daemon=True)
+    server.start()
+    time.sleep(1.0)  # let the server bind
+    try:
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        wall_start = time.perf_counter()
+        events, latencies = asyncio.run(_bench_listener(feed, f"ws://127.0.0.1:{port}", expected))
+        wall = time.perf_counter() - wall_start
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    finally:
+        server.terminate()
+
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    print(f"feed: {feed}  messages: {len(latencies)}  events: {events}  wall: {wall:.3f}s")
+    print(f"messages/sec: {len(latencies) / wall:,.1f}  events/sec: {events / wall:,.1f}")
+    print(f"decode latency per message: p50 {_percentile(latencies, 50) * 1e3:.3f} ms  "
+          f"p99 {_percentile(latencies, 99) * 1e3:.3f} ms  max {max(latencies) * 1e3:.3f} ms")
+    print(f"listener CPU: {cpu:.3f}s ({cpu / wall * 100:.1f}% of one core)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and replay Solana websocket traffic.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("record", help="Record raw notification frames from a live node")
+    p.add_argument("capture")
+    p.add_argument("--feed", choices=NOTIFICATION_METHODS, default="blocks")
+    p.add_argument("--endpoint", default=WSS_ENDPOINT)
+    p.add_argument("--duration", type=float, default=60, help="Seconds to record")
+
+    p = sub.add_parser("serve", help="Serve a capture on a local websocket")
+    p.add_argument("capture")
+    p.add_argument("--port", type=int, default=8900)
+    p.add_argument("--speed", type=float, default=1.0, help="1 = recorded timing, N = N x faster, 0 = max")
+    p.add_argument("--loop", action="store_true", help="Replay the capture forever")
+
+    p = sub.add_parser("bench", help="Replay a capture into the repo's listener and report throughput")
+    p.add_argument("capture")
+    p.add_argument("--feed", choices=NOTIFICATION_METHODS, default="blocks")
+    p.add_argument("--port", type=int, default=8900)
+    p.add_argument("--speed", type=float, default=0)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(record(args.capture, args.feed, args.endpoint, args.duration))
+    elif args.command == "serve":
+        asyncio.run(serve(args.capture, port=args.port, speed=args.speed, loop_forever=args.loop))
+    else:
+        bench(args.capture, args.feed, args.speed, args.port)
@@ -0,0 +1,140 @@
+from typing import Any, Dict, List, Optional
+
+import httpx
+from solana.rpc.async_api import AsyncClient
+
+from config import RPC_ENDPOINT_2, RPC_POOL_SIZES
+from metrics import register_collector
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2]); fall back to HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_POOL_SIZE = 10
+KEEPALIVE_EXPIRY = 60  # seconds an idle connection stays in the pool
+
+
+class RpcPool:
+    """
+    Process-wide pool of long-lived RPC clients, one AsyncClient per endpoint.
+    Every client shares keep-alive connections (HTTP/2 multiplexed when h2 is
+    installed), so only the first request to an endpoint pays the TCP+TLS handshake.
+    """
+
+    def __init__(self, pool_sizes: Optional[Dict[str, int]] = None, timeout: float = 10):
+        self.pool_sizes = dict(pool_sizes or {})
+        self.timeout = timeout
+        self._clients: Dict[str, AsyncClient] = {}
+        self._replaced: List[httpx.AsyncClient] = []  # providers' own sessions, closed in close()
+        self.metrics: Dict[str, Dict[str, int]] = {}
+
+    def _endpoint_metrics(self, endpoint: str) -> Dict[str, int]:
+        if endpoint not in self.metrics:
+            self.metrics[endpoint] = {"pool_hits": 0, "clients_created": 0, "tcp_connects": 0, "tls_handshakes": 0}
+        return self.metrics[endpoint]
+
+    def _make_session(self, endpoint: str) -> httpx.AsyncClient:
+        size = self.pool_sizes.get(endpoint, DEFAULT_POOL_SIZE)
+        metrics = self._endpoint_metrics(endpoint)
+
+        async def trace(event_name, info):
+            # httpcore trace events; only the connection setup ones are counted
+            if event_name == "connection.connect_tcp.complete":
+                metrics["tcp_connects"] += 1
+            elif event_name == "connection.start_tls.complete":
+                metrics["tls_handshakes"] += 1
+
+        async def attach_trace(request: httpx.Request):
+            request.extensions["trace"] = trace
+
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=size,
+                max_keepalive_connections=size,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={"request": [attach_trace]},
+        )
+
+    def client(self, endpoint: str = RPC_ENDPOINT_2) -> AsyncClient:
+        """Shared AsyncClient for `endpoint`. Do not close it (or use it in `async with`)."""
+        metrics = self._endpoint_metrics(endpoint)
+        client = self._clients.get(endpoint)
+        if client is not None:
+            metrics["pool_hits"] += 1
+            return client
+
+        client = AsyncClient(endpoint, timeout=self.timeout)
+        # Pinned to solana-py 0.36.6: AsyncHTTPProvider.__init__ always creates its own
+        # httpx.AsyncClient and takes no session argument, so it is swapped for the pooled one
+        # here (private `_provider.session`; re-check on upgrade). The replaced session never
+        # sends a request, so it holds no connections; it is still aclose()d with the pool.
+        self._replaced.append(client._provider.session)
+        client._provider.session = self._make_session(endpoint)
+        self._clients[endpoint] = client
+        metrics["clients_created"] += 1
+        return client
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {endpoint: dict(m) for endpoint, m in self.metrics.items()}
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+        for session in self._replaced:
+            await session.aclose()
+        self._replaced.clear()
+
+
+class JsonRpcError(RuntimeError):
+    """The node answered a raw JSON-RPC request with an error object."""
+
+    def __init__(self, error: dict):
+        super().__init__(f"{error.get('code')}: {error.get('message')}")
+        self.code = error.get("code")
+
+
+async def json_rpc(client: AsyncClient, method: str, params: list) -> Any:
+    """
+    Raw JSON-RPC call over `client`'s pooled session, returning the plain `result`.
+    For large responses (full blocks) where solders' typed parsing costs more than
+    the data is worth. HTTP errors surface as httpx.HTTPStatusError, so 429s are
+    still seen by rate_limiter.
+    """
+    provider = client._provider
+    response = await provider.session.post(
+        provider.endpoint_uri, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+    response.raise_for_status()
+    data = response.json()
+    if "error" in data:
+        raise JsonRpcError(data["error"])
+    return data["result"]
+
+
+_POOL: Optional[RpcPool] = None
+
+
+def get_rpc_pool() -> RpcPool:
+    global _POOL
+    if _POOL is None:
+        _POOL = RpcPool(RPC_POOL_SIZES)
+        register_collector("rpc_pool", _POOL.stats, label="endpoint")
+    return _POOL
+
+
+def get_rpc_client(endpoint: str = RPC_ENDPOINT_2) -> AsyncClient:
+    """The single way to get an RPC client: a pooled, long-lived AsyncClient."""
+    return get_rpc_pool().client(endpoint)
+
+
+async def close_rpc_pool():
+    global _POOL
+    if _POOL is not None:
+        await _POOL.close()
+        _POOL = None
@@ -0,0 +1,150 @@
+import hashlib
+import math
+from collections import OrderedDict
+from typing import List, Optional
+
+from config import SEEN_INDEX_MAX_BYTES, SEEN_INDEX_LRU_ENTRIES, SEEN_INDEX_FP_RATE
+from metrics import register_collector
+
+# 已處理過的 slot / 交易 signature / mint 索引：記憶體有上限，重連後重送的資料
+# 在打 RPC 之前就被擋掉。
+# Exact LRU for the recent window, rotating Bloom filter behind it for everything older.
+
+NS_BLOCK = "block"  # slots of processed blocks
+NS_TX = "tx"        # signatures of processed transactions
+NS_MINT = "mint"    # mints already priced / traded
+
+# rough CPython cost of one OrderedDict entry with a ~100 char str key
+_LRU_ENTRY_BYTES = 200
+
+
+class RotatingBloomFilter:
+    """
+    Two generations of `capacity` keys each. Inserts go to the current one; when
+    it is full the previous generation is dropped and the current one takes its
+    place, so memory stays fixed and a key is remembered for at least
+    `capacity` further inserts.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = max(1, capacity)
+        self.bits = max(64, int(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self._current = bytearray((self.bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._count = 0
+        self._previous_count = 0
+        self.rotations = 0
+
+    def _positions(self, key: bytes) -> List[int]:
+        # double hashing (Kirsch-Mitzenmacher) from one 128-bit digest
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    @staticmethod
+    def _test(array: bytearray, positions: List[int]) -> bool:
+        for p in positions:
+            if not array[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def __contains__(self, key: bytes) -> bool:
+        positions = self._positions(key)
+        return self._test(self._current, positions) or self._test(self._previous, positions)
+
+    def add(self, key: bytes) -> bool:
+        """Insert `key`; returns whether it was (probably) present already."""
+        positions = self._positions(key)
+        if self._test(self._current, positions):
+            return True
+        present = self._test(self._previous, positions)
+        if self._count >= self.capacity:
+            self._previous, self._current = self._current, bytearray(len(self._current))
+            self._previous_count, self._count = self._count, 0
+            self.rotations += 1
+        current = self._current
+        for p in positions:
+            current[p >> 3] |= 1 << (p & 7)
+        self._count += 1
+        return present
+
+    def _generation_fp(self, count: int) -> float:
+        return (1 - math.exp(-self.hashes * count / self.bits)) ** self.hashes
+
+    def estimated_fp_rate(self) -> float:
+        current, previous = self._generation_fp(self._count), self._generation_fp(self._previous_count)
+        return current + previous - current * previous
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._current) + len(self._previous)
+
+
+class SeenIndex:
+    """
+    "Have we handled this already?" for slots, signatures and mints, in at most
+    `max_bytes`. A hit in the exact LRU is certain; a hit only in the Bloom
+    filter is a probable duplicate (false-positive rate ~`fp_rate`) and is
+    counted separately as bloom_hits.
+    """
+
+    def __init__(self, max_bytes: int = SEEN_INDEX_MAX_BYTES, lru_entries: int = SEEN_INDEX_LRU_ENTRIES,
+                 fp_rate: float = SEEN_INDEX_FP_RATE):
+        bloom_bytes = max_bytes - lru_entries * _LRU_ENTRY_BYTES
+        if bloom_bytes <= 0:
+            raise ValueError(f"max_bytes {max_bytes} does not fit {lru_entries} LRU entries")
+        bits_per_generation = bloom_bytes * 8 // 2
+        capacity = int(bits_per_generation * math.log(2) ** 2 / -math.log(fp_rate))
+        self.lru_entries = lru_entries
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._bloom = RotatingBloomFilter(capacity, fp_rate)
+        self.counters = {"lookups": 0, "new": 0, "exact_hits": 0, "bloom_hits": 0}
+
+    def check_and_add(self, namespace: str, key) -> bool:
+        """True if `key` was seen before in `namespace`; records it either way."""
+        item = f"{namespace}:{key}"
+        self.counters["lookups"] += 1
+        if item in self._recent:
+            self._recent.move_to_end(item)
+            self.counters["exact_hits"] += 1
+            return True
+
+        present = self._bloom.add(item.encode())
+        self._recent[item] = None
+        if len(self._recent) > self.lru_entries:
+            self._recent.popitem(last=False)
+        if present:
+            self.counters["bloom_hits"] += 1
+            return True
+        self.counters["new"] += 1
+        return False
+
+    def __contains__(self, item) -> bool:
+        namespace, key = item
+        item = f"{namespace}:{key}"
+        return item in self._recent or item.encode() in self._bloom
+
+    def stats(self) -> dict:
+        return dict(
+            self.counters,
+            lru_size=len(self._recent),
+            bloom_capacity=self._bloom.capacity,
+            bloom_rotations=self._bloom.rotations,
+            bloom_bytes=self._bloom.nbytes,
+            estimated_fp_rate=self._bloom.estimated_fp_rate(),
+            # expected number of bloom_hits that were actually new keys
+            estimated_false_positives=self.counters["new"] * self._bloom.estimated_fp_rate(),
+        )
+
+
+_INDEX: Optional[SeenIndex] = None
+
+
+def get_seen_index() -> SeenIndex:
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = SeenIndex()
+        register_collector("seen_index", _INDEX.stats)
+    return _INDEX
@@ -0,0 +1,162 @@
+import asyncio
+import time
+import weakref
+from collections import deque
+from typing import Awaitable, Callable, Optional, Tuple, TYPE_CHECKING
+
+from config import BACKFILL_CONCURRENCY, BACKFILL_MIN_GAP, BACKFILL_MAX_SLOTS
+from metrics import register_collector
+from rate_limiter import get_rpc_limiter
+from seen_index import NS_BLOCK, get_seen_index
+
+if TYPE_CHECKING:
+    from solana.rpc.async_api import AsyncClient
+
+# 斷線重連 (或節點漏推) 之後，用 getBlocks / getBlock 把中間缺的 slot 補抓回來，
+# 丟回原本的解碼流程，事件標記為 late。
+# getBlock 經過 rate_limiter，同時最多 `concurrency` 個請求，依 slot 順序交回。
+
+SLOT_SECONDS = 0.4  # target slot time; a gap of N slots took N * 0.4s to produce live
+
+Runner = Callable[[Callable[["AsyncClient"], Awaitable]], Awaitable]
+Deliver = Callable[[int, dict], Awaitable[None]]
+
+_BACKFILLERS: "weakref.WeakSet[SlotBackfiller]" = weakref.WeakSet()
+
+
+def late_notification(slot: int, block: dict) -> dict:
+    """A getBlock result in blockNotification `result` shape, flagged late."""
+    return {"context": {"slot": slot}, "value": {"slot": slot, "err": None, "block": block}, "late": True,
+            "received": time.time()}
+
+
+class SlotGapTracker:
+    """
+    Remembers the last live slot of a block stream. blockSubscribe with
+    mentionsAccountOrProgram legitimately skips slots (skipped leaders, blocks
+    without pump.fun), so a gap only counts after a reconnect or when it is at
+    least `min_gap` slots wide. At most the newest `max_slots` are backfilled.
+    """
+
+    def __init__(self, min_gap: int = BACKFILL_MIN_GAP, max_slots: int = BACKFILL_MAX_SLOTS):
+        self.min_gap = min_gap
+        self.max_slots = max_slots
+        self.last_slot = 0
+
+    def observe(self, slot: int, reconnected: bool = False) -> Optional[Tuple[int, int]]:
+        """Record a live slot; returns the inclusive (start, end) slot range to backfill, if any."""
+        gap = None
+        if self.last_slot and slot > self.last_slot + 1:
+            missing = slot - self.last_slot - 1
+            if reconnected or missing >= self.min_gap:
+                gap = (max(self.last_slot + 1, slot - self.max_slots), slot - 1)
+        self.last_slot = max(self.last_slot, slot)
+        return gap
+
+
+class SlotBackfiller:
+    """
+    Fetches the blocks of a slot range through the rate limiter, `concurrency`
+    getBlock calls in flight, and hands each one to `deliver(slot, block)` in
+    slot order. Slots the seen index already has are not fetched.
+    """
+
+    def __init__(self, commitment: str = "confirmed", concurrency: int = BACKFILL_CONCURRENCY,
+                 runner: Optional[Runner] = None):
+        # getBlock does not serve "processed"
+        self.commitment = "confirmed" if commitment == "processed" else commitment
+        self.concurrency = max(1, concurrency)
+        self._runner = runner
+        self._tasks = set()
+        self.counters = {"gaps": 0, "slots_requested": 0, "blocks_fetched": 0, "blocks_missing": 0,
+                         "fetch_errors": 0, "seconds": 0.0}
+        if not _BACKFILLERS:
+            register_collector("backfill", backfill_stats)
+        _BACKFILLERS.add(self)
+
+    @property
+    def runner(self) -> Runner:
+        return self._runner or get_rpc_limiter().run
+
+    async def _confirmed_slots(self, start: int, end: int) -> list:
+        from rpc_pool import json_rpc
+        return await self.runner(lambda client: json_rpc(client, "getBlocks", [start, end, {"commitment": self.commitment}]))
+
+    async def _fetch(self, slot: int) -> Optional[dict]:
+        from rpc_pool import JsonRpcError, json_rpc
+        params = [slot, {"encoding": "base64", "transactionDetails": "full", "rewards": False,
+                         "maxSupportedTransactionVersion": 0, "commitment": self.commitment}]
+        try:
+            block = await self.runner(lambda client: json_rpc(client, "getBlock", params))
+        except JsonRpcError:  # skipped, or already out of the node's ledger
+            self.counters["blocks_missing"] += 1
+            return None
+        except Exception as e:
+            self.counters["fetch_errors"] += 1
+            print(f"⚠️ 補抓 slot {slot} 失敗: {e}")
+            return None
+        self.counters["blocks_fetched"] += 1
+        return block
+
+    async def backfill(self, start: int, end: int, deliver: Deliver) -> int:
+        """Fetch slots start..end (inclusive) and deliver them in order; returns blocks delivered."""
+        started = time.perf_counter()
+        self.counters["gaps"] += 1
+        seen = get_seen_index()
+        slots = deque(slot for slot in await self._confirmed_slots(start, end) if (NS_BLOCK, slot) not in seen)
+        self.counters["slots_requested"] += len(slots)
+
+        window = deque()
+        delivered = 0
+        try:
+            while slots or window:
+                while slots and len(window) < self.concurrency:
+                    slot = slots.popleft()
+                    window.append((slot, asyncio.ensure_future(self._fetch(slot))))
+                slot, fetch = window.popleft()
+                block = await fetch
+                if block is not None:
+                    await deliver(slot, block)
+                    delivered += 1
+        finally:
+            for _, fetch in window:
+                fetch.cancel()
+
+        elapsed = time.perf_counter() - started
+        self.counters["seconds"] += elapsed
+        live = (end - start + 1) * SLOT_SECONDS
+        print(f"🔁 補抓 slot {start}-{end}: {delivered} 個區塊，{elapsed:.2f} 秒 (即時需要 {live:.1f} 秒)")
+        return delivered
+
+    def start(self, gap: Tuple[int, int], deliver: Deliver) -> asyncio.Future:
+        """Run backfill(*gap) in the background; the live stream keeps flowing meanwhile."""
+        print(f"⚠️ 偵測到 slot 缺口 {gap[0]}-{gap[1]} ({gap[1] - gap[0] + 1} 個 slot)，開始補抓")
+        task = asyncio.ensure_future(self._run(gap, deliver))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, gap: Tuple[int, int], deliver: Deliver):
+        try:
+            await self.backfill(gap[0], gap[1], deliver)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # getBlocks failed: the live stream must keep going
+            self.counters["fetch_errors"] += 1
+            print(f"❌ 補抓 slot {gap[0]}-{gap[1]} 失敗: {e}")
+
+    def cancel(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+    def stats(self) -> dict:
+        return dict(self.counters, running=len(self._tasks))
+
+
+def backfill_stats() -> dict:
+    """stats() summed over every live backfiller (one per block stream)."""
+    total: dict = {}
+    for backfiller in list(_BACKFILLERS):
+        for key, value in backfiller.stats().items():
+            total[key] = total.get(key, 0) + value
+    return total
@@ -0,0 +1,197 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from functools import partial
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Hashable, Iterable, List, Optional
+
+from block_stream import PumpInstruction, decode_notification
+from config import PUMP_PROGRAM, WSS_RACE_ENDPOINTS, RACE_DEDUPE_WINDOW
+from log_events import decode_notification_events
+from metrics import register_collector
+from seen_index import NS_BLOCK, NS_TX, get_seen_index
+from slot_backfill import SlotBackfiller, SlotGapTracker, late_notification
+from subscription_manager import DEFAULT_QUEUE_SIZE, block_subscribe_params, get_subscription_manager, \
+    logs_subscribe_params
+
+if TYPE_CHECKING:
+    from token_filter import TokenFilter
+
+# 同一個訂閱同時開在多個節點上，誰先送到就用誰的；後到的重複通知只用來記錄領先時間。
+# Dedupe happens on the raw notification (slot for blocks, signature for logs), so the
+# losing copy is never decoded.
+
+_LEAD_SAMPLES = 2048
+
+_RACES: List["StreamRace"] = []
+
+
+def slot_key(result: dict) -> Hashable:
+    return result["context"]["slot"]
+
+
+def signature_key(result: dict) -> Hashable:
+    return result["value"]["signature"]
+
+
+class StreamRace:
+    """
+    One subscription (method + params) on every endpoint, merged into a single
+    stream where each notification is delivered once, from whichever endpoint
+    sent it first.
+
+    For each key the first arrival wins; later copies from the other endpoints
+    record how far behind they were (the winner's lead time). Keys are dropped
+    once every endpoint has delivered them, or beyond `window` (LRU).
+    """
+
+    def __init__(self, key: Callable[[dict], Hashable], endpoints: Iterable[str] = WSS_RACE_ENDPOINTS,
+                 window: int = RACE_DEDUPE_WINDOW, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.key = key
+        self.endpoints = list(dict.fromkeys(endpoints))
+        self.window = window
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._seen: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._subscriptions = []
+        self.counters: Dict[str, Dict[str, int]] = {
+            endpoint: {"received": 0, "wins": 0, "duplicates": 0} for endpoint in self.endpoints}
+        self._lead: Dict[str, deque] = {endpoint: deque(maxlen=_LEAD_SAMPLES) for endpoint in self.endpoints}
+        self.dropped = 0
+        self.method = None
+        if not _RACES:
+            register_collector("race", _race_metrics, label="stream")
+        _RACES.append(self)
+
+    def _on_result(self, endpoint: str, result: dict):
+        now = time.perf_counter()
+        counters = self.counters[endpoint]
+        counters["received"] += 1
+        key = self.key(result)
+        entry = self._seen.get(key)
+
+        if entry is None:
+            counters["wins"] += 1
+            self._seen[key] = (endpoint, now, {endpoint})
+            if len(self._seen) > self.window:
+                self._seen.popitem(last=False)
+            try:
+                self.queue.put_nowait(result)
+            except asyncio.QueueFull:
+                self.dropped += 1
+            return
+
+        winner, first_seen, arrived = entry
+        if endpoint in arrived:  # same node again, e.g. replay after its reconnect
+            counters["duplicates"] += 1
+            return
+        arrived.add(endpoint)
+        self._lead[winner].append(now - first_seen)
+        if len(arrived) == len(self.endpoints):
+            del self._seen[key]
+
+    async def start(self, method: str, params: list):
+        self.method = method
+        for endpoint in self.endpoints:
+            subscription = await get_subscription_manager(endpoint).subscribe(
+                method, params, callback=partial(self._on_result, endpoint))
+            self._subscriptions.append(subscription)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        return await self.queue.get()
+
+    async def close(self):
+        for subscription in self._subscriptions:
+            await subscription.close()
+        self._subscriptions.clear()
+        if self in _RACES:
+            _RACES.remove(self)
+
+    def stats(self) -> Dict[str, dict]:
+        total_wins = sum(c["wins"] for c in self.counters.values()) or 1
+        stats = {}
+        for endpoint, counters in self.counters.items():
+            lead = sorted(self._lead[endpoint])
+            stats[endpoint] = dict(
+                counters,
+                win_rate=counters["wins"] / total_wins,
+                lead_p50_ms=lead[len(lead) // 2] * 1e3 if lead else 0.0,
+                lead_p99_ms=lead[min(len(lead) - 1, int(len(lead) * 0.99))] * 1e3 if lead else 0.0,
+            )
+        return stats
+
+
+def race_stats() -> List[Dict[str, dict]]:
+    """stats() of every live race."""
+    return [race.stats() for race in _RACES]
+
+
+def _race_metrics() -> dict:
+    metrics = {"queued": sum(race.queue.qsize() for race in _RACES),
+               "dropped": sum(race.dropped for race in _RACES)}
+    for race in _RACES:
+        for endpoint, stats in race.stats().items():
+            metrics[f"{race.method} {endpoint}"] = stats
+    return metrics
+
+
+async def race_pump_instructions(
+    endpoints: Iterable[str] = WSS_RACE_ENDPOINTS,
+    include: Iterable[str] = ('create',),
+    commitment: str = "confirmed",
+    token_filter: Optional["TokenFilter"] = None,
+) -> AsyncIterator[PumpInstruction]:
+    """
+    block_stream.stream_pump_instructions over several endpoints, each block decoded once.
+    A single endpoint reconnecting leaves no gap (the others cover it), so only
+    gaps of BACKFILL_MIN_GAP slots across the merged stream are backfilled.
+    """
+    include = frozenset(include)
+    seen = get_seen_index()
+    race = StreamRace(slot_key, endpoints)
+    await race.start("blockSubscribe", block_subscribe_params(PUMP_PROGRAM, commitment))
+    print(f"Racing blocks mentioning program: {PUMP_PROGRAM} on {len(race.endpoints)} endpoints")
+    gaps = SlotGapTracker()
+    backfiller = SlotBackfiller(commitment)
+
+    async def deliver(slot: int, block: dict):
+        await race.queue.put(late_notification(slot, block))
+
+    try:
+        async for result in race:
+            value = result['value']
+            block = value.get('block')
+            if not result.get('late'):
+                gap = gaps.observe(value['slot'])
+                if gap:
+                    backfiller.start(gap, deliver)
+            if not block or seen.check_and_add(NS_BLOCK, value['slot']):
+                continue
+            for event in decode_notification(result, include, token_filter):
+                yield event
+    finally:
+        backfiller.cancel()
+        await race.close()
+
+
+async def race_log_events(
+    queue: asyncio.Queue,
+    endpoints: Iterable[str] = WSS_RACE_ENDPOINTS,
+    commitment: str = "processed",
+    kinds: Optional[Iterable[str]] = None,
+):
+    """log_events.stream_log_events over several endpoints, each transaction decoded once."""
+    seen = get_seen_index()
+    race = StreamRace(signature_key, endpoints)
+    await race.start("logsSubscribe", logs_subscribe_params(PUMP_PROGRAM, commitment))
+    print(f"Racing pump.fun events from program: {PUMP_PROGRAM} on {len(race.endpoints)} endpoints")
+    try:
+        async for result in race:
+            value = result['value']
+            if value.get('err') is not None or seen.check_and_add(NS_TX, value.get('signature')):
+                continue
+            for event in decode_notification_events(result, kinds):
+                await queue.put(event)
+    finally:
+        await race.close()
@@ -0,0 +1,302 @@
+import asyncio
+import itertools
+import json
+import ssl
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+import websockets
+
+from config import WSS_ENDPOINT, PUMP_PROGRAM, WSS_CONNECTIONS
+from metrics import observe, register_collector
+
+# 所有監聽器共用同一條 (或 N 條) WebSocket：依 subscription id 把通知分給各個訂閱，
+# 斷線重連後自動重新訂閱。
+
+# 不驗證憑證就不必載入系統 CA (create_default_context 會多花 ~50ms 啟動時間)
+ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+ssl_context.check_hostname = False
+ssl_context.verify_mode = ssl.CERT_NONE  # 不驗證 SSL 憑證
+
+# the node cancels these itself after the first notification
+ONE_SHOT_METHODS = frozenset({"signatureSubscribe"})
+DEFAULT_QUEUE_SIZE = 10000
+
+_CLOSED = object()
+
+
+def block_subscribe_params(program=PUMP_PROGRAM, commitment="confirmed", encoding="base64") -> list:
+    return [
+        {"mentionsAccountOrProgram": str(program)},
+        {
+            "commitment": commitment,
+            "encoding": encoding,
+            "showRewards": False,
+            "transactionDetails": "full",
+            "maxSupportedTransactionVersion": 0
+        }
+    ]
+
+
+def logs_subscribe_params(program=PUMP_PROGRAM, commitment="processed") -> list:
+    return [{"mentions": [str(program)]}, {"commitment": commitment}]
+
+
+class Subscription:
+    """
+    One logical subscription. Notification results go to `callback` (called inline
+    on the reader, keep it cheap) or, without one, to a bounded queue read with
+    `async for result in subscription`. Survives reconnects; the server-side id
+    changes, this object does not.
+    """
+
+    def __init__(self, method: str, params: list, callback: Optional[Callable[[dict], None]] = None,
+                 maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.method = method
+        self.params = params
+        self.callback = callback
+        self.queue: Optional[asyncio.Queue] = asyncio.Queue(maxsize) if callback is None else None
+        self.subscription_id: Optional[int] = None  # server id on the current connection
+        self.error = None
+        self.closed = False
+        self.notifications = 0
+        self.dropped = 0
+        self.generation = 0  # bumped on every (re)subscription; > 1 means there was a reconnect
+        self._connection: Optional["_Connection"] = None
+
+    def _deliver(self, result: dict):
+        self.notifications += 1
+        if self.callback is not None:
+            self.callback(result)
+            return
+        try:
+            self.queue.put_nowait(result)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _finish(self, error=None):
+        if self.closed:
+            return
+        self.closed = True
+        self.error = error
+        if self.queue is not None:
+            if self.queue.full():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        if self.queue is None:
+            raise TypeError("callback subscriptions are not iterable")
+        result = await self.queue.get()
+        if result is _CLOSED:
+            if self.error is not None:
+                raise RuntimeError(f"{self.method} failed: {self.error}")
+            raise StopAsyncIteration
+        return result
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.unsubscribe(self)
+        self._finish()
+
+
+class _Connection:
+    def __init__(self, endpoint: str, reconnect_delay: float):
+        self.endpoint = endpoint
+        self.reconnect_delay = reconnect_delay
+        self.subscriptions: Set[Subscription] = set()
+        self._by_id: Dict[int, Subscription] = {}
+        self._pending: Dict[int, Subscription] = {}
+        self._request_ids = itertools.count(1)
+        self._websocket = None
+        self.task: Optional[asyncio.Future] = None
+        self.connected = asyncio.Event()
+        self.counters = {"reconnects": 0, "notifications": 0, "unrouted": 0, "frame_errors": 0}
+        self._tasks: Set[asyncio.Task] = set()  # warmup.background imports this module, so keep our own
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ WebSocket 背景任務失敗: {type(task.exception()).__name__}: {task.exception()}")
+
+    async def _send(self, method: str, params: list, request_id: Optional[int] = None) -> bool:
+        if self._websocket is None:
+            return False
+        if request_id is None:
+            request_id = next(self._request_ids)
+        try:
+            await self._websocket.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+        except websockets.exceptions.ConnectionClosed:
+            return False
+        return True
+
+    async def _request(self, sub: Subscription):
+        # register before sending: the confirmation can arrive while send() is still awaiting
+        request_id = next(self._request_ids)
+        self._pending[request_id] = sub
+        if not await self._send(sub.method, sub.params, request_id):
+            self._pending.pop(request_id, None)  # run() resubscribes once connected
+
+    async def subscribe(self, sub: Subscription):
+        sub._connection = self
+        self.subscriptions.add(sub)
+        if self._websocket is not None:
+            await self._request(sub)
+
+    async def unsubscribe(self, sub: Subscription):
+        self.subscriptions.discard(sub)
+        if sub.subscription_id is not None:
+            self._by_id.pop(sub.subscription_id, None)
+            await self._send(sub.method.replace("Subscribe", "Unsubscribe"), [sub.subscription_id])
+            sub.subscription_id = None
+
+    def _handle(self, data: dict, received: float = 0.0):
+        request_id = data.get("id")
+        if request_id is not None:
+            sub = self._pending.pop(request_id, None)
+            if sub is None:
+                return  # unsubscribe acknowledgements
+            if "error" in data:
+                print(f"❌ {sub.method} 失敗: {data['error']}")
+                self.subscriptions.discard(sub)
+                sub._finish(data["error"])
+                return
+            if sub not in self.subscriptions:  # closed before the subscription was confirmed
+                self._spawn(self._send(sub.method.replace("Subscribe", "Unsubscribe"), [data["result"]]))
+                return
+            sub.subscription_id = data["result"]
+            sub.generation += 1
+            self._by_id[sub.subscription_id] = sub
+            return
+
+        params = data.get("params")
+        if not params:
+            return
+        sub = self._by_id.get(params.get("subscription"))
+        if sub is None:
+            self.counters["unrouted"] += 1
+            return
+        self.counters["notifications"] += 1
+        result = params["result"]
+        result["received"] = received  # wall clock of the frame, for per-stage latency downstream
+        sub._deliver(result)
+        if sub.method in ONE_SHOT_METHODS:
+            self._by_id.pop(sub.subscription_id, None)
+            self.subscriptions.discard(sub)
+            sub._finish()
+
+    async def run(self):
+        while True:
+            try:
+                async with websockets.connect(self.endpoint, ssl=ssl_context if self.endpoint.startswith("wss") else None,
+                                              max_size=None, compression=None, ping_interval=20) as websocket:
+                    self._websocket = websocket
+                    self.connected.set()
+                    self._by_id.clear()
+                    self._pending.clear()
+                    for sub in list(self.subscriptions):
+                        sub.subscription_id = None
+                        await self._request(sub)
+
+                    async for frame in websocket:
+                        received = time.time()
+                        started = time.perf_counter()
+                        try:
+                            data = json.loads(frame)
+                            observe("json_parse", time.perf_counter() - started)
+                            self._handle(data, received)
+                        except Exception as e:
+                            # 一個壞掉的 frame 不能拖垮整條連線 (和上面所有訂閱)，記下來繼續讀
+                            self.counters["frame_errors"] += 1
+                            print(f"⚠️ 無法處理的 WebSocket 訊息 ({type(e).__name__}: {e}): {str(frame)[:200]}")
+            except (websockets.exceptions.WebSocketException, OSError) as e:
+                print(f"⚠️ WebSocket 連線中斷 ({e})，{self.reconnect_delay} 秒後重新訂閱 {len(self.subscriptions)} 個訂閱...")
+            except Exception as e:  # anything else (a bad resubscribe, a library bug) must not end the connection for good
+                print(f"❌ WebSocket 連線異常 ({type(e).__name__}: {e})，{self.reconnect_delay} 秒後重新連線...")
+            finally:
+                self._websocket = None
+                self.connected.clear()
+            self.counters["reconnects"] += 1
+            await asyncio.sleep(self.reconnect_delay)
+
+
+class SubscriptionManager:
+    """
+    Owns `connections` websockets to one endpoint and spreads subscriptions over
+    them (fewest subscriptions first). Connections start on the first subscribe.
+    """
+
+    def __init__(self, endpoint: str = WSS_ENDPOINT, connections: int = WSS_CONNECTIONS, reconnect_delay: float = 5):
+        self.endpoint = endpoint
+        self._connections: List[_Connection] = [_Connection(endpoint, reconnect_delay) for _ in range(max(1, connections))]
+
+    def _start(self):
+        for connection in self._connections:
+            if connection.task is None:
+                connection.task = asyncio.ensure_future(connection.run())
+
+    async def connect(self, timeout: Optional[float] = None):
+        """Open every connection now (TCP + TLS + upgrade) instead of on the first subscribe."""
+        self._start()
+        await asyncio.wait_for(asyncio.gather(*(c.connected.wait() for c in self._connections)), timeout)
+
+    async def subscribe(self, method: str, params: list, callback: Optional[Callable[[dict], None]] = None,
+                        maxsize: int = DEFAULT_QUEUE_SIZE) -> Subscription:
+        self._start()
+        sub = Subscription(method, params, callback, maxsize)
+        await min(self._connections, key=lambda c: len(c.subscriptions)).subscribe(sub)
+        return sub
+
+    async def block_subscribe(self, program=PUMP_PROGRAM, commitment="confirmed", encoding="base64",
+                              callback=None) -> Subscription:
+        return await self.subscribe("blockSubscribe", block_subscribe_params(program, commitment, encoding), callback)
+
+    async def logs_subscribe(self, program=PUMP_PROGRAM, commitment="processed", callback=None) -> Subscription:
+        return await self.subscribe("logsSubscribe", logs_subscribe_params(program, commitment), callback)
+
+    async def account_subscribe(self, account, commitment="processed", encoding="base64", callback=None) -> Subscription:
+        return await self.subscribe("accountSubscribe", [str(account), {"encoding": encoding, "commitment": commitment}],
+                                    callback)
+
+    async def signature_subscribe(self, signature, commitment="confirmed", callback=None) -> Subscription:
+        return await self.subscribe("signatureSubscribe", [str(signature), {"commitment": commitment}], callback)
+
+    async def close(self):
+        for connection in self._connections:
+            for sub in list(connection.subscriptions):
+                await sub.close()
+            if connection.task is not None:
+                connection.task.cancel()
+                connection.task = None
+
+    def stats(self) -> dict:
+        stats = {"connections": len(self._connections), "subscriptions": 0, "dropped": 0}
+        for connection in self._connections:
+            stats["subscriptions"] += len(connection.subscriptions)
+            stats["dropped"] += sum(sub.dropped for sub in connection.subscriptions)
+            stats["queued"] = stats.get("queued", 0) + sum(
+                sub.queue.qsize() for sub in connection.subscriptions if sub.queue is not None)
+            for key, value in connection.counters.items():
+                stats[key] = stats.get(key, 0) + value
+        return stats
+
+
+_MANAGERS: Dict[str, SubscriptionManager] = {}
+
+
+def get_subscription_manager(endpoint: str = WSS_ENDPOINT) -> SubscriptionManager:
+    manager = _MANAGERS.get(endpoint)
+    if manager is None:
+        if not _MANAGERS:
+            register_collector("wss", lambda: {e: m.stats() for e, m in _MANAGERS.items()}, label="endpoint")
+        manager = _MANAGERS[endpoint] = SubscriptionManager(endpoint)
+    return manager
@@ -0,0 +1,297 @@
+import argparse
+import os
+import queue
+import sqlite3
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import CATALOG_PATH, CATALOG_BATCH_SIZE, CATALOG_FLUSH_INTERVAL, CATALOG_FLUSH_TIMEOUT
+from metrics import register_collector
+from pump_decoder import get_decoder
+from token_filter import create_strings
+
+# 所有看過的 create 事件存進 SQLite (WAL)：「某創建者的所有代幣」「最近一小時符合 Y 的代幣」直接查表，
+# 不用再 grep trades/ 底下的檔案。
+# Inserts are queued and committed in batches by a writer thread; queries use their own read connection.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    mint TEXT PRIMARY KEY,
+    bonding_curve TEXT,
+    associated_bonding_curve TEXT,
+    creator TEXT,
+    name TEXT,
+    symbol TEXT,
+    uri TEXT,
+    slot INTEGER,
+    signature TEXT,
+    seen REAL
+);
+CREATE INDEX IF NOT EXISTS tokens_creator ON tokens (creator, slot);
+CREATE INDEX IF NOT EXISTS tokens_symbol ON tokens (symbol COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tokens_slot ON tokens (slot);
+CREATE INDEX IF NOT EXISTS tokens_seen ON tokens (seen);
+"""
+
+_COLUMNS = ("mint", "bonding_curve", "associated_bonding_curve", "creator", "name", "symbol", "uri", "slot",
+            "signature", "seen")
+_INSERT = f"INSERT OR IGNORE INTO tokens ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+_FLUSH = object()
+_STOP = object()
+
+# create 指令的帳戶順序 (IDL)，add_raw 用
+_CREATE_ACCOUNTS = ("mint", "bondingCurve", "associatedBondingCurve", "user")
+
+
+class _RawCreate(NamedTuple):
+    """An undecoded create (token_filter rejected it); the writer thread turns it into a row."""
+    ix_data: bytes
+    keys: Tuple[Any, ...]      # Pubkeys of _CREATE_ACCOUNTS, None where missing
+    slot: int
+    signature: Any
+    seen: float
+
+
+def _raw_row(raw: _RawCreate) -> tuple:
+    try:
+        name, symbol, uri = (value.decode(errors="replace") for value in create_strings(raw.ix_data))
+    except struct.error:
+        name = symbol = uri = None
+    mint, bonding_curve, associated_bonding_curve, user = (str(key) if key is not None else None for key in raw.keys)
+    return (mint, bonding_curve, associated_bonding_curve, user, name, symbol, uri, raw.slot,
+            str(raw.signature) if raw.signature is not None else None, raw.seen)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")  # WAL: a crash loses at most the last commits, never corrupts
+    return connection
+
+
+def _like(text: str) -> str:
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+@dataclass(frozen=True)
+class TokenQuery:
+    """Catalog filter: trade.py's --match / --bro, plus a time or slot window."""
+    match: Optional[str] = None        # substring of name or symbol, case-insensitive
+    creator: Optional[str] = None      # --bro
+    since: Optional[float] = None      # unix time first seen
+    since_slot: Optional[int] = None
+
+    def where(self) -> Tuple[str, list]:
+        clauses, params = [], []
+        if self.match:
+            clauses.append("(name LIKE ? ESCAPE '\\' OR symbol LIKE ? ESCAPE '\\')")
+            params += [_like(self.match)] * 2
+        if self.creator:
+            clauses.append("creator = ?")
+            params.append(self.creator)
+        if self.since is not None:
+            clauses.append("seen >= ?")
+            params.append(self.since)
+        if self.since_slot is not None:
+            clauses.append("slot >= ?")
+            params.append(self.since_slot)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class CatalogError(RuntimeError):
+    pass
+
+
+class TokenCatalog:
+    """
+    SQLite catalog of create events.
+
+    add() only queues the row; the writer thread inserts everything queued
+    in one transaction, committing every `batch_size` rows or
+    `flush_interval` seconds, whichever comes first. Duplicate mints
+    (reconnect replays, backfill) are ignored. If a write fails the thread
+    stops and keeps the error: later adds are dropped and counted, flush()
+    raises CatalogError.
+    """
+
+    def __init__(self, path: str = CATALOG_PATH, batch_size: int = CATALOG_BATCH_SIZE,
+                 flush_interval: float = CATALOG_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        connection = _connect(path)
+        connection.executescript(_SCHEMA)
+        connection.close()
+        self._reader: Optional[sqlite3.Connection] = None
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._flushed = threading.Condition()
+        self._queued = 0
+        self._committed = 0
+        self.counters = {"rows": 0, "commits": 0, "max_batch": 0, "queries": 0, "errors": 0, "dropped": 0}
+        self.error: Optional[BaseException] = None
+        self._create_accounts = [get_decoder().instruction('create').account_names.index(name)
+                                 for name in _CREATE_ACCOUNTS]
+        self._thread = threading.Thread(target=self._run, name="token-catalog", daemon=True)
+        self._thread.start()
+
+    def add(self, args: dict, slot: int = 0, signature: Optional[str] = None, seen: Optional[float] = None):
+        """Queue a create event's args (IDL field names, as block_stream / log_events yield them)."""
+        if self.error is not None:  # writer is gone: do not queue rows nobody will insert
+            self.counters["dropped"] += 1
+            return
+        self._queued += 1
+        self._queue.put((args['mint'], args.get('bondingCurve'), args.get('associatedBondingCurve'), args.get('user'),
+                         args.get('name'), args.get('symbol'), args.get('uri'), slot, signature,
+                         seen if seen is not None else time.time()))
+
+    def add_raw(self, ix_data: bytes, keys: Sequence, accounts: bytes, slot: int = 0, signature=None,
+                seen: Optional[float] = None):
+        """
+        Queue a create straight out of the transaction message (token_filter's
+        on_reject), without decoding it here: strings and base58 are done on
+        the writer thread. Creates without a mint account are skipped.
+        """
+        picked = tuple(keys[accounts[i]] if i < len(accounts) and accounts[i] < len(keys) else None
+                       for i in self._create_accounts)
+        if picked[0] is None:
+            return
+        if self.error is not None:
+            self.counters["dropped"] += 1
+            return
+        self._queued += 1
+        self._queue.put(_RawCreate(ix_data, picked, slot, signature, seen if seen is not None else time.time()))
+
+    def flush(self, timeout: Optional[float] = CATALOG_FLUSH_TIMEOUT) -> bool:
+        """
+        Block (from a thread, not the event loop) until everything added so far
+        is committed. False on timeout; CatalogError if the writer failed.
+        """
+        target = self._queued
+        self._queue.put(_FLUSH)
+        with self._flushed:
+            done = self._flushed.wait_for(lambda: self._committed >= target or self.error is not None, timeout)
+        if self.error is not None:
+            raise CatalogError(f"catalog writer stopped: {self.error}") from self.error
+        return done
+
+    def close(self, timeout: Optional[float] = CATALOG_FLUSH_TIMEOUT):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"⚠️ 代幣目錄 {timeout} 秒內沒寫完，{self._queued - self.counters['rows']} 筆可能未寫入")
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def _run(self):
+        connection = None
+        rows = []
+        deadline = None
+        stop = False
+        try:
+            connection = _connect(self.path)
+            while not stop:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = _FLUSH
+                force = False
+                while True:
+                    if item is _STOP:
+                        stop = force = True
+                    elif item is _FLUSH:
+                        force = True
+                    elif type(item) is _RawCreate:
+                        rows.append(_raw_row(item))
+                    else:
+                        rows.append(item)
+                    if len(rows) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if rows and deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if rows and (force or len(rows) >= self.batch_size or time.monotonic() >= deadline):
+                    with connection:  # one transaction per batch
+                        connection.executemany(_INSERT, rows)
+                    self.counters["rows"] += len(rows)
+                    self.counters["commits"] += 1
+                    self.counters["max_batch"] = max(self.counters["max_batch"], len(rows))
+                    with self._flushed:
+                        self._committed += len(rows)
+                        self._flushed.notify_all()
+                    rows, deadline = [], None
+                elif force:
+                    with self._flushed:
+                        self._flushed.notify_all()
+        except Exception as e:  # disk full, unwritable path...: the bot goes on, the catalog stops
+            self.counters["errors"] += 1
+            print(f"❌ 代幣目錄寫入失敗，之後的代幣將不會記錄: {e}")
+            with self._flushed:
+                self.error = e
+                self._flushed.notify_all()
+        finally:
+            if connection is not None:
+                connection.close()
+
+    # ------------------------
+    # queries
+    # ------------------------
+    def _execute(self, sql: str, params) -> sqlite3.Cursor:
+        if self._reader is None:
+            self._reader = _connect(self.path)
+            self._reader.row_factory = sqlite3.Row
+        self.counters["queries"] += 1
+        return self._reader.execute(sql, params)
+
+    def query(self, where: TokenQuery = TokenQuery(), limit: int = 100) -> List[dict]:
+        """Matching tokens, newest first. Rows still queued for the writer are not visible yet."""
+        clause, params = where.where()
+        rows = self._execute(f"SELECT * FROM tokens{clause} ORDER BY slot DESC, seen DESC LIMIT ?", params + [limit])
+        return [dict(row) for row in rows]
+
+    def count(self, where: TokenQuery = TokenQuery()) -> int:
+        clause, params = where.where()
+        return self._execute(f"SELECT COUNT(*) FROM tokens{clause}", params).fetchone()[0]
+
+    def get(self, mint: str) -> Optional[dict]:
+        row = self._execute("SELECT * FROM tokens WHERE mint = ?", (mint,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def stats(self) -> dict:
+        return dict(self.counters, queued=self._queued - self.counters["rows"])
+
+
+_CATALOG: Optional[TokenCatalog] = None
+
+
+def get_token_catalog() -> TokenCatalog:
+    global _CATALOG
+    if _CATALOG is None:
+        _CATALOG = TokenCatalog()
+        register_collector("catalog", _CATALOG.stats)
+    return _CATALOG
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the token catalog")
+    parser.add_argument("--db", default=CATALOG_PATH)
+    parser.add_argument("--match", type=str, help="Name or symbol contains this string")
+    parser.add_argument("--bro", type=str, help="Created by this user address")
+    parser.add_argument("--minutes", type=float, help="Only tokens first seen in the last N minutes")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    catalog = TokenCatalog(args.db)
+    where = TokenQuery(args.match, args.bro, time.time() - args.minutes * 60 if args.minutes else None)
+    for token in catalog.query(where, args.limit):
+        print(f"{token['slot']:>10} {token['mint']} {token['symbol']:>12}  {token['name']}  (creator {token['creator']})")
+    print(f"{catalog.count(where)} tokens")
+    catalog.close()
@@ -0,0 +1,249 @@
+import asyncio
+import os
+import struct
+import time
+from array import array
+from collections import deque
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import base58
+
+from config import WATCHLIST_RELOAD_INTERVAL
+from metrics import register_collector
+from pump_decoder import DISCRIMINATOR_SIZE, get_decoder
+
+# 觀察清單過濾：名稱 / 代號 / uri 的字串規則編成一個 Aho-Corasick 自動機，創建者是 32 bytes 公鑰的 set，
+# 直接在 create 指令的原始 bytes 上比對，不符合的代幣不做 base58 / dict。
+#
+# Watchlist file, one rule per line (blank lines and # comments ignored):
+#   pepe               name or symbol contains "pepe" (case-insensitive, ASCII)
+#   name:moon          only that field; fields are name, symbol, uri
+#   creator:<base58>   created by this wallet
+#   !name:rug          negative: never pass a token matching this rule
+#   !creator:<base58>
+# A token passes if it hits no negative rule, its creator is listed (when any creator rule exists)
+# and it hits a text rule (when any positive text rule exists) -- the same AND as --match with --bro.
+# --match / --bro are a separate rule set that must pass as well, so with --watchlist they narrow
+# the file's rules down instead of adding alternatives to them.
+
+TEXT_FIELDS = ("name", "symbol", "uri")
+DEFAULT_FIELDS = ("name", "symbol")
+
+_STR_LEN = struct.Struct("<I")
+
+
+class AhoCorasick:
+    """
+    Byte-level Aho-Corasick automaton compiled to a dense transition table,
+    so scanning is one array lookup per input byte. Pattern i hitting sets
+    bit i of the scan() result.
+    """
+
+    def __init__(self, patterns: Sequence[bytes]):
+        goto: List[Dict[int, int]] = [{}]
+        out = [0]
+        for i, pattern in enumerate(patterns):
+            state = 0
+            for byte in pattern:
+                nxt = goto[state].get(byte)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][byte] = nxt
+                    goto.append({})
+                    out.append(0)
+                state = nxt
+            out[state] |= 1 << i
+
+        # states in BFS order: a state's failure target is always shallower, so already complete
+        fail = [0] * len(goto)
+        # rows are premultiplied by 256: next = delta[state | byte]
+        delta = array("I", bytes(4 * 256 * len(goto)))
+        for byte, target in goto[0].items():
+            delta[byte] = target << 8
+        pending = deque(goto[0].values())
+        while pending:
+            state = pending.popleft()
+            base, fail_base = state << 8, fail[state] << 8
+            delta[base:base + 256] = delta[fail_base:fail_base + 256]
+            for byte, target in goto[state].items():
+                fail[target] = delta[fail_base | byte] >> 8
+                out[target] |= out[fail[target]]
+                delta[base | byte] = target << 8
+                pending.append(target)
+        self.delta = delta
+        self.out = out
+        self.states = len(goto)
+
+    def scan(self, data: bytes) -> int:
+        delta, out = self.delta, self.out
+        state = hits = 0
+        for byte in data:
+            state = delta[state | byte]
+            found = out[state >> 8]
+            if found:
+                hits |= found
+        return hits
+
+
+class CompiledWatchlist:
+    """Immutable rule set; TokenFilter swaps a new one in on reload."""
+
+    def __init__(self, rules: Iterable[Tuple[bool, Optional[str], str]]):
+        patterns: List[bytes] = []
+        self.field_masks = {field: 0 for field in TEXT_FIELDS}
+        self.positive = self.negative = 0
+        creators, blocked = set(), set()
+        for negative, field, value in rules:
+            if field == "creator":
+                (blocked if negative else creators).add(base58.b58decode(value))
+                continue
+            bit = 1 << len(patterns)
+            patterns.append(value.encode().lower())
+            for name in (DEFAULT_FIELDS if field is None else (field,)):
+                self.field_masks[name] |= bit
+            if negative:
+                self.negative |= bit
+            else:
+                self.positive |= bit
+        self.patterns = patterns
+        self.automaton = AhoCorasick(patterns) if patterns else None
+        self.creators: FrozenSet[bytes] = frozenset(creators)
+        self.blocked: FrozenSet[bytes] = frozenset(blocked)
+        self.empty = not patterns and not creators and not blocked
+
+    def match(self, name: bytes, symbol: bytes, uri: bytes, creator: Optional[bytes]) -> bool:
+        if creator in self.blocked or (self.creators and creator not in self.creators):
+            return False
+        if self.automaton is None:
+            return True
+        scan, masks = self.automaton.scan, self.field_masks
+        hits = scan(name.lower()) & masks["name"] | scan(symbol.lower()) & masks["symbol"]
+        if masks["uri"]:
+            hits |= scan(uri.lower()) & masks["uri"]
+        if hits & self.negative:
+            return False
+        return not self.positive or bool(hits & self.positive)
+
+
+def parse_watchlist(lines: Iterable[str]) -> List[Tuple[bool, Optional[str], str]]:
+    """(negative, field or None for name+symbol, value) per rule; raises ValueError on a bad line."""
+    rules = []
+    for number, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        negative = line.startswith("!")
+        line = line[1:].strip() if negative else line
+        field, value = None, line
+        prefix, sep, rest = line.partition(":")
+        if sep and prefix.strip().lower() in TEXT_FIELDS + ("creator",):
+            field, value = prefix.strip().lower(), rest.strip()
+        if not value:
+            raise ValueError(f"line {number}: empty rule")
+        if field == "creator" and len(base58.b58decode(value)) != 32:
+            raise ValueError(f"line {number}: {value} is not a 32 byte address")
+        rules.append((negative, field, value))
+    return rules
+
+
+def create_strings(ix_data: bytes) -> Tuple[bytes, bytes, bytes]:
+    """name, symbol, uri of a raw create instruction, as undecoded UTF-8 bytes."""
+    offset = DISCRIMINATOR_SIZE
+    values = []
+    for _ in range(3):
+        (length,) = _STR_LEN.unpack_from(ix_data, offset)
+        offset += _STR_LEN.size
+        if offset + length > len(ix_data):
+            raise struct.error("string runs past the instruction data")
+        values.append(ix_data[offset:offset + length])
+        offset += length
+    return values[0], values[1], values[2]
+
+
+class TokenFilter:
+    """
+    Watchlist file AND the --match / --bro rules, checked against raw create
+    instructions. run() re-reads the file when its mtime changes (compiling
+    off the event loop) and keeps the previous rules if the new file does not
+    parse. `on_reject(ix_data, keys, accounts, slot, signature)` sees every
+    rejected create, still undecoded (trade.py catalogs them).
+    """
+
+    def __init__(self, path: Optional[str] = None, match: Optional[str] = None, creator: Optional[str] = None,
+                 reload_interval: float = WATCHLIST_RELOAD_INTERVAL, on_reject: Optional[Callable] = None):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.on_reject = on_reject
+        self.required = CompiledWatchlist(([(False, None, match)] if match else []) +
+                                          ([(False, "creator", creator)] if creator else []))
+        self._mtime = None
+        self._user_index = get_decoder().instruction('create').account_names.index('user')
+        self.counters = {"scanned": 0, "matched": 0, "rejected": 0, "malformed": 0, "reloads": 0, "reload_errors": 0}
+        self._rate_mark = (time.monotonic(), 0, 0)
+        self.compiled = self._compile()
+        register_collector("watchlist", self.stats)
+
+    @property
+    def active(self) -> bool:
+        return not (self.required.empty and self.compiled.empty)
+
+    def _compile(self) -> CompiledWatchlist:
+        rules = []
+        if self.path:
+            self._mtime = os.stat(self.path).st_mtime
+            with open(self.path) as f:
+                rules += parse_watchlist(f)
+        return CompiledWatchlist(rules)
+
+    def match_fields(self, name: bytes, symbol: bytes, uri: bytes, creator: Optional[bytes]) -> bool:
+        self.counters["scanned"] += 1
+        if self.required.match(name, symbol, uri, creator) and self.compiled.match(name, symbol, uri, creator):
+            self.counters["matched"] += 1
+            return True
+        self.counters["rejected"] += 1
+        return False
+
+    def match_instruction(self, ix_data: bytes, keys: Sequence, accounts: bytes) -> bool:
+        """A create instruction straight out of the transaction message (keys: message.account_keys)."""
+        try:
+            name, symbol, uri = create_strings(ix_data)
+        except struct.error:
+            self.counters["malformed"] += 1
+            return False
+        index = accounts[self._user_index] if len(accounts) > self._user_index else len(keys)
+        creator = bytes(keys[index]) if index < len(keys) else None
+        return self.match_fields(name, symbol, uri, creator)
+
+    async def run(self):
+        """Hot reload loop for the watchlist file."""
+        while self.path:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                continue
+            if mtime == self._mtime:
+                continue
+            try:
+                compiled = await asyncio.to_thread(self._compile)
+            except (OSError, ValueError) as e:
+                self._mtime = mtime  # do not retry the same broken file every interval
+                self.counters["reload_errors"] += 1
+                print(f"⚠️ 觀察清單 {self.path} 載入失敗，沿用舊規則: {e}")
+                continue
+            self.compiled = compiled
+            self.counters["reloads"] += 1
+            print(f"🔄 觀察清單已重新載入: {len(compiled.patterns)} 字串規則, "
+                  f"{len(compiled.creators)} 創建者, {len(compiled.blocked)} 封鎖")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        since, scanned, matched = self._rate_mark
+        elapsed = max(now - since, 1e-9)
+        self._rate_mark = (now, self.counters["scanned"], self.counters["matched"])
+        return dict(self.counters, patterns=len(self.compiled.patterns) + len(self.required.patterns),
+                    creators=len(self.compiled.creators) + len(self.required.creators),
+                    blocked_creators=len(self.compiled.blocked),
+                    scanned_per_sec=(self.counters["scanned"] - scanned) / elapsed,
+                    matches_per_sec=(self.counters["matched"] - matched) / elapsed)
+
@@ -0,0 +1,373 @@
+import argparse
+import glob
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+
+from config import JOURNAL_DIR, JOURNAL_SEGMENT_BYTES, JOURNAL_FSYNC_INTERVAL, JOURNAL_FSYNC_BYTES, JOURNAL_JSONL, \
+    JOURNAL_SYNC_TIMEOUT
+from metrics import register_collector
+
+# 交易日誌：事件迴圈只負責把記錄編碼成 bytes 丟進佇列，寫檔 / fsync / 換檔都在背景執行緒。
+# Segment file: records [length u32][crc32 u32][kind u8][time f64][mint 32B][body]
+#   length and crc cover everything after the crc; a torn tail fails the crc and ends the read.
+# Index file (segment-N.idx, next to segment-N.bin): [mint 32B][time f64][offset u64] per record,
+#   rebuilt from the segment if missing or short.
+
+KINDS = ("create", "buy", "sell", "fill", "error")
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+_FRAME = struct.Struct("<II")
+_HEADER = struct.Struct("<Bd32s")
+_INDEX_ENTRY = struct.Struct("<32sdQ")
+_CREATE = struct.Struct("<32s32s32s")     # bondingCurve, associatedBondingCurve, user
+_ORDER = struct.Struct("<64sQQ")          # signature, lamports, tokens (buy / sell submitted)
+_FILL = struct.Struct("<B64sQQQ")         # side, signature, lamports, tokens, slot
+_STR_LEN = struct.Struct("<H")
+_SIDES = ("buy", "sell")
+
+_STOP = object()
+
+
+def _pack_str(value: str) -> bytes:
+    raw = (value or "").encode()[:0xFFFF]
+    return _STR_LEN.pack(len(raw)) + raw
+
+
+def _unpack_strs(data: bytes, offset: int, count: int) -> List[str]:
+    values = []
+    for _ in range(count):
+        (length,) = _STR_LEN.unpack_from(data, offset)
+        offset += _STR_LEN.size
+        values.append(data[offset:offset + length].decode(errors="replace"))
+        offset += length
+    return values
+
+
+def _signature_bytes(signature: Optional[str]) -> bytes:
+    return bytes(Signature.from_string(signature)) if signature else bytes(64)
+
+
+def _signature_str(raw: bytes) -> Optional[str]:
+    return str(Signature.from_bytes(raw)) if any(raw) else None
+
+
+def encode_record(kind: str, mint: str, timestamp: float, fields: dict) -> bytes:
+    """One framed record; `fields` depend on `kind` (see decode_record for the names)."""
+    if kind == "create":
+        body = _CREATE.pack(bytes(Pubkey.from_string(fields["bondingCurve"])),
+                            bytes(Pubkey.from_string(fields["associatedBondingCurve"])),
+                            bytes(Pubkey.from_string(fields["user"]))) + \
+            _pack_str(fields.get("name")) + _pack_str(fields.get("symbol")) + _pack_str(fields.get("uri"))
+    elif kind in ("buy", "sell"):
+        body = _ORDER.pack(_signature_bytes(fields.get("signature")), fields.get("lamports", 0), fields.get("tokens", 0))
+    elif kind == "fill":
+        body = _FILL.pack(_SIDES.index(fields["side"]), _signature_bytes(fields.get("signature")),
+                          fields.get("lamports", 0), fields.get("tokens", 0), fields.get("slot", 0))
+    elif kind == "error":
+        body = _pack_str(str(fields.get("message", "")))
+    else:
+        raise ValueError(f"unknown journal record kind {kind!r}")
+    payload = _HEADER.pack(_KIND_CODES[kind], timestamp, bytes(Pubkey.from_string(mint))) + body
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_record(payload: bytes) -> dict:
+    """Inverse of encode_record for one payload (after length / crc)."""
+    code, timestamp, mint = _HEADER.unpack_from(payload)
+    kind = KINDS[code]
+    record = {"kind": kind, "time": timestamp, "mint": str(Pubkey.from_bytes(mint))}
+    offset = _HEADER.size
+    if kind == "create":
+        curve, associated, user = _CREATE.unpack_from(payload, offset)
+        name, symbol, uri = _unpack_strs(payload, offset + _CREATE.size, 3)
+        record.update(bondingCurve=str(Pubkey.from_bytes(curve)), associatedBondingCurve=str(Pubkey.from_bytes(associated)),
+                      user=str(Pubkey.from_bytes(user)), name=name, symbol=symbol, uri=uri)
+    elif kind in ("buy", "sell"):
+        signature, lamports, tokens = _ORDER.unpack_from(payload, offset)
+        record.update(signature=_signature_str(signature), lamports=lamports, tokens=tokens)
+    elif kind == "fill":
+        side, signature, lamports, tokens, slot = _FILL.unpack_from(payload, offset)
+        record.update(side=_SIDES[side], signature=_signature_str(signature), lamports=lamports, tokens=tokens, slot=slot)
+    else:
+        record["message"] = _unpack_strs(payload, offset, 1)[0]
+    return record
+
+
+def _segment_path(directory: str, number: int) -> str:
+    return os.path.join(directory, f"segment-{number:08d}.bin")
+
+
+def _segments(directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, "segment-*.bin")))
+
+
+class JournalError(RuntimeError):
+    pass
+
+
+class JournalWriter:
+    """
+    Append-only journal written by a background thread.
+
+    append() encodes the record and puts it on a queue, it never touches the
+    disk. The thread writes everything queued in one go, fsyncs once
+    `fsync_bytes` are unsynced or `fsync_interval` seconds have passed, and
+    starts a new segment past `segment_bytes` (fsyncing the full one first). With `jsonl_path` each record is
+    also appended there as a JSON line.
+
+    If a write fails (disk full etc.) the thread stops and keeps the error:
+    later appends are dropped and counted, sync() raises JournalError.
+    """
+
+    def __init__(self, directory: str = JOURNAL_DIR, segment_bytes: int = JOURNAL_SEGMENT_BYTES,
+                 fsync_interval: float = JOURNAL_FSYNC_INTERVAL, fsync_bytes: int = JOURNAL_FSYNC_BYTES,
+                 jsonl_path: Optional[str] = JOURNAL_JSONL):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.fsync_bytes = fsync_bytes
+        self.jsonl_path = jsonl_path
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._synced = threading.Condition()
+        self._written = 0   # records handed to the thread
+        self._durable = 0   # records fsynced
+        self.counters = {"records": 0, "bytes": 0, "fsyncs": 0, "segments": 0, "max_batch": 0, "errors": 0,
+                         "dropped": 0}
+        self.error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="trade-journal", daemon=True)
+        self._thread.start()
+
+    def append(self, kind: str, mint: str, timestamp: Optional[float] = None, **fields):
+        if self.error is not None:  # writer is gone: do not queue records nobody will write
+            self.counters["dropped"] += 1
+            return
+        self._written += 1
+        self._queue.put(encode_record(kind, mint, timestamp if timestamp is not None else time.time(), fields))
+
+    def sync(self, timeout: Optional[float] = JOURNAL_SYNC_TIMEOUT) -> bool:
+        """
+        Block (from a thread, not the event loop) until everything appended so
+        far is fsynced. False on timeout; JournalError if the writer failed.
+        """
+        target = self._written
+        self._queue.put(None)  # wake the writer for an immediate fsync
+        with self._synced:
+            done = self._synced.wait_for(lambda: self._durable >= target or self.error is not None, timeout)
+        if self.error is not None:
+            raise JournalError(f"journal writer stopped: {self.error}") from self.error
+        return done
+
+    def close(self, timeout: Optional[float] = JOURNAL_SYNC_TIMEOUT):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"⚠️ 交易日誌 {timeout} 秒內沒寫完，{self._written - self.counters['records']} 筆可能未寫入")
+
+    # ------------------------
+    # writer thread
+    # ------------------------
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        existing = _segments(self.directory)
+        number = int(os.path.basename(existing[-1])[8:16]) + 1 if existing else 0
+        path = _segment_path(self.directory, number)
+        self.counters["segments"] += 1
+        return open(path, "ab"), open(path[:-4] + ".idx", "ab")
+
+    def _run(self):
+        segment = index = jsonl = None
+        unsynced = 0
+        last_sync = time.monotonic()
+        pending = 0
+        stop = False
+        try:
+            segment, index = self._open_segment()
+            if self.jsonl_path:
+                os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+                jsonl = open(self.jsonl_path, "a")
+            while not stop:
+                try:
+                    item = self._queue.get(timeout=self.fsync_interval)
+                except queue.Empty:
+                    item = None
+                force = item is None
+                batch = []
+                while True:
+                    if item is _STOP:
+                        stop = force = True
+                    elif item is not None:
+                        batch.append(item)
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    force = force or item is None
+
+                if batch:
+                    offset = segment.tell()
+                    entries = []
+                    for record in batch:
+                        entries.append(_INDEX_ENTRY.pack(record[_FRAME.size + 9:_FRAME.size + 41],
+                                                         struct.unpack_from("<d", record, _FRAME.size + 1)[0], offset))
+                        offset += len(record)
+                    data = b"".join(batch)
+                    segment.write(data)
+                    index.write(b"".join(entries))
+                    if jsonl is not None:
+                        jsonl.write("".join(json.dumps(decode_record(r[_FRAME.size:])) + "\n" for r in batch))
+                    unsynced += len(data)
+                    pending += len(batch)
+                    self.counters["records"] += len(batch)
+                    self.counters["bytes"] += len(data)
+                    self.counters["max_batch"] = max(self.counters["max_batch"], len(batch))
+
+                now = time.monotonic()
+                rotate = segment.tell() >= self.segment_bytes
+                # a full segment is fsynced (and its records counted durable) before it is closed
+                if pending and (force or rotate or unsynced >= self.fsync_bytes
+                                or now - last_sync >= self.fsync_interval):
+                    for f in (segment, index, jsonl):
+                        if f is not None:
+                            f.flush()
+                    os.fsync(segment.fileno())
+                    os.fsync(index.fileno())
+                    self.counters["fsyncs"] += 1
+                    unsynced, last_sync = 0, now
+                    with self._synced:
+                        self._durable += pending
+                        self._synced.notify_all()
+                    pending = 0
+                elif force:
+                    with self._synced:
+                        self._synced.notify_all()
+
+                if rotate:
+                    segment.close()
+                    index.close()
+                    segment, index = self._open_segment()
+        except Exception as e:  # disk full etc.: trading goes on, the journal stops
+            self.counters["errors"] += 1
+            print(f"❌ 交易日誌寫入失敗，之後的紀錄將被丟棄: {e}")
+            with self._synced:
+                self.error = e
+                self._synced.notify_all()
+        finally:
+            for f in (segment, index, jsonl):
+                if f is not None:
+                    f.close()
+
+    def stats(self) -> dict:
+        return dict(self.counters, queued=self._written - self.counters["records"], durable=self._durable)
+
+
+class JournalReader:
+    """Reads segments back, using the .idx files to seek straight to one mint's or one time range's records."""
+
+    def __init__(self, directory: str = JOURNAL_DIR):
+        self.directory = directory
+
+    def _scan(self, path: str) -> Iterator[Tuple[int, bytes]]:
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + _FRAME.size <= len(data):
+            length, crc = _FRAME.unpack_from(data, offset)
+            payload = data[offset + _FRAME.size:offset + _FRAME.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return  # torn tail of a crashed write
+            yield offset, payload
+            offset += _FRAME.size + length
+
+    def index(self, path: str) -> List[Tuple[bytes, float, int]]:
+        """(mint, time, offset) per record of one segment."""
+        idx_path = path[:-4] + ".idx"
+        entries = []
+        if os.path.exists(idx_path):
+            with open(idx_path, "rb") as f:
+                raw = f.read()
+            entries = [_INDEX_ENTRY.unpack_from(raw, i) for i in range(0, len(raw) - _INDEX_ENTRY.size + 1, _INDEX_ENTRY.size)]
+        if entries and self._covers(path, entries[-1][2]):
+            return entries
+        return [(payload[9:41], struct.unpack_from("<d", payload, 1)[0], offset)
+                for offset, payload in self._scan(path)]
+
+    @staticmethod
+    def _covers(path: str, last_offset: int) -> bool:
+        # the index is written after its segment, so it can only be behind: check its last record ends the file
+        with open(path, "rb") as f:
+            f.seek(last_offset)
+            header = f.read(_FRAME.size)
+        if len(header) < _FRAME.size:
+            return False
+        return last_offset + _FRAME.size + _FRAME.unpack(header)[0] >= os.path.getsize(path)
+
+    def _read(self, path: str, offsets: List[int]) -> Iterator[dict]:
+        with open(path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                length, crc = _FRAME.unpack(f.read(_FRAME.size))
+                payload = f.read(length)
+                if len(payload) == length and zlib.crc32(payload) == crc:
+                    yield decode_record(payload)
+
+    def records(self, mint: Optional[str] = None, start: Optional[float] = None,
+                end: Optional[float] = None) -> Iterator[dict]:
+        """Records in append order, optionally only `mint` and / or start <= time < end."""
+        raw_mint = bytes(Pubkey.from_string(mint)) if mint else None
+        for path in _segments(self.directory):
+            entries = self.index(path)
+            if not entries:
+                continue
+            times = [entry[1] for entry in entries]
+            if (start is not None and max(times) < start) or (end is not None and min(times) >= end):
+                continue
+            offsets = [offset for m, t, offset in entries
+                       if (raw_mint is None or m == raw_mint)
+                       and (start is None or t >= start) and (end is None or t < end)]
+            yield from self._read(path, offsets)
+
+
+def export_jsonl(out_path: str, directory: str = JOURNAL_DIR, mint: Optional[str] = None,
+                 start: Optional[float] = None, end: Optional[float] = None) -> int:
+    """Write the selected records as JSON lines; returns how many."""
+    count = 0
+    with open(out_path, "w") as out:
+        for record in JournalReader(directory).records(mint, start, end):
+            out.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+_JOURNAL: Optional[JournalWriter] = None
+
+
+def get_journal() -> JournalWriter:
+    global _JOURNAL
+    if _JOURNAL is None:
+        _JOURNAL = JournalWriter()
+        register_collector("journal", _JOURNAL.stats)
+    return _JOURNAL
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read back the trade journal")
+    parser.add_argument("--dir", default=JOURNAL_DIR)
+    parser.add_argument("--mint", help="Only this mint")
+    parser.add_argument("--since", type=float, help="Unix time, inclusive")
+    parser.add_argument("--until", type=float, help="Unix time, exclusive")
+    parser.add_argument("--out", help="Export as JSON lines to this file instead of printing")
+    args = parser.parse_args()
+    if args.out:
+        print(f"{export_jsonl(args.out, args.dir, args.mint, args.since, args.until)} records -> {args.out}")
+    else:
+        for record in JournalReader(args.dir).records(args.mint, args.since, args.until):
+            print(json.dumps(record))
@@ -0,0 +1,299 @@
+import asyncio
+import struct
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+from solders.hash import Hash
+from solders.instruction import AccountMeta, Instruction
+from solders.keypair import Keypair
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.transaction import VersionedTransaction
+
+from bonding_curve import BondingCurveState
+from config import PUMP_PROGRAM, PUMP_GLOBAL, PUMP_FEE, PUMP_EVENT_AUTHORITY, SYSTEM_PROGRAM, SYSTEM_TOKEN_PROGRAM, \
+    SYSTEM_ASSOCIATED_TOKEN_ACCOUNT_PROGRAM, SYSTEM_RENT, PRIVATE_KEY, LAMPORTS_PER_SOL, COMPUTE_UNIT_LIMIT, \
+    PRIORITY_FEE_MICROLAMPORTS, BLOCKHASH_REFRESH_INTERVAL, BLOCKHASH_MAX_AGE, ATA_CACHE_SIZE, CONFIRM_TIMEOUT
+from curve_quote import quote_buy, quote_sell
+from metrics import StageTimer, observe, register_collector
+from pump_decoder import anchor_discriminator
+from rate_limiter import get_rpc_limiter
+
+# pump.fun buy / sell 交易組裝：固定帳戶的 AccountMeta、指令 discriminator、
+# compute budget 指令都在啟動時建好；熱路徑上只剩 mint 相關的三個帳戶、
+# 兩個 u64 參數、從背景更新的 blockhash 和簽名。
+
+_BUY_DATA = struct.Struct("<8sQQ")  # discriminator, amount, maxSolCost / minSolOutput
+BUY_DISCRIMINATOR = anchor_discriminator("global", "buy")
+SELL_DISCRIMINATOR = anchor_discriminator("global", "sell")
+_CREATE_ATA_IDEMPOTENT = bytes([1])
+
+# account-meta templates (IDL order), everything except mint / curve / user ATA
+_GLOBAL = AccountMeta(PUMP_GLOBAL, is_signer=False, is_writable=False)
+_FEE = AccountMeta(PUMP_FEE, is_signer=False, is_writable=True)
+_SYSTEM = AccountMeta(SYSTEM_PROGRAM, is_signer=False, is_writable=False)
+_TOKEN = AccountMeta(SYSTEM_TOKEN_PROGRAM, is_signer=False, is_writable=False)
+_ATA_PROGRAM = AccountMeta(SYSTEM_ASSOCIATED_TOKEN_ACCOUNT_PROGRAM, is_signer=False, is_writable=False)
+_RENT = AccountMeta(SYSTEM_RENT, is_signer=False, is_writable=False)
+_EVENT_AUTHORITY = AccountMeta(PUMP_EVENT_AUTHORITY, is_signer=False, is_writable=False)
+_PROGRAM = AccountMeta(PUMP_PROGRAM, is_signer=False, is_writable=False)
+
+
+class BlockhashCache:
+    """
+    Latest blockhash, refreshed every `interval` seconds by run() in the
+    background so signing never waits on getLatestBlockhash.
+    """
+
+    def __init__(self, interval: float = BLOCKHASH_REFRESH_INTERVAL, max_age: float = BLOCKHASH_MAX_AGE):
+        self.interval = interval
+        self.max_age = max_age
+        self.blockhash: Optional[Hash] = None
+        self.last_valid_block_height = 0
+        self.fetched_at = 0.0
+        self.counters = {"refreshes": 0, "errors": 0}
+
+    def set(self, blockhash: Hash, last_valid_block_height: int = 0):
+        self.blockhash = blockhash
+        self.last_valid_block_height = last_valid_block_height
+        self.fetched_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return dict(self.counters, age_seconds=time.monotonic() - self.fetched_at if self.fetched_at else -1)
+
+    def current(self) -> Hash:
+        if self.blockhash is None:
+            raise RuntimeError("no blockhash yet: BlockhashCache.run() has not completed a refresh")
+        if time.monotonic() - self.fetched_at > self.max_age:
+            raise RuntimeError(f"blockhash is {time.monotonic() - self.fetched_at:.0f}s old, refresh is failing")
+        return self.blockhash
+
+    async def refresh(self):
+        from solana.rpc.commitment import Confirmed
+        response = await get_rpc_limiter().run(lambda client: client.get_latest_blockhash(Confirmed))
+        self.set(response.value.blockhash, response.value.last_valid_block_height)
+        self.counters["refreshes"] += 1
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:  # keep the last one; current() starts failing after max_age
+                self.counters["errors"] += 1
+                print(f"⚠️ blockhash 更新失敗: {e}")
+            await asyncio.sleep(self.interval)
+
+
+class PumpTxBuilder:
+    """
+    Signed pump.fun buy / sell transactions for one preloaded keypair.
+    Associated token accounts are derived once per mint (LRU of `ata_cache_size`).
+    """
+
+    def __init__(self, keypair: Keypair, blockhashes: BlockhashCache,
+                 compute_unit_limit: int = COMPUTE_UNIT_LIMIT, priority_fee: int = PRIORITY_FEE_MICROLAMPORTS,
+                 ata_cache_size: int = ATA_CACHE_SIZE):
+        self.keypair = keypair
+        self.owner = keypair.pubkey()
+        self.blockhashes = blockhashes
+        self.ata_cache_size = ata_cache_size
+        self._atas: "OrderedDict[Pubkey, Pubkey]" = OrderedDict()
+        self._user = AccountMeta(self.owner, is_signer=True, is_writable=True)
+        self._budget = [set_compute_unit_limit(compute_unit_limit)]
+        if priority_fee:
+            self._budget.append(set_compute_unit_price(priority_fee))
+
+    def associated_token_account(self, mint: Pubkey) -> Pubkey:
+        ata = self._atas.get(mint)
+        if ata is not None:
+            self._atas.move_to_end(mint)
+            return ata
+        ata, _ = Pubkey.find_program_address(
+            [bytes(self.owner), bytes(SYSTEM_TOKEN_PROGRAM), bytes(mint)], SYSTEM_ASSOCIATED_TOKEN_ACCOUNT_PROGRAM)
+        self._atas[mint] = ata
+        if len(self._atas) > self.ata_cache_size:
+            self._atas.popitem(last=False)
+        return ata
+
+    def _create_ata(self, mint: Pubkey, ata: Pubkey) -> Instruction:
+        return Instruction(SYSTEM_ASSOCIATED_TOKEN_ACCOUNT_PROGRAM, _CREATE_ATA_IDEMPOTENT, [
+            self._user,
+            AccountMeta(ata, is_signer=False, is_writable=True),
+            AccountMeta(self.owner, is_signer=False, is_writable=False),
+            AccountMeta(mint, is_signer=False, is_writable=False),
+            _SYSTEM,
+            _TOKEN,
+        ])
+
+    def _curve_accounts(self, mint: Pubkey, bonding_curve: Pubkey, associated_bonding_curve: Pubkey,
+                        ata: Pubkey) -> List[AccountMeta]:
+        return [
+            _GLOBAL,
+            _FEE,
+            AccountMeta(mint, is_signer=False, is_writable=False),
+            AccountMeta(bonding_curve, is_signer=False, is_writable=True),
+            AccountMeta(associated_bonding_curve, is_signer=False, is_writable=True),
+            AccountMeta(ata, is_signer=False, is_writable=True),
+            self._user,
+            _SYSTEM,
+        ]
+
+    def _sign(self, instructions: List[Instruction]) -> VersionedTransaction:
+        message = MessageV0.try_compile(self.owner, instructions, [], self.blockhashes.current())
+        return VersionedTransaction(message, [self.keypair])
+
+    def build_buy(self, mint: Pubkey, bonding_curve: Pubkey, associated_bonding_curve: Pubkey,
+                  token_amount: int, max_sol_cost: int) -> VersionedTransaction:
+        """Create our ATA (idempotent) + buy exactly `token_amount`, paying at most `max_sol_cost` lamports."""
+        ata = self.associated_token_account(mint)
+        accounts = self._curve_accounts(mint, bonding_curve, associated_bonding_curve, ata)
+        accounts += [_TOKEN, _RENT, _EVENT_AUTHORITY, _PROGRAM]
+        buy = Instruction(PUMP_PROGRAM, _BUY_DATA.pack(BUY_DISCRIMINATOR, token_amount, max_sol_cost), accounts)
+        return self._sign(self._budget + [self._create_ata(mint, ata), buy])
+
+    def build_sell(self, mint: Pubkey, bonding_curve: Pubkey, associated_bonding_curve: Pubkey,
+                   token_amount: int, min_sol_output: int) -> VersionedTransaction:
+        """Sell `token_amount` for at least `min_sol_output` lamports."""
+        ata = self.associated_token_account(mint)
+        accounts = self._curve_accounts(mint, bonding_curve, associated_bonding_curve, ata)
+        accounts += [_ATA_PROGRAM, _TOKEN, _EVENT_AUTHORITY, _PROGRAM]
+        sell = Instruction(PUMP_PROGRAM, _BUY_DATA.pack(SELL_DISCRIMINATOR, token_amount, min_sol_output), accounts)
+        return self._sign(self._budget + [sell])
+
+    def buy_for_sol(self, mint: Pubkey, bonding_curve: Pubkey, associated_bonding_curve: Pubkey,
+                    state: BondingCurveState, sol_in: int, slippage: float) -> Tuple[VersionedTransaction, int]:
+        """Buy with `sol_in` lamports at the current curve price; returns (tx, expected tokens)."""
+        token_amount = quote_buy(state, sol_in)
+        if token_amount <= 0:
+            raise ValueError("bonding curve is complete or sol_in too small")
+        return self.build_buy(mint, bonding_curve, associated_bonding_curve, token_amount,
+                              int(sol_in * (1 + slippage))), token_amount
+
+    def sell_for_min(self, mint: Pubkey, bonding_curve: Pubkey, associated_bonding_curve: Pubkey,
+                     state: BondingCurveState, token_amount: int, slippage: float) -> Tuple[VersionedTransaction, int]:
+        """Sell `token_amount` accepting `slippage` below the current quote; returns (tx, expected lamports)."""
+        sol_out = quote_sell(state, token_amount)
+        return self.build_sell(mint, bonding_curve, associated_bonding_curve, token_amount,
+                               int(sol_out * (1 - slippage))), sol_out
+
+
+_BLOCKHASHES: Optional[BlockhashCache] = None
+_BUILDER: Optional[PumpTxBuilder] = None
+
+
+def get_blockhash_cache() -> BlockhashCache:
+    global _BLOCKHASHES
+    if _BLOCKHASHES is None:
+        _BLOCKHASHES = BlockhashCache()
+        register_collector("blockhash", _BLOCKHASHES.stats)
+    return _BLOCKHASHES
+
+
+def get_tx_builder() -> PumpTxBuilder:
+    """Builder for config.PRIVATE_KEY (base58); start get_blockhash_cache().run() alongside it."""
+    global _BUILDER
+    if _BUILDER is None:
+        _BUILDER = PumpTxBuilder(Keypair.from_base58_string(PRIVATE_KEY), get_blockhash_cache())
+    return _BUILDER
+
+
+async def send_transaction(tx: VersionedTransaction) -> str:
+    """Submit without preflight (the quote already bounds the price); returns the signature."""
+    from solana.rpc.types import TxOpts
+    response = await get_rpc_limiter().run(
+        lambda client: client.send_raw_transaction(bytes(tx), TxOpts(skip_preflight=True)))
+    return str(response.value)
+
+
+async def send_and_confirm(tx: VersionedTransaction, stage: str, timeout: float = CONFIRM_TIMEOUT) -> Optional[str]:
+    """
+    Send `tx` and wait for signatureSubscribe to report it confirmed. The
+    subscription is opened before sending so the notification cannot be missed.
+    Records `<stage>_submit` and `<stage>_confirm`; returns the signature, or
+    None if it failed on chain or was not confirmed within `timeout`.
+    """
+    from subscription_manager import get_subscription_manager
+    signature = str(tx.signatures[0])
+    subscription = await get_subscription_manager().signature_subscribe(signature, "confirmed")
+    try:
+        with StageTimer(f"{stage}_submit"):
+            await send_transaction(tx)
+        sent = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(subscription.__anext__(), timeout)
+        except (asyncio.TimeoutError, StopAsyncIteration):
+            print(f"⚠️ 交易 {signature} {timeout} 秒內未確認")
+            return None
+        observe(f"{stage}_confirm", time.perf_counter() - sent)
+        if result['value'].get('err') is not None:
+            print(f"❌ 交易 {signature} 失敗: {result['value']['err']}")
+            return None
+        return signature
+    finally:
+        await subscription.close()
+
+
+async def signature_landed(signature: str) -> Optional[bool]:
+    """
+    getSignatureStatuses for one signature: True if confirmed without error,
+    False if it failed on chain, None if the node has no confirmed status for it.
+    """
+    from solders.signature import Signature
+    from solders.transaction_status import TransactionConfirmationStatus
+    response = await get_rpc_limiter().run(
+        lambda client: client.get_signature_statuses([Signature.from_string(signature)], True))
+    status = response.value[0]
+    if status is None:
+        return None
+    if status.err is not None:
+        return False
+    if status.confirmation_status in (None, TransactionConfirmationStatus.Processed):
+        return None
+    return True
+
+
+async def token_balance(mint: Pubkey) -> Optional[int]:
+    """Raw balance of our associated token account for `mint` (confirmed); None if it cannot be read."""
+    from solana.rpc.commitment import Confirmed
+    ata = get_tx_builder().associated_token_account(mint)
+    try:
+        response = await get_rpc_limiter().run(lambda client: client.get_token_account_balance(ata, Confirmed))
+        return int(response.value.amount)
+    except Exception:  # no ATA (nothing bought) or RPC error: the caller cannot tell either way
+        return None
+
+
+async def buy_token(mint: Pubkey, bonding_curve: Pubkey, associated_bonding_curve: Pubkey,
+                    amount_sol: float, slippage: float) -> Optional[str]:
+    """Buy `amount_sol` SOL worth of `mint`; returns the confirmed signature or None."""
+    from curve_cache import get_curve_cache
+    state = await get_curve_cache().get(bonding_curve)
+    if state is None:
+        print(f"❌ 找不到 bonding curve {bonding_curve}")
+        return None
+    tx, token_amount = get_tx_builder().buy_for_sol(
+        mint, bonding_curve, associated_bonding_curve, state, int(amount_sol * LAMPORTS_PER_SOL), slippage)
+    print(f"Buying {token_amount} tokens of {mint}")
+    return await send_and_confirm(tx, "buy")
+
+
+async def sell_token(mint: Pubkey, bonding_curve: Pubkey, associated_bonding_curve: Pubkey,
+                     slippage: float) -> Optional[str]:
+    """Sell our whole balance of `mint`; returns the confirmed signature or None."""
+    from curve_cache import get_curve_cache
+    builder = get_tx_builder()
+    ata = builder.associated_token_account(mint)
+    try:
+        balance = await get_rpc_limiter().run(lambda client: client.get_token_account_balance(ata))
+        token_amount = int(balance.value.amount)
+    except Exception as e:  # no ATA: nothing was bought
+        print(f"⚠️ 讀不到 {mint} 的代幣餘額: {e}")
+        return None
+    state = await get_curve_cache().get(bonding_curve)
+    if token_amount <= 0 or state is None:
+        return None
+    tx, sol_out = builder.sell_for_min(mint, bonding_curve, associated_bonding_curve, state, token_amount, slippage)
+    print(f"Selling {token_amount} tokens of {mint} for ~{sol_out / LAMPORTS_PER_SOL:.6f} SOL")
+    return await send_and_confirm(tx, "sell")
@@ -0,0 +1,73 @@
+import asyncio
+import importlib
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from config import RPC_POOL_SIZES, WSS_RACE_ENDPOINTS
+from pump_decoder import get_decoder
+from subscription_manager import get_subscription_manager
+
+# 啟動時一次把 RPC keep-alive 連線、WebSocket 連線和 IDL 同時準備好，
+# 第一個 create 進來時就不用再等 TCP/TLS 握手。
+
+# 背景任務 (prewarm、curve_cache.run ...) 的參考留在這裡，不會被 GC 掉，出錯也會印出來
+_BACKGROUND: Set[asyncio.Task] = set()
+
+
+def _report(task: asyncio.Task):
+    _BACKGROUND.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        print(f"❌ 背景任務 {task.get_name()} 失敗: {type(error).__name__}: {error}")
+
+
+def background(coro, name: str) -> asyncio.Task:
+    """Start `coro` as a task that is kept referenced and whose exception gets logged."""
+    task = asyncio.ensure_future(coro)
+    task.set_name(name)
+    _BACKGROUND.add(task)
+    task.add_done_callback(_report)
+    return task
+
+
+async def _timed(name: str, coro, timings: Dict[str, Optional[float]]):
+    start = time.perf_counter()
+    try:
+        await coro
+        timings[name] = time.perf_counter() - start
+    except Exception as e:  # a cold endpoint must not stop the listener from starting
+        timings[name] = None
+        print(f"⚠️ 預熱失敗 {name}: {e}")
+
+
+async def _warm_rpc(endpoint: str):
+    # solana / httpx take ~150ms to import: do it in a thread so the websocket
+    # subscription is not held up behind it on the event loop
+    rpc_pool = await asyncio.get_running_loop().run_in_executor(None, importlib.import_module, "rpc_pool")
+    await rpc_pool.get_rpc_client(endpoint).get_health()
+
+
+async def prewarm(
+    rpc_endpoints: Optional[Iterable[str]] = None,
+    wss_endpoints: Optional[Iterable[str]] = None,
+    timeout: float = 5.0,
+) -> Dict[str, Optional[float]]:
+    """
+    Concurrently open the pooled RPC connection of every endpoint (one getHealth),
+    the shared websocket(s), and compile the IDL in a thread. Returns seconds per
+    target, None for the ones that failed or timed out.
+    """
+    rpc_endpoints = list(rpc_endpoints) if rpc_endpoints is not None else list(RPC_POOL_SIZES)
+    wss_endpoints = list(wss_endpoints) if wss_endpoints is not None else list(WSS_RACE_ENDPOINTS)
+    loop = asyncio.get_running_loop()
+    timings: Dict[str, Optional[float]] = {}
+
+    tasks = [_timed("idl", loop.run_in_executor(None, get_decoder), timings)]
+    tasks += [_timed(f"rpc {endpoint}", asyncio.wait_for(_warm_rpc(endpoint), timeout), timings)
+              for endpoint in rpc_endpoints]
+    tasks += [_timed(f"wss {endpoint}", get_subscription_manager(endpoint).connect(timeout), timings)
+              for endpoint in wss_endpoints]
+    await asyncio.gather(*tasks)
+    return timings